@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+async_driver_test.py exercises the AsyncDriver against a fake stick
+which answers via the asyncio.Protocol interface.
+"""
+
+import asyncio
+import logging
+import threading
+import unittest
+
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+from pyzwaver.async_driver import AsyncDriver
+
+# SOF len:09 REQU API_APPLICATION_COMMAND_HANDLER:04 00 node:09 len:03 SwitchBinary_Report
+REPORT = bytes([0x01, 0x09, 0x00, 0x04, 0x00, 0x09, 0x03, 0x25, 0x03, 0xff, 0x21])
+# SOF len:04 RESP API_ZW_GET_VERSION:15 07 chk
+VERSION_RESPONSE = bytes([0x01, 0x04, 0x01, 0x15, 0x07, 0xe8])
+
+
+class FakeStick:
+    """Transport which replays canned answers for every request written"""
+
+    def __init__(self, loop, answers):
+        self.loop = loop
+        self.driver = None
+        self.written = []
+        self._answers = list(answers)
+
+    def write(self, data):
+        self.written.append(data)
+        if data[0] == z.SOF and self._answers:
+            answer = self._answers.pop(0)
+            if answer:
+                self.loop.call_soon(self.driver.data_received, answer)
+
+
+class TestAsyncDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _MakeDriver(self, answers):
+        driver = AsyncDriver(self.loop)
+        stick = FakeStick(self.loop, answers)
+        stick.driver = driver
+        driver.connection_made(stick)
+        return driver, stick
+
+    def test_send_and_wait(self):
+        driver, stick = self._MakeDriver(
+            [zmessage.RAW_MESSAGE_ACK + VERSION_RESPONSE])
+        replies = []
+        mesg = zmessage.Message(
+            zmessage.MakeRawMessage(z.API_ZW_GET_VERSION, []),
+            zmessage.ControllerPriority(), replies.append, -1)
+
+        async def run():
+            done = await driver.SendMessageAndWait(mesg)
+            await driver.Terminate()
+            return done
+
+        self.assertIs(self.loop.run_until_complete(run()), mesg)
+        self.assertEqual(mesg.state, zmessage.MESSAGE_STATE_COMPLETED)
+        self.assertEqual(replies, [VERSION_RESPONSE])
+        # the response must be acked
+        self.assertIn(zmessage.RAW_MESSAGE_ACK, stick.written)
+        self.assertEqual(driver.History(), [mesg])
+
+    def test_timeout(self):
+        driver, _ = self._MakeDriver([None])
+        replies = []
+        mesg = zmessage.Message(
+            zmessage.MakeRawMessage(z.API_ZW_GET_VERSION, []),
+            zmessage.ControllerPriority(), replies.append, -1, timeout=0.05)
+
+        async def run():
+            await driver.SendMessageAndWait(mesg)
+            await driver.Terminate()
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(mesg.state, zmessage.MESSAGE_STATE_TIMEOUT)
+        self.assertEqual(replies, [None])
+
+    def test_retry_after_can(self):
+        driver, stick = self._MakeDriver(
+            [zmessage.RAW_MESSAGE_CAN,
+             zmessage.RAW_MESSAGE_ACK + VERSION_RESPONSE])
+        payload = zmessage.MakeRawMessage(z.API_ZW_GET_VERSION, [])
+        mesg = zmessage.Message(payload, zmessage.ControllerPriority(),
+                                None, -1)
+
+        async def run():
+            await driver.SendMessageAndWait(mesg)
+            await driver.Terminate()
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(mesg.state, zmessage.MESSAGE_STATE_COMPLETED)
+        self.assertEqual(mesg.can, 1)
+        self.assertEqual(stick.written.count(payload), 2)
+
+    def test_send_from_thread(self):
+        driver, stick = self._MakeDriver(
+            [zmessage.RAW_MESSAGE_ACK + VERSION_RESPONSE])
+        replies = []
+        mesg = zmessage.Message(
+            zmessage.MakeRawMessage(z.API_ZW_GET_VERSION, []),
+            zmessage.ControllerPriority(), replies.append, -1)
+        thread = threading.Thread(target=driver.SendMessage, args=(mesg,))
+
+        async def run():
+            thread.start()
+            while not replies:
+                await asyncio.sleep(0.01)
+            await driver.Terminate()
+
+        self.loop.run_until_complete(run())
+        thread.join()
+        self.assertEqual(mesg.state, zmessage.MESSAGE_STATE_COMPLETED)
+        self.assertEqual(replies, [VERSION_RESPONSE])
+
+    def test_listener(self):
+        driver, stick = self._MakeDriver([])
+        received = []
+
+        class Listener:
+            def put(self, ts, m):
+                received.append(m)
+
+        driver.AddListener(Listener())
+
+        async def run():
+            driver.data_received(REPORT[:5])
+            driver.data_received(REPORT[5:] + REPORT)
+            await driver.Terminate()
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(received, [REPORT, REPORT])
+        self.assertEqual(stick.written.count(zmessage.RAW_MESSAGE_ACK), 2)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+batch_decode_bench.py compares the throughput of decoding a capture of
+meter and sensor reports with command.ParseCommand (frame by frame)
+and with batch_decode.DecodeReadings.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from pyzwaver import batch_decode
+from pyzwaver import command
+from pyzwaver import zwave as z
+
+sys.path.insert(0, os.path.dirname(__file__))
+from batch_decode_test import LoadFrames  # noqa: E402
+
+FRAMES = 200000
+
+
+def Scalar(frames):
+    out = []
+    for f in frames:
+        data = command.MaybePatchCommand(f[7:7 + f[6]])
+        values = command.ParseCommand(data)
+        v = values["value"]
+        out.append((f[5], v["unit"], v["_value"]))
+    return out
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    readings = [f for f in LoadFrames()
+                if f[3] == z.API_APPLICATION_COMMAND_HANDLER and
+                (f[7], f[8]) in (z.Meter_Report, z.SensorMultilevel_Report)]
+    capture = (readings * (FRAMES // len(readings) + 1))[:FRAMES]
+    timestamps = [float(i) for i in range(len(capture))]
+
+    start = time.perf_counter()
+    Scalar(capture)
+    scalar = len(capture) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch_decode.DecodeReadings(capture, timestamps)
+    batch = len(capture) / (time.perf_counter() - start)
+
+    print("frames: %d" % len(capture))
+    print("%-8s %10.0f frames/sec" % ("scalar", scalar))
+    print("%-8s %10.0f frames/sec  (%.1fx)" % ("batch", batch, batch / scalar))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
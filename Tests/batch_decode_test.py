@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+batch_decode_test.py checks that the vectorized decoder agrees with
+command.ParseCommand on the meter and sensor reports in TestData.
+"""
+
+import logging
+import math
+import os
+import tempfile
+import unittest
+
+from pyzwaver import batch_decode
+from pyzwaver import command
+from pyzwaver import zwave as z
+from pyzwaver.history import RawHistory
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "TestData")
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+def LoadFrames():
+    out = []
+    for name in ["commands.input.txt", "api_application_command.input.txt"]:
+        with open(os.path.join(TEST_DATA, name)) as fp:
+            for line in fp:
+                token = line.split()
+                if not token or line.startswith("#"):
+                    continue
+                out.append(bytes(ParseToken(t) for t in token))
+    return out
+
+
+def ScalarReading(frame):
+    """The reading as seen by ParseCommand or None"""
+    if frame[3] != z.API_APPLICATION_COMMAND_HANDLER:
+        return None
+    data = command.MaybePatchCommand(frame[7:7 + frame[6]])
+    key = (data[0], data[1])
+    if key not in (z.Meter_Report, z.SensorMultilevel_Report):
+        return None
+    try:
+        values = command.ParseCommand(data)
+    except ValueError:
+        return None
+    if key == z.Meter_Report:
+        v = values["value"]
+        kind = v["type"]
+    else:
+        v = values["value"]
+        kind = values["type"]
+    return frame[5], data[0], kind, v["unit"], v["_value"]
+
+
+class TestBatchDecode(unittest.TestCase):
+
+    def test_matches_parse_command(self):
+        frames = LoadFrames()
+        expected = [r for r in map(ScalarReading, frames) if r is not None]
+        self.assertGreater(len(expected), 20)
+        readings = batch_decode.DecodeReadings(frames, range(len(frames)))
+        self.assertEqual(len(readings), len(expected))
+        for r, e in zip(readings, expected):
+            self.assertEqual((int(r["node"]), int(r["cls"]), int(r["type"]),
+                              int(r["unit"])), e[:4])
+            self.assertAlmostEqual(float(r["value"]), e[4])
+
+    def test_negative_and_malformed(self):
+        frames = [
+            # temperature -1.5 C
+            bytes([z.SOF, 0x0b, z.REQUEST, z.API_APPLICATION_COMMAND_HANDLER,
+                   0, 7, 6, 0x31, 0x05, 0x01, 0x22, 0xff, 0xf1, 0]),
+            # truncated
+            bytes([z.SOF, 0x0b, z.REQUEST, z.API_APPLICATION_COMMAND_HANDLER,
+                   0, 7, 5, 0x31, 0x05, 0x01, 0x24, 0xff]),
+            # not a reading
+            bytes([z.SOF, 0x09, z.REQUEST, z.API_APPLICATION_COMMAND_HANDLER,
+                   0, 7, 3, 0x20, 0x03, 0xff, 0]),
+        ]
+        readings = batch_decode.DecodeReadings(frames)
+        self.assertEqual(len(readings), 1)
+        self.assertEqual(float(readings["value"][0]), -1.5)
+        self.assertTrue(math.isnan(readings["ts"][0]))
+        self.assertEqual(len(batch_decode.DecodeReadings([])), 0)
+
+    def test_spill_file(self):
+        frames = LoadFrames()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "spill.bin")
+            h = RawHistory(capacity=4, spill_path=path)
+            for i, f in enumerate(frames):
+                h.Append(1000.0 + i, False, f, "")
+                h.Append(1000.0 + i, True, f, "")
+            h.Close()
+            readings = batch_decode.DecodeReadingsFromSpillFile(path)
+        # the last two records were never spilled
+        expected = batch_decode.DecodeReadings(frames[:-2])
+        self.assertEqual(list(readings["value"]), list(expected["value"]))
+        self.assertTrue(all(readings["ts"] >= 1000.0))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.CRITICAL)
+    unittest.main()
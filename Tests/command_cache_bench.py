@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+command_cache_bench.py measures how fast a refresh cycle
+(DYNAMIC_PROPERTY_QUERIES for a number of nodes) can be turned into
+SEND_DATA frames via CommandTranslator.SendCommand with the
+pre-assembled command cache and by assembling every command afresh.
+"""
+
+import sys
+import time
+
+from pyzwaver import command
+from pyzwaver import command_helper
+from pyzwaver import zmessage
+from pyzwaver.command_translator import CommandTranslator
+
+NODES = range(2, 42)
+ROUNDS = 200
+
+
+class NullDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+class LegacyCommandTranslator(CommandTranslator):
+
+    def SendCommand(self, n, key, values, priority, xmit):
+        """What SendCommand used to do (minus the error handling)"""
+        raw_cmd = command.AssembleCommand(key, values)
+
+        def handler(_):
+            pass
+
+        m = zmessage.MakeRawCommandWithId(n, raw_cmd, xmit)
+        self._SendMessage(n, m, priority, handler)
+
+
+def Measure(translator, queries):
+    priority = zmessage.ControllerPriority()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for n in NODES:
+            for key, values in queries:
+                translator.SendCommand(n, key, values, priority, 5)
+    return ROUNDS * len(NODES) * len(queries) / (time.perf_counter() - start)
+
+
+def Assembles(key, values):
+    try:
+        command.AssembleCommand(key, values)
+        return True
+    except ValueError:
+        return False
+
+
+def main():
+    # skip the queries SendCommand would reject
+    queries = [(key, values)
+               for key, values in command_helper.DYNAMIC_PROPERTY_QUERIES
+               if Assembles(key, values)]
+    legacy = Measure(LegacyCommandTranslator(NullDriver()), queries)
+    cached = Measure(CommandTranslator(NullDriver()), queries)
+
+    print("sends: %d" % (ROUNDS * len(NODES) * len(queries)))
+    print("%-10s %9.0f sends/sec" % ("assembled", legacy))
+    print("%-10s %9.0f sends/sec  (%.2fx)" % (
+        "cached", cached, cached / legacy))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
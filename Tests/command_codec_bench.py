@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+command_codec_bench.py measures how many API_APPLICATION_COMMAND payloads
+from TestData/commands.input.txt can be parsed and re-assembled per
+second with the compiled codecs in command.py and with the table
+interpreter they replaced.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+
+INPUT = os.path.join(os.path.dirname(__file__), "..", "TestData",
+                     "commands.input.txt")
+ROUNDS = 200
+
+
+def LegacyParseCommand(m):
+    """The table interpreter ParseCommand used to be"""
+    table = z.SUBCMD_TO_PARSE_TABLE[m[0] * 256 + m[1]]
+    if table is None:
+        raise ValueError("unknown command")
+    out = {}
+    index = 2
+    for t in table:
+        kind = t[0]
+        name = t[2:-1]
+        new_index, value = command._PARSE_ACTIONS[kind][0](m, index)
+        if value is None:
+            if kind not in command._OPTIONAL_COMPONENTS:
+                raise ValueError("missing value for %s" % name)
+        else:
+            out[name] = value
+        index = new_index
+    return out
+
+
+def LegacyAssembleCommand(key, args):
+    """The table interpreter AssembleCommand used to be"""
+    table = z.SUBCMD_TO_PARSE_TABLE[key[0] * 256 + key[1]]
+    data = [key[0], key[1]]
+    for t in table:
+        kind = t[0]
+        name = t[2:-1]
+        v = args.get(name)
+        if v is None and kind not in command._OPTIONAL_COMPONENTS:
+            raise ValueError("missing args for [%s]" % name)
+        data += command._PARSE_ACTIONS[kind][1](v)
+    return data
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+def LoadPayloads():
+    out = []
+    with open(INPUT) as fp:
+        for line in fp:
+            token = line.split()
+            if not token or line.startswith("#"):
+                continue
+            m = [ParseToken(t) for t in token]
+            if m[0] != z.SOF or m[3] != z.API_APPLICATION_COMMAND_HANDLER:
+                continue
+            out.append(command.MaybePatchCommand(m[7:7 + m[6]]))
+    return out
+
+
+def Measure(parse, assemble, payloads):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for data in payloads:
+            assemble((data[0], data[1]), parse(data))
+    return ROUNDS * len(payloads) / (time.perf_counter() - start)
+
+
+def main():
+    # silence the fix-up warnings of MaybePatchCommand
+    logging.basicConfig(level=logging.CRITICAL)
+    payloads = LoadPayloads()
+    for data in payloads:
+        assert command.ParseCommand(data) == LegacyParseCommand(data)
+    legacy = Measure(LegacyParseCommand, LegacyAssembleCommand, payloads)
+    compiled = Measure(command.ParseCommand, command.AssembleCommand, payloads)
+    print("payloads: %d  rounds: %d" % (len(payloads), ROUNDS))
+    print("%-12s %9.0f frames/sec" % ("interpreted", legacy))
+    print("%-12s %9.0f frames/sec  (%.2fx)" % ("compiled", compiled,
+                                               compiled / legacy))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
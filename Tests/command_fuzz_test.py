@@ -0,0 +1,190 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+command_fuzz_test.py synthesizes random but valid arguments for every
+command in SUBCMD_TO_PARSE_TABLE (covering all the kinds in
+command._PARSE_ACTIONS) and checks that AssembleCommand/ParseCommand
+round trips are stable. It also feeds truncated, mutated and random
+payloads to ParseCommand which must either succeed or raise ValueError.
+
+Use "./command_fuzz_test.py -v" or set FUZZ_ROUNDS for longer runs.
+"""
+
+import logging
+import os
+import random
+import unittest
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+
+ROUNDS = int(os.environ.get("FUZZ_ROUNDS", "20"))
+SEED = int(os.environ.get("FUZZ_SEED", "1"))
+
+
+def _Bytes(rng, lo, hi):
+    return [rng.randrange(256) for _ in range(rng.randint(lo, hi))]
+
+
+def _Meter(rng):
+    size = rng.randint(1, 4)
+    out = {"type": rng.randrange(32), "rate": rng.randrange(4),
+           "unit": rng.randrange(8), "exp": rng.randrange(8),
+           "mantissa": _Bytes(rng, size, size)}
+    if rng.random() < 0.5:
+        out["dt"] = rng.randrange(65536)
+        if rng.random() < 0.5:
+            out["mantissa2"] = _Bytes(rng, size, size)
+    return out
+
+
+def _Sensor(rng):
+    # AssembleCommand prefers "_value" and picks the smallest mantissa
+    bits = 8 * rng.choice([1, 2, 4])
+    mantissa = rng.randrange(-(1 << bits - 1), 1 << bits - 1)
+    exp = rng.randrange(8)
+    return {"exp": exp, "unit": rng.randrange(4),
+            "_value": mantissa / pow(10, exp)}
+
+
+def _Extensions(rng):
+    extensions = []
+    for i in range(rng.randint(0, 3)):
+        extensions.append((rng.randrange(128), _Bytes(rng, 0, 4)))
+    # all but the last extension have the "more" bit set
+    extensions = [(kind | 128 if i < len(extensions) - 1 else kind, data)
+                  for i, (kind, data) in enumerate(extensions)]
+    mode = rng.randrange(128) & ~1 | (1 if extensions else 0)
+    return {"mode": mode, "extensions": extensions,
+            "ciphertext": _Bytes(rng, 0, 16)}
+
+
+# kind -> random valid value for a field of that kind
+GENERATORS = {
+    "3": lambda rng: rng.randrange(1 << 24),
+    "A": lambda rng: bytes(_Bytes(rng, 0, 10)),
+    "B": lambda rng: rng.randrange(256),
+    "C": lambda rng: [rng.randrange(65536)] + _Bytes(rng, 5, 5),
+    "E": _Extensions,
+    "F": lambda rng: {"encoding": rng.randrange(8),
+                      "text": _Bytes(rng, 0, 31)},
+    "G": lambda rng: [(rng.randrange(256), rng.randrange(65536),
+                       rng.randrange(65536))
+                      for _ in range(rng.randint(0, 3))],
+    "K": lambda rng: _Bytes(rng, 16, 16),
+    "L": lambda rng: _Bytes(rng, 0, 8),
+    "M": _Meter,
+    "N": lambda rng: _Bytes(rng, 1, 16),
+    "O": lambda rng: _Bytes(rng, 8, 8),
+    "R": lambda rng: (lambda n: {"size": n,
+                                 "value": rng.randrange(1 << 8 * n)})(
+        rng.randint(0, 4)),
+    "T": lambda rng: (lambda n: {"size": n,
+                                 "value": rng.randrange(1 << 8 * n)})(
+        rng.randint(0, 4)),
+    "V": lambda rng: (lambda n: {"size": n,
+                                 "value": rng.randrange(1 << 8 * n)})(
+        rng.randint(0, 4)),
+    "W": lambda rng: rng.randrange(65536),
+    "X": _Sensor,
+    "b": lambda rng: rng.randrange(256) if rng.random() < 0.7 else None,
+    "t": lambda rng: ([rng.randrange(65536)
+                       for _ in range(rng.randint(0, 3))]
+                      if rng.random() < 0.7 else None),
+}
+
+# kinds which consume the remainder of the payload
+_REST_KINDS = set("EGKLNR")
+
+
+def Commands():
+    """All command keys which can be parsed"""
+    return sorted(key for key, table in z.SUBCMD_TO_PARSE_TABLE.items()
+                  if table is not None)
+
+
+def RandomArgs(rng, key):
+    table = z.SUBCMD_TO_PARSE_TABLE[key]
+    out = {}
+    for i, t in enumerate(table):
+        v = GENERATORS[t[0]](rng)
+        # an omitted optional field must not be followed by anything
+        if v is None:
+            break
+        out[t[2:-1]] = v
+    return out
+
+
+def RandomPayloads(rng, key, n):
+    out = []
+    for _ in range(n):
+        args = RandomArgs(rng, key)
+        out.append(command.AssembleCommand((key >> 8, key & 0xff), args))
+    return out
+
+
+def Mutations(rng, data):
+    """Malformed variants of a valid payload"""
+    yield data[:rng.randrange(len(data) + 1)]
+    if len(data) > 2:
+        m = list(data)
+        for _ in range(rng.randint(1, 3)):
+            m[rng.randrange(2, len(m))] = rng.randrange(256)
+        yield m
+    yield data + _Bytes(rng, 1, 8)
+    yield data[:2] + _Bytes(rng, 0, 20)
+
+
+class TestCommandFuzz(unittest.TestCase):
+
+    def test_generators_cover_all_kinds(self):
+        self.assertEqual(set(GENERATORS), set(command._PARSE_ACTIONS))
+        for key in Commands():
+            table = z.SUBCMD_TO_PARSE_TABLE[key]
+            for t in table[:-1]:
+                self.assertNotIn(t[0], _REST_KINDS, "%04x %s" % (key, table))
+
+    def test_round_trip(self):
+        rng = random.Random(SEED)
+        for key in Commands():
+            k = (key >> 8, key & 0xff)
+            for _ in range(ROUNDS):
+                args = RandomArgs(rng, key)
+                data = command.AssembleCommand(k, args)
+                msg = "%s %s %s" % (command.StringifyCommand(k), args, data)
+                self.assertTrue(all(0 <= b < 256 for b in data), msg)
+                values = command.ParseCommand(data)
+                again = command.AssembleCommand(k, values)
+                self.assertEqual(again, data, msg)
+                self.assertEqual(command.ParseCommand(bytes(again)), values, msg)
+
+    def test_malformed(self):
+        rng = random.Random(SEED)
+        for key in Commands():
+            for data in RandomPayloads(rng, key, ROUNDS):
+                for m in Mutations(rng, data):
+                    try:
+                        command.ParseCommand(bytes(m))
+                    except ValueError:
+                        pass
+
+
+if __name__ == '__main__':
+    # malformed input is logged
+    logging.basicConfig(level=logging.CRITICAL)
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+command_throughput_bench.py reports the ParseCommand throughput per
+command class over payloads synthesized by command_fuzz_test.py for
+every command in SUBCMD_TO_PARSE_TABLE.
+
+Use it before and after changing the parser, e.g.
+    ./command_throughput_bench.py > before.txt
+"""
+
+import collections
+import logging
+import os
+import random
+import sys
+import time
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+
+sys.path.insert(0, os.path.dirname(__file__))
+from command_fuzz_test import Commands, RandomPayloads  # noqa: E402
+
+PAYLOADS = 50
+ROUNDS = 20
+
+
+def Measure(payloads):
+    parse = command.ParseCommand
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for data in payloads:
+                parse(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return ROUNDS * len(payloads) / best
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    rng = random.Random(1)
+    by_class = collections.defaultdict(list)
+    for key in Commands():
+        by_class[key >> 8] += [bytes(m)
+                               for m in RandomPayloads(rng, key, PAYLOADS)]
+    total = []
+    print("%-28s %5s %12s" % ("class", "cmds", "parses/sec"))
+    for cls in sorted(by_class, key=lambda c: z.CMD_TO_STRING.get(c, "")):
+        payloads = by_class[cls]
+        rate = Measure(payloads)
+        total += payloads
+        print("%-28s %5d %12.0f" % (z.CMD_TO_STRING.get(cls, "%02x" % cls),
+                                    len(payloads) // PAYLOADS, rate))
+    print("%-28s %5d %12.0f" % ("all", len(total) // PAYLOADS,
+                                Measure(total)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
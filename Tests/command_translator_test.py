@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+command_translator_test.py checks that frames received as bytes produce
+the same values as frames given as lists, that fix-ups of commands
+do not modify the received frames and that commands sent via the
+pre-assembled command cache match freshly assembled ones.
+"""
+
+import logging
+import os
+import unittest
+
+from pyzwaver import command
+from pyzwaver import command_translator
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+
+TD = os.path.join(os.path.dirname(__file__), "..", "TestData")
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+def LoadFrames(name):
+    out = []
+    with open(os.path.join(TD, name)) as fp:
+        for line in fp:
+            token = line.split()
+            if token and not line.startswith("#"):
+                out.append([ParseToken(t) for t in token])
+    return out
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.history = []
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m: zmessage.Message):
+        self.history.append(m)
+
+
+class Recorder(object):
+
+    def __init__(self):
+        self.values = []
+
+    def put(self, n, ts, key, value):
+        self.values.append((n, key, value))
+
+
+def Translate(frames):
+    translator = CommandTranslator(FakeDriver())
+    recorder = Recorder()
+    translator.AddListener(recorder)
+    for ts, m in enumerate(frames):
+        translator.put(ts, m)
+    return recorder.values
+
+
+class TestCommandTranslator(unittest.TestCase):
+
+    def test_bytes_frames(self):
+        for name in ["node.09.input.txt", "node.10.input.txt",
+                     "commands.input.txt"]:
+            frames = LoadFrames(name)
+            expected = Translate(frames)
+            self.assertTrue(expected)
+            got = Translate([bytes(m) for m in frames])
+            # note: this also ensures lists are not handed out as bytes
+            self.assertEqual(got, expected)
+
+    def test_patch_is_copy_on_write(self):
+        data = [0x31, 0x05, 0x01, 0x3e, 0x01, 0x08]
+        patched = command.MaybePatchCommand(data)
+        self.assertEqual(patched[3], 0x22)
+        self.assertEqual(data[3], 0x3e)
+        data = bytes([0x86, 0x14, 0x20])
+        self.assertEqual(command.MaybePatchCommand(data), [0x86, 0x14, 0x20, 1])
+        # nothing to patch: no copy
+        data = bytes([0x25, 0x03, 0xff])
+        self.assertIs(command.MaybePatchCommand(data), data)
+
+    def test_template(self):
+        for data in [[0x20, 0x02], [0x70, 0x04, 0x05, 0x01, 0xff]]:
+            for node, cb_id in [(0, 0), (7, 1), (255, 200)]:
+                template = zmessage.RawCommandTemplate(data, 5)
+                self.assertEqual(
+                    template.Make(node, cb_id),
+                    zmessage.MakeRawCommandWithId(node, data, 5, cb_id))
+
+    def test_send_command_cache(self):
+        driver = FakeDriver()
+        translator = CommandTranslator(driver)
+        before = command_translator.CommandCacheInfo()
+        commands = [
+            (z.Basic_Get, {}),
+            (z.Configuration_Set, {"parameter": 5, "value": {"size": 1, "value": 9}}),
+            (z.Association_Set, {"group": 1, "nodes": [1, 2]}),
+        ]
+        node = command_translator.MakeSplitMultiChannelNode(7, 2)
+        for _ in range(3):
+            for n in [5, node]:
+                for key, values in commands:
+                    translator.SendCommand(n, key, values, (1, 0, n), 5)
+        after = command_translator.CommandCacheInfo()
+        self.assertEqual(after.misses - before.misses, 6)
+        self.assertEqual(after.hits - before.hits, 12)
+        self.assertEqual(len(driver.history), 18)
+        for m in driver.history[:6]:
+            n = m.payload[4]
+            cb_id = m.payload[-2]
+            key, values = commands[driver.history.index(m) % 3]
+            raw_cmd = command.AssembleCommand(key, values)
+            if n == 7:
+                raw_cmd = list(z.MultiChannel_CmdEncap) + [0, 2] + raw_cmd
+            self.assertEqual(
+                m.payload, zmessage.MakeRawCommandWithId(n, raw_cmd, 5, cb_id))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.CRITICAL)
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+derived_view_test.py checks that the memoized views of NodeValues are
+dropped when the underlying values are written.
+"""
+
+import logging
+import unittest
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import NodeValues, Nodeset
+
+VIEWS = ["ColorSwitchSupported", "SensorSupported", "MeterSupported",
+         "AssociationGroupIds", "Associations", "CommandVersions",
+         "SupportedClasses"]
+
+
+def Fresh(values, name):
+    """Computes the view bypassing the cache"""
+    return getattr(NodeValues, name).__wrapped__(values)
+
+
+class FakeDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+class TestDerivedViews(unittest.TestCase):
+
+    def CheckViews(self, values):
+        for name in VIEWS:
+            self.assertEqual(getattr(values, name)(), Fresh(values, name), name)
+
+    def test_invalidation(self):
+        values = NodeValues()
+        self.CheckViews(values)
+        self.assertEqual(values.AssociationGroupIds(), (1, 2, 3, 4, 255))
+
+        values.Set(1.0, z.SensorMultilevel_SupportedReport,
+                   {"bits": {"size": 1, "value": 0x05}})
+        values.Set(1.0, z.Meter_SupportedReport, {"type": 0x81, "scale": 0x05})
+        values.Set(1.0, z.Association_GroupingsReport, {"count": 2})
+        values.SetMapEntry(1.0, z.Version_CommandClassReport, z.Meter, 3)
+        values.SetMapEntry(1.0, z.Version_CommandClassReport, z.Alarm, 0)
+        self.CheckViews(values)
+        self.assertEqual(values.SensorSupported(), {1, 3})
+        self.assertEqual(values.MeterSupported(), {0, 2})
+        self.assertEqual(values.AssociationGroupIds(), (1, 2, 255))
+        self.assertTrue(values.HasCommandClass(z.Meter))
+        self.assertFalse(values.HasCommandClass(z.Alarm))
+
+        # cached until one of the underlying commands is written
+        versions = values.CommandVersions()
+        associations = values.Associations()
+        values.Set(2.0, z.Battery_Report, {"level": 10})
+        self.assertIs(values.CommandVersions(), versions)
+        self.assertIs(values.Associations(), associations)
+
+        values.SetMapEntry(2.0, z.Version_CommandClassReport, z.Alarm, 2)
+        values.SetMapEntry(2.0, z.AssociationGroupInformation_NameReport, 1,
+                           "Lifeline")
+        values.SetMapEntry(2.0, z.Association_Report, 1,
+                           {"group": 1, "count": 5, "seq": 0, "nodes": [1]})
+        self.assertIsNot(values.CommandVersions(), versions)
+        self.assertTrue(values.HasCommandClass(z.Alarm))
+        self.assertEqual(values.Associations(),
+                         ((1, {"group": 1, "count": 5, "seq": 0, "nodes": [1]},
+                           "Lifeline", None, None),))
+        self.assertEqual(values.AssociationGroupIds(), (1,))
+        self.CheckViews(values)
+
+    def test_restore(self):
+        values = NodeValues(compact=True)
+        values.SetMapEntry(1.0, z.Version_CommandClassReport, z.Meter, 3)
+        self.assertTrue(values.HasCommandClass(z.Meter))
+        values.Restore([], [(z.Version_CommandClassReport,
+                             [(z.Meter, 1.0, 0), (z.Alarm, 1.0, 1)])])
+        self.assertFalse(values.HasCommandClass(z.Meter))
+        self.assertTrue(values.HasCommandClass(z.Alarm))
+        self.CheckViews(values)
+
+    def test_node_info_keeps_versions(self):
+        nodeset = Nodeset(CommandTranslator(FakeDriver()), 1)
+        node_info = {"generic": 16, "specific": 1, "controls": [],
+                     "commands": [z.Meter, z.SwitchBinary]}
+        nodeset.put(2, 1.0, command.CUSTOM_COMMAND_APPLICATION_UPDATE, node_info)
+        nodeset.put(2, 2.0, z.Version_CommandClassReport,
+                    {"class": z.Meter, "version": 0})
+        nodeset.put(2, 2.0, z.Version_CommandClassReport,
+                    {"class": z.SwitchBinary, "version": 2})
+        nodeset.put(2, 3.0, command.CUSTOM_COMMAND_APPLICATION_UPDATE, node_info)
+        versions = nodeset.nodes[2].values.GetMap(z.Version_CommandClassReport)
+        self.assertEqual(versions[z.Meter], (2.0, 0))
+        self.assertEqual(versions[z.SwitchBinary], (2.0, 2))
+        self.assertNotIn(2, nodeset.NodesWithCommandClass(z.Meter))
+        self.assertFalse(nodeset.nodes[2].values.HasCommandClass(z.Meter))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
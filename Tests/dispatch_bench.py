@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+dispatch_bench.py compares looking up the name, parse table and flags
+of the commands in the replay fixtures via the dicts in zwave.py with
+the flat SUBCMD_* tuples indexed by cls * 256 + sub.
+"""
+
+import os
+import sys
+import time
+
+from pyzwaver import zwave as z
+
+TD = os.path.join(os.path.dirname(__file__), "..", "TestData")
+INPUTS = ["node.09.input.txt", "node.10.input.txt"]
+ROUNDS = 2000
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+def LoadFrames():
+    out = []
+    for name in INPUTS:
+        with open(os.path.join(TD, name)) as fp:
+            for line in fp:
+                token = line.split()
+                if token and not line.startswith("#"):
+                    m = bytes(ParseToken(t) for t in token)
+                    if m[3] == z.API_APPLICATION_COMMAND_HANDLER:
+                        out.append(m)
+    return out
+
+
+def DictDispatch(frames):
+    names = z.SUBCMD_TO_STRING
+    tables = z.SUBCMD_TO_PARSE_TABLE
+    flags = z.SUBCMD_TO_FLAGS
+    for m in frames:
+        key = m[7] * 256 + m[8]
+        names.get(key)
+        tables.get(key)
+        flags.get(key, 0)
+
+
+def FlatDispatch(frames):
+    names = z.SUBCMD_NAMES
+    tables = z.SUBCMD_PARSE_TABLES
+    flags = z.SUBCMD_FLAGS
+    for m in frames:
+        key = m[7] * 256 + m[8]
+        names[key]
+        tables[key]
+        flags[key]
+
+
+def Measure(dispatch, frames):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        dispatch(frames)
+    return (time.perf_counter() - start) / (ROUNDS * len(frames))
+
+
+def main():
+    frames = LoadFrames()
+    start = time.perf_counter()
+    _ = z.SUBCMD_NAMES, z.SUBCMD_PARSE_TABLES, z.SUBCMD_FLAGS
+    build = time.perf_counter() - start
+    d = Measure(DictDispatch, frames)
+    f = Measure(FlatDispatch, frames)
+    print("frames: %d  rounds: %d  building the flat tables: %.2fms" % (
+        len(frames), ROUNDS, 1000 * build))
+    print("%-6s %6.1f ns/frame" % ("dict", 1e9 * d))
+    print("%-6s %6.1f ns/frame  (%.2fx)" % ("flat", 1e9 * f, d / f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+driver_latency_bench.py measures the latency between a frame arriving
+from the (fake) serial device and an asyncio event loop observing it
+via a listener.
+
+This compares the threaded Driver, where frames hop from the receiving
+thread to the forwarding thread and then onto the loop, with the
+AsyncDriver where everything happens on the loop.
+"""
+
+import asyncio
+import logging
+import queue
+import statistics
+import sys
+import time
+
+from pyzwaver.async_driver import AsyncDriver
+from pyzwaver.driver import Driver
+
+# SOF len:09 REQU API_APPLICATION_COMMAND_HANDLER:04 00 node:09 len:03 SwitchBinary_Report
+FRAME = bytes([0x01, 0x09, 0x00, 0x04, 0x00, 0x09, 0x03, 0x25, 0x03, 0xff, 0x21])
+
+NUM_FRAMES = 2000
+
+
+class FakeSerialDevice:
+    """Minimal stand-in for serial.Serial fed from a queue"""
+
+    def __init__(self):
+        self._q = queue.Queue()
+        self._pending = b""
+
+    def Inject(self, data):
+        self._q.put(data)
+
+    def write(self, _data):
+        pass
+
+    def flush(self):
+        pass
+
+    def flushInput(self):
+        pass
+
+    def flushOutput(self):
+        pass
+
+    @property
+    def in_waiting(self):
+        while not self._q.empty():
+            self._pending += self._q.get()
+        return len(self._pending)
+
+    def read(self, n):
+        if not self._pending:
+            try:
+                self._pending = self._q.get(timeout=0.2)
+            except queue.Empty:
+                return b""
+        out, self._pending = self._pending[:n], self._pending[n:]
+        return out
+
+
+class FakeTransport:
+
+    def write(self, _data):
+        pass
+
+
+def Report(name, latencies):
+    latencies = sorted(latencies)
+    print("%-12s frames: %5d  median: %7.1fus  p99: %7.1fus  max: %7.1fus" % (
+        name, len(latencies),
+        1e6 * statistics.median(latencies),
+        1e6 * latencies[int(len(latencies) * 0.99)],
+        1e6 * latencies[-1]))
+
+
+async def MeasureThreaded(loop):
+    device = FakeSerialDevice()
+    driver = Driver(device)
+    latencies = []
+    arrivals = []
+    done = asyncio.Event()
+
+    def OnLoop(_ts):
+        latencies.append(time.perf_counter() - arrivals[len(latencies)])
+        if len(latencies) == NUM_FRAMES:
+            done.set()
+
+    class Listener:
+        def put(self, ts, _m):
+            # this is how a listener gets onto the loop from the driver thread
+            loop.call_soon_threadsafe(OnLoop, ts)
+
+    driver.AddListener(Listener())
+    for _ in range(NUM_FRAMES):
+        arrivals.append(time.perf_counter())
+        device.Inject(FRAME)
+        # one frame at a time so we measure latency not throughput
+        while len(latencies) < len(arrivals):
+            await asyncio.sleep(0)
+    await done.wait()
+    await loop.run_in_executor(None, driver.Terminate)
+    return latencies
+
+
+async def MeasureAsync(loop):
+    driver = AsyncDriver(loop)
+    driver.connection_made(FakeTransport())
+    latencies = []
+    arrival = [0.0]
+
+    class Listener:
+        def put(self, _ts, _m):
+            latencies.append(time.perf_counter() - arrival[0])
+
+    driver.AddListener(Listener())
+    for i in range(NUM_FRAMES):
+        arrival[0] = time.perf_counter()
+        # this is what the serial transport does when bytes arrive
+        driver.data_received(FRAME)
+        while len(latencies) <= i:
+            await asyncio.sleep(0)
+    await driver.Terminate()
+    return latencies
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    Report("Driver", loop.run_until_complete(MeasureThreaded(loop)))
+    Report("AsyncDriver", loop.run_until_complete(MeasureAsync(loop)))
+    loop.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
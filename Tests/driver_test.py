@@ -0,0 +1,484 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+driver_test.py exercises the threaded Driver against a fake serial
+device which emulates a stick answering controller local queries.
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+import unittest
+
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+from pyzwaver.driver import Driver, LatencySketch, MessageQueueOut, MessageStats, MessageStatsString
+
+# how long the fake stick takes to answer a request
+LATENCY = 0.02
+
+
+class FakeStick:
+    """
+    Stand-in for serial.Serial which ACKs every request and answers it
+    after LATENCY seconds with a RESPONSE (in request order).
+    The response payload echoes the first argument of the request.
+    """
+
+    def __init__(self, answer=True, cans=0):
+        self._q = queue.Queue()
+        self._pending = b""
+        self._lock = threading.Lock()
+        self._answer = answer
+        # number of requests to reject with a CAN
+        self._cans = cans
+        # (due time, response) in request order
+        self._responses = queue.Queue()
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.requests = []
+        # first argument of every request written (including CANed ones)
+        self.writes = []
+        threading.Thread(target=self._Responder, daemon=True).start()
+
+    def _Responder(self):
+        while True:
+            due, response = self._responses.get()
+            time.sleep(max(0.0, due - time.time()))
+            with self._lock:
+                self.outstanding -= 1
+            self._q.put(response)
+
+    def write(self, data):
+        if data[0] != z.SOF:
+            return
+        self.writes.append(data[4] if len(data) > 5 else 0)
+        if self._cans:
+            self._cans -= 1
+            self._q.put(zmessage.RAW_MESSAGE_CAN)
+            return
+        with self._lock:
+            self.requests.append(bytes(data))
+            self.outstanding += 1
+            self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        self._q.put(zmessage.RAW_MESSAGE_ACK)
+        if self._answer:
+            arg = data[4] if len(data) > 5 else 0
+            out = [z.SOF, 4, z.RESPONSE, data[3], arg]
+            out.append(zmessage.Checksum(out) ^ z.SOF)
+            self._responses.put((time.time() + LATENCY, bytes(out)))
+
+    def flush(self):
+        pass
+
+    def flushInput(self):
+        pass
+
+    def flushOutput(self):
+        pass
+
+    @property
+    def in_waiting(self):
+        while not self._q.empty():
+            self._pending += self._q.get()
+        return len(self._pending)
+
+    def read(self, n):
+        if not self._pending:
+            try:
+                self._pending = self._q.get(timeout=0.05)
+            except queue.Empty:
+                return b""
+        out, self._pending = self._pending[:n], self._pending[n:]
+        return out
+
+
+def IsFailedMessage(node, replies, timeout=None):
+    return zmessage.Message(
+        zmessage.MakeRawMessage(z.API_ZW_IS_FAILED_NODE_ID, [node]),
+        zmessage.ControllerPriority(),
+        lambda m: replies.append((node, m)), -1, timeout=timeout)
+
+
+def SendDataMessage(node, replies):
+    # answered by the fake stick with a RESPONSE only, which is all we need
+    return zmessage.Message(
+        zmessage.MakeRawMessage(z.API_ZW_SEND_DATA, [node]),
+        zmessage.ControllerPriority(),
+        lambda m: replies.append((node, m)), node,
+        action_resp=[zmessage.ACTION_REPORT], action_requ=[zmessage.ACTION_NONE])
+
+
+class TestDriver(unittest.TestCase):
+
+    def _Run(self, pipeline_depth, count=20):
+        stick = FakeStick()
+        driver = Driver(stick, pipeline_depth)
+        replies = []
+        start = time.time()
+        for n in range(1, count + 1):
+            driver.SendMessage(IsFailedMessage(n, replies))
+        driver.WaitUntilAllPreviousMessagesHaveBeenHandled()
+        duration = time.time() - start
+        driver.Terminate()
+        # the responses must be matched with the right request
+        self.assertEqual([n for n, _ in replies], list(range(1, count + 1)))
+        for n, m in replies:
+            self.assertEqual(m[4], n)
+        for m in driver.History():
+            self.assertEqual(m.state, zmessage.MESSAGE_STATE_COMPLETED)
+        # controller local queries do not feed the per node estimators
+        self.assertEqual(driver.NodeTimings(), {})
+        return stick, duration
+
+    def test_sequential(self):
+        stick, duration = self._Run(1)
+        self.assertEqual(stick.max_outstanding, 1)
+        self.assertGreater(duration, 20 * LATENCY)
+
+    def test_pipelined(self):
+        stick, duration = self._Run(8)
+        self.assertEqual(stick.max_outstanding, 8)
+        self.assertLess(duration, 10 * LATENCY)
+
+    def test_non_pipelineable_waits_for_drain(self):
+        stick = FakeStick()
+        driver = Driver(stick, 4)
+        replies = []
+        for n in range(1, 4):
+            driver.SendMessage(IsFailedMessage(n, replies))
+        # not a controller local query so it must not overlap with the others
+        driver.SendMessage(zmessage.Message(
+            zmessage.MakeRawMessage(z.API_ZW_REMOVE_FAILED_NODE_ID, [0]),
+            zmessage.ControllerPriority(),
+            lambda m: replies.append((0, m)), -1,
+            action_resp=[zmessage.ACTION_REPORT], action_requ=[zmessage.ACTION_NONE]))
+        driver.SendMessage(IsFailedMessage(4, replies))
+        driver.WaitUntilAllPreviousMessagesHaveBeenHandled()
+        driver.Terminate()
+        self.assertEqual([n for n, _ in replies], [1, 2, 3, 0, 4])
+        self.assertEqual(stick.max_outstanding, 3)
+
+    def test_pipelined_timeout(self):
+        stick = FakeStick(answer=False)
+        driver = Driver(stick, 4)
+        replies = []
+        for n in range(1, 5):
+            driver.SendMessage(IsFailedMessage(n, replies, timeout=0.1))
+        driver.WaitUntilAllPreviousMessagesHaveBeenHandled()
+        driver.Terminate()
+        self.assertEqual(sorted(replies), [(n, None) for n in range(1, 5)])
+        for m in driver.History():
+            self.assertEqual(m.state, zmessage.MESSAGE_STATE_TIMEOUT)
+        self.assertEqual(driver.NodeTimings(), {})
+
+    def test_pipelined_can(self):
+        stick = FakeStick(cans=1)
+        driver = Driver(stick, 4)
+        replies = []
+        for n in range(1, 5):
+            driver.SendMessage(IsFailedMessage(n, replies))
+        driver.WaitUntilAllPreviousMessagesHaveBeenHandled()
+        driver.Terminate()
+        # nothing is written before the CANed frame was re-sent and ACKed
+        self.assertEqual(stick.writes, [1, 1, 2, 3, 4])
+        self.assertEqual([n for n, _ in replies], [1, 2, 3, 4])
+        self.assertEqual([m.can for m in driver.History()], [1, 0, 0, 0])
+        for m in driver.History():
+            self.assertTrue(m.acked)
+            self.assertEqual(m.state, zmessage.MESSAGE_STATE_COMPLETED)
+
+    def test_send_data_timings(self):
+        stick = FakeStick()
+        driver = Driver(stick)
+        replies = []
+        for _ in range(5):
+            driver.SendMessage(SendDataMessage(7, replies))
+            driver.SendMessage(IsFailedMessage(7, replies))
+        driver.WaitUntilAllPreviousMessagesHaveBeenHandled()
+        driver.Terminate()
+        self.assertEqual(len(replies), 10)
+        # only the messages sent over the air are sampled
+        timings = driver.NodeTimings()
+        self.assertEqual(list(timings), [7])
+        self.assertEqual(timings[7]["samples"], 5)
+        self.assertGreater(timings[7]["srtt"], LATENCY / 2)
+        self.assertEqual(timings[7]["timeout"], zmessage.RttEstimator.MIN_TIMEOUT)
+        self.assertLess(timings[7]["timeout"], zmessage.RttEstimator.INITIAL_TIMEOUT)
+        self.assertEqual(timings[7]["delay"], 0.0)
+
+    def test_retry_after_can(self):
+        stick = FakeStick(cans=2)
+        driver = Driver(stick)
+        replies = []
+        driver.SendMessage(SendDataMessage(7, replies))
+        driver.WaitUntilAllPreviousMessagesHaveBeenHandled()
+        driver.Terminate()
+        self.assertEqual([n for n, _ in replies], [7])
+        self.assertEqual(driver.History()[0].can, 2)
+        # the message timeout was the only timer not to fire
+        timers = driver._timers
+        self.assertEqual(timers.cancelled, 1)
+        self.assertEqual(timers.fired, timers.scheduled - 1)
+        self.assertEqual(timers.Pending(), 0)
+        self.assertEqual(driver.Stats().Dict()["with_can"], 1)
+        # Karn: no sample from a message which had to be re-sent
+        self.assertEqual(driver.NodeTimings()[7]["samples"], 0)
+
+
+def FinishedMessage(node, duration_ms, state, can=0):
+    m = zmessage.Message(None, zmessage.ControllerPriority(), None, node)
+    m.start = 100.0
+    m.end = m.start + duration_ms / 1000.0
+    m.state = state
+    m.can = can
+    return m
+
+
+class TestRttEstimator(unittest.TestCase):
+
+    def _Sent(self, rtt, rtt_ms, state=zmessage.MESSAGE_STATE_COMPLETED,
+              can=0, timeout=None):
+        m = FinishedMessage(5, rtt_ms, state, can)
+        m.sent = m.start
+        m.timeout = timeout
+        rtt.Update(m)
+
+    def test_converges(self):
+        rtt = zmessage.RttEstimator()
+        self.assertEqual(rtt.Timeout(), zmessage.RttEstimator.INITIAL_TIMEOUT)
+        for _ in range(50):
+            self._Sent(rtt, 200)
+        self.assertAlmostEqual(rtt.srtt, 0.2)
+        self.assertLess(rtt.rttvar, 0.01)
+        # a fast node still gets the minimum timeout
+        self.assertEqual(rtt.Timeout(), zmessage.RttEstimator.MIN_TIMEOUT)
+        self.assertLess(rtt.Timeout(), zmessage.RttEstimator.INITIAL_TIMEOUT)
+        for _ in range(50):
+            self._Sent(rtt, 1000)
+        self.assertAlmostEqual(rtt.srtt, 1.0, delta=0.01)
+        self.assertGreater(rtt.Timeout(), 1.0)
+        self.assertEqual(rtt.Delay(), 0.0)
+
+    def test_above_floor(self):
+        rtt = zmessage.RttEstimator()
+        for i in range(50):
+            self._Sent(rtt, 300 if i % 2 else 400)
+        # srtt + K * rttvar lands between the floor and the initial timeout
+        self.assertAlmostEqual(rtt.Timeout(), rtt.srtt + rtt.K * rtt.rttvar)
+        self.assertGreater(rtt.Timeout(), zmessage.RttEstimator.MIN_TIMEOUT)
+        self.assertLess(rtt.Timeout(), zmessage.RttEstimator.INITIAL_TIMEOUT)
+
+    def test_backoff(self):
+        rtt = zmessage.RttEstimator()
+        for _ in range(10):
+            self._Sent(rtt, 100)
+        timeout = rtt.Timeout()
+        self._Sent(rtt, 0, zmessage.MESSAGE_STATE_TIMEOUT)
+        self.assertEqual(rtt.Timeout(), 2 * timeout)
+        self._Sent(rtt, 0, zmessage.MESSAGE_STATE_TIMEOUT)
+        self.assertEqual(rtt.Timeout(), 4 * timeout)
+        delay = rtt.Delay()
+        self.assertGreater(delay, 0.0)
+        self._Sent(rtt, 0, zmessage.MESSAGE_STATE_ABORTED)
+        self.assertGreater(rtt.Delay(), delay)
+        for _ in range(30):
+            self._Sent(rtt, 0, zmessage.MESSAGE_STATE_TIMEOUT)
+        self.assertEqual(rtt.Timeout(), zmessage.RttEstimator.MAX_TIMEOUT)
+        self.assertEqual(rtt.Delay(), zmessage.RttEstimator.MAX_DELAY)
+        # the next sample brings both back
+        self._Sent(rtt, 100)
+        self.assertEqual(rtt.failures, 0)
+        self.assertEqual(rtt.Delay(), 0.0)
+        self.assertEqual(rtt.Timeout(), zmessage.RttEstimator.MIN_TIMEOUT)
+
+    def test_no_samples(self):
+        rtt = zmessage.RttEstimator()
+        # re-sent after a CAN (Karn's algorithm)
+        self._Sent(rtt, 3000, can=1)
+        # explicit timeout
+        self._Sent(rtt, 3000, timeout=10.0)
+        self.assertEqual(rtt.samples, 0)
+        self.assertEqual(rtt.Timeout(), zmessage.RttEstimator.INITIAL_TIMEOUT)
+        self._Sent(rtt, 0, zmessage.MESSAGE_STATE_TIMEOUT, timeout=10.0)
+        self.assertEqual(rtt.Timeout(), zmessage.RttEstimator.INITIAL_TIMEOUT)
+        self.assertEqual(rtt.Dict()["failures"], 1)
+
+
+class TestMessageStats(unittest.TestCase):
+
+    def test_sketch(self):
+        rng = random.Random(1)
+        values = sorted(rng.lognormvariate(3.0, 1.0) for _ in range(10000))
+        sketch = LatencySketch(accuracy=0.02)
+        for v in values:
+            sketch.Add(v)
+        for p in [50, 95, 99]:
+            exact = values[int(p / 100.0 * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.Percentile(p) / exact, 1.0, delta=0.025)
+        self.assertEqual(LatencySketch().Percentile(50), 0.0)
+
+    def test_stats(self):
+        stats = MessageStats()
+        history = [
+            FinishedMessage(2, 100, zmessage.MESSAGE_STATE_COMPLETED),
+            FinishedMessage(2, 300, zmessage.MESSAGE_STATE_COMPLETED, can=2),
+            FinishedMessage(3, 1000, zmessage.MESSAGE_STATE_TIMEOUT),
+        ]
+        for m in history:
+            stats.Add(m)
+        d = stats.Dict()
+        self.assertEqual(d["count"], 3)
+        self.assertEqual(d["with_can"], 1)
+        self.assertEqual(d["total_can"], 2)
+        self.assertEqual(d["by_state"], {zmessage.MESSAGE_STATE_COMPLETED: 2,
+                                         zmessage.MESSAGE_STATE_TIMEOUT: 1})
+        self.assertEqual(d["by_node"][2]["count"], 2)
+        self.assertEqual(d["by_node"][2]["avg_ms"], 200)
+        self.assertEqual(d["by_node"][3]["aborted"], 1)
+        self.assertAlmostEqual(d["by_node"][3]["p50_ms"], 1000, delta=20)
+        self.assertEqual(str(stats), MessageStatsString(history))
+        self.assertIn("processed: 3", str(stats))
+        self.assertIn("processed: 0", str(MessageStats()))
+
+
+def NodeMessage(node, priority_func=zmessage.NodePriorityLo, size=0):
+    payload = zmessage.MakeRawMessage(z.API_ZW_SEND_DATA, [node] + [0] * size)
+    return zmessage.Message(payload, priority_func(node), None, node)
+
+
+class TestMessageQueueOut(unittest.TestCase):
+
+    def _Drain(self, q):
+        out = []
+        while q.qsize():
+            out.append(q.get())
+        return out
+
+    def test_priorities(self):
+        q = MessageQueueOut()
+        lo = NodeMessage(2)
+        hi = NodeMessage(2, zmessage.NodePriorityHi)
+        ctrl = zmessage.Message(None, zmessage.ControllerPriority(), None, -1)
+        last = zmessage.Message(None, zmessage.LowestPriority(), None, -1)
+        for m in [last, lo, hi, ctrl]:
+            q.put(m.priority, m)
+        self.assertEqual(self._Drain(q), [ctrl, hi, lo, last])
+
+    def test_round_robin(self):
+        q = MessageQueueOut()
+        heavy = [NodeMessage(5) for _ in range(20)]
+        light = [NodeMessage(n) for n in [2, 3]]
+        for m in heavy + light:
+            q.put(m.priority, m)
+        self.assertEqual(q.qsize(), 22)
+        self.assertEqual(q.qsize_for_node(5), 20)
+        out = self._Drain(q)
+        # the light nodes do not have to wait for the heavy one to drain
+        self.assertLess(out.index(light[0]), 15)
+        self.assertLess(out.index(light[1]), 15)
+        # FIFO per node
+        self.assertEqual([m for m in out if m.node == 5], heavy)
+        self.assertEqual(q.qsize_for_node(5), 0)
+
+    def test_deficit(self):
+        # big messages use up the quantum faster
+        q = MessageQueueOut()
+        big = [NodeMessage(2, size=50) for _ in range(10)]
+        small = [NodeMessage(3) for _ in range(50)]
+        for m in big + small:
+            q.put(m.priority, m)
+        out = self._Drain(q)[:30]
+        n_big = len([m for m in out if m.node == 2])
+        n_small = len([m for m in out if m.node == 3])
+        self.assertGreater(n_small, 3 * n_big)
+
+    def test_drop(self):
+        q = MessageQueueOut()
+        mm = [NodeMessage(n) for n in [2, 3, 2, 3]]
+        hi = NodeMessage(2, zmessage.NodePriorityHi)
+        for m in mm + [hi]:
+            q.put(m.priority, m)
+        self.assertEqual(q.DropForNode(2, lambda m: m is mm[2]), [mm[2]])
+        self.assertEqual(q.qsize_for_node(2), 2)
+        self.assertEqual(sorted(q.DropForNode(2), key=id), sorted([mm[0], hi], key=id))
+        self.assertEqual(q.qsize(), 2)
+        self.assertEqual(self._Drain(q), [mm[1], mm[3]])
+
+    def test_coalescing(self):
+        q = MessageQueueOut()
+        replies = []
+
+        def Command(node, cmd):
+            payload = zmessage.MakeRawCommandWithId(node, cmd, 5)
+            return zmessage.Message(payload, zmessage.NodePriorityLo(node),
+                                    replies.append, node)
+
+        basic_get = [0x20, 0x02]
+        get1 = Command(2, basic_get)
+        get2 = Command(2, basic_get)
+        self.assertNotEqual(get1.payload, get2.payload)
+        other_node = Command(3, basic_get)
+        set1 = Command(2, [0x20, 0x01, 0xff])
+        set2 = Command(2, [0x20, 0x01, 0xff])
+        for m in [get1, get2, other_node, set1, set2]:
+            q.put(m.priority, m)
+        self.assertEqual(q.coalesced, 1)
+        self.assertEqual(q.qsize(), 4)
+        self.assertEqual(q.qsize_for_node(2), 3)
+        self.assertEqual(self._Drain(q), [get1, other_node, set1, set2])
+        get1.Start(1.0)
+        get1.Complete(2.0, b"reply", zmessage.MESSAGE_STATE_COMPLETED)
+        self.assertEqual(replies, [b"reply", b"reply"])
+        self.assertEqual(get2.state, zmessage.MESSAGE_STATE_COMPLETED)
+        self.assertEqual(get2.end, 2.0)
+        # once the first copy is gone duplicates are queued again
+        q.put(get2.priority, get2)
+        self.assertEqual(q.qsize(), 1)
+
+    def test_no_coalescing_across_set(self):
+        q = MessageQueueOut()
+
+        def Command(cmd):
+            return zmessage.Message(zmessage.MakeRawCommandWithId(2, cmd, 5),
+                                    zmessage.NodePriorityLo(2), None, 2)
+
+        set_on = Command([0x20, 0x01, 0xff])
+        get1 = Command([0x20, 0x02])
+        set_off = Command([0x20, 0x01, 0x00])
+        get2 = Command([0x20, 0x02])
+        get3 = Command([0x20, 0x02])
+        for m in [set_on, get1, set_off, get2, get3]:
+            q.put(m.priority, m)
+        # the value must be read back after the last Set
+        self.assertEqual(q.coalesced, 1)
+        self.assertEqual(self._Drain(q), [set_on, get1, set_off, get2])
+        self.assertEqual(get2.duplicates, [get3])
+
+    def test_blocking_get(self):
+        q = MessageQueueOut()
+        m = NodeMessage(2)
+        threading.Timer(0.02, q.put, [m.priority, m]).start()
+        self.assertIs(q.get(), m)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.CRITICAL)
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+frame_bench.py measures building 100k SEND_DATA frames with
+zmessage.MakeRawCommandWithId and verifying 100k received frames
+(from TestData) with zmessage.IsValidFrame against the list based
+code they replaced.
+"""
+
+import os
+import sys
+import time
+
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+
+sys.path.insert(0, os.path.dirname(__file__))
+from command_translator_test import LoadFrames  # noqa: E402
+
+FRAMES = 100000
+
+
+def LegacyChecksum(data):
+    checksum = 0xff
+    for b in data:
+        checksum = checksum ^ b
+    return checksum
+
+
+def LegacyMakeRawCommandWithId(node, data, xmit, cb_id):
+    out = [node, len(data)] + data + [xmit]
+    out = [z.SOF, len(out) + 4, z.REQUEST, z.API_ZW_SEND_DATA] + out + [cb_id]
+    out.append(LegacyChecksum(out) ^ z.SOF)
+    return bytes(out)
+
+
+def LegacyIsValidFrame(m):
+    return LegacyChecksum(m) == z.SOF
+
+
+def Measure(funs, args, repeat=7):
+    """Returns frames/sec for every fun (best of interleaved runs)"""
+    best = [None] * len(funs)
+    for _ in range(repeat):
+        for i, fun in enumerate(funs):
+            start = time.perf_counter()
+            for a in args:
+                fun(*a)
+            elapsed = time.perf_counter() - start
+            if best[i] is None or elapsed < best[i]:
+                best[i] = elapsed
+    return [len(args) / b for b in best]
+
+
+def main():
+    received = [bytes(m) for name in ["commands.input.txt",
+                                      "api_application_command.input.txt"]
+                for m in LoadFrames(name)]
+    received = [(m,) for m in (received * (FRAMES // len(received) + 1))]
+    received = received[:FRAMES]
+    commands = [[0x20, 0x02], [0x31, 0x04, 0x01, 0x00],
+                [0x70, 0x04, 0x05, 0x01, 0xff], [0x32, 0x01, 0x10]]
+    sends = [(i % 232 + 1, commands[i % len(commands)], 5, i % 256)
+             for i in range(FRAMES)]
+    for a in sends[:100]:
+        assert LegacyMakeRawCommandWithId(*a) == zmessage.MakeRawCommandWithId(*a)
+    print("frames: %d (received: %.1f bytes avg)" % (
+        FRAMES, sum(len(m[0]) for m in received) / len(received)))
+    for what, legacy, new, args in [
+            ("build", LegacyMakeRawCommandWithId,
+             zmessage.MakeRawCommandWithId, sends),
+            ("verify", LegacyIsValidFrame, zmessage.IsValidFrame, received)]:
+        old, cur = Measure([legacy, new], args)
+        print("%-7s legacy: %9.0f frames/sec  new: %9.0f frames/sec  (%.2fx)" % (
+            what, old, cur, cur / old))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+frame_reader_test.py checks that zmessage.RawFrameReader splits a byte
+stream into the same frames regardless of how the stream is chunked
+and that frames are built and verified correctly.
+"""
+
+import random
+import unittest
+
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+
+# SOF len:09 REQU API_APPLICATION_COMMAND_HANDLER:04 00 node:09 len:03 SwitchBinary_Report
+FRAME1 = bytes([0x01, 0x09, 0x00, 0x04, 0x00, 0x09, 0x03, 0x25, 0x03, 0xff, 0x21])
+# SOF len:04 RESP API_ZW_SEND_DATA:13 01 chk
+FRAME2 = bytes([0x01, 0x04, 0x01, 0x13, 0x01, 0xe8])
+
+STREAM = (zmessage.RAW_MESSAGE_ACK + FRAME2 + FRAME1 +
+          zmessage.RAW_MESSAGE_CAN + FRAME1 + zmessage.RAW_MESSAGE_NAK)
+
+EXPECTED = [zmessage.RAW_MESSAGE_ACK, FRAME2, FRAME1,
+            zmessage.RAW_MESSAGE_CAN, FRAME1, zmessage.RAW_MESSAGE_NAK]
+
+
+class TestRawFrameReader(unittest.TestCase):
+
+    def test_bulk(self):
+        reader = zmessage.RawFrameReader()
+        self.assertEqual(reader.Feed(STREAM), EXPECTED)
+        self.assertEqual(reader.Pending(), 0)
+        self.assertEqual(reader.reads, 1)
+        self.assertEqual(reader.bytes, len(STREAM))
+        self.assertEqual(reader.frames, len(EXPECTED))
+
+    def test_byte_by_byte(self):
+        reader = zmessage.RawFrameReader()
+        out = []
+        for i in range(len(STREAM)):
+            out += reader.Feed(STREAM[i:i + 1])
+        self.assertEqual(out, EXPECTED)
+        self.assertEqual(reader.reads, len(STREAM))
+        self.assertEqual(reader.frames, len(EXPECTED))
+
+    def test_all_chunk_sizes(self):
+        for size in range(1, len(STREAM) + 1):
+            reader = zmessage.RawFrameReader()
+            out = []
+            for i in range(0, len(STREAM), size):
+                out += reader.Feed(STREAM[i:i + size])
+            self.assertEqual(out, EXPECTED, "chunk size %d" % size)
+
+    def test_partial(self):
+        reader = zmessage.RawFrameReader()
+        self.assertEqual(reader.Feed(FRAME1[:4]), [])
+        self.assertEqual(reader.Pending(), 4)
+        self.assertEqual(reader.Feed(FRAME1[4:] + FRAME2[:1]), [FRAME1])
+        self.assertEqual(reader.Pending(), 1)
+        self.assertEqual(reader.Feed(FRAME2[1:]), [FRAME2])
+        self.assertEqual(reader.Pending(), 0)
+
+    def test_frames_are_immutable_copies(self):
+        reader = zmessage.RawFrameReader()
+        out = reader.Feed(FRAME1 + FRAME1[:3])
+        self.assertIsInstance(out[0], bytes)
+        out += reader.Feed(FRAME1[3:])
+        self.assertEqual(out, [FRAME1, FRAME1])
+        self.assertEqual(out[0][0], z.SOF)
+
+    def test_compaction(self):
+        reader = zmessage.RawFrameReader()
+        count = 0
+        # keep a partial frame around so the buffer is never fully drained
+        reader.Feed(FRAME1[:2])
+        for _ in range(2000):
+            count += len(reader.Feed(FRAME1[2:] + FRAME1[:2]))
+        self.assertEqual(count, 2000)
+        self.assertEqual(reader.Pending(), 2)
+        self.assertLess(len(reader._buf), 2 * reader._COMPACTION_THRESHOLD)
+
+
+def SlowChecksum(data):
+    checksum = 0xff
+    for b in data:
+        checksum = checksum ^ b
+    return checksum
+
+
+def SlowRawMessageWithId(func, data, cb_id):
+    out = [z.SOF, len(data) + 4, z.REQUEST, func] + data + [cb_id]
+    out.append(SlowChecksum(out) ^ z.SOF)
+    return bytes(out)
+
+
+class TestFrameBuilding(unittest.TestCase):
+
+    def test_checksum(self):
+        rng = random.Random(1)
+        for n in range(300):
+            data = bytes(rng.randrange(256) for _ in range(n))
+            self.assertEqual(zmessage.Checksum(data), SlowChecksum(data))
+            self.assertEqual(zmessage.Checksum(list(data)), SlowChecksum(data))
+
+    def test_build(self):
+        data = [0x70, 0x04, 0x05, 0x01, 0xff]
+        for cb_id in [0, 1, 255]:
+            expected = SlowRawMessageWithId(
+                z.API_ZW_SEND_DATA, [9, len(data)] + data + [5], cb_id)
+            self.assertEqual(
+                zmessage.MakeRawCommandWithId(9, data, 5, cb_id), expected)
+            self.assertEqual(
+                zmessage.MakeRawCommandWithId(9, bytes(data), 5, cb_id), expected)
+        frame = zmessage.MakeRawMessage(z.API_ZW_REQUEST_NODE_INFO, [9])
+        self.assertEqual(frame, bytes([z.SOF, 4, z.REQUEST,
+                                       z.API_ZW_REQUEST_NODE_INFO, 9,
+                                       SlowChecksum([4, z.REQUEST, 0x60, 9])]))
+        self.assertTrue(zmessage.IsValidFrame(frame))
+
+    def test_build_from_bytes(self):
+        data = [0x20, 0x01, 0xff]
+        for d in [data, bytes(data)]:
+            frame = zmessage.MakeRawCommand(9, d, 5)
+            self.assertEqual(frame, zmessage.MakeRawMessage(
+                z.API_ZW_SEND_DATA, [9, len(data)] + data + [5]))
+            self.assertTrue(zmessage.IsValidFrame(frame))
+            for nodes in [[2, 3], bytes([2, 3])]:
+                frame = zmessage.MakeRawCommandMultiWithId(nodes, d, 5, 7)
+                self.assertEqual(frame, SlowRawMessageWithId(
+                    z.API_ZW_SEND_DATA_MULTI, [2, 2, 3, len(data)] + data + [5], 7))
+
+    def test_verify(self):
+        self.assertTrue(zmessage.IsValidFrame(FRAME1))
+        self.assertTrue(zmessage.IsValidFrame(FRAME2))
+        bad = bytearray(FRAME1)
+        bad[8] ^= 0x10
+        self.assertFalse(zmessage.IsValidFrame(bytes(bad)))
+        self.assertFalse(zmessage.IsValidFrame(FRAME1[:-1]))
+        big = zmessage.MakeRawMessageWithId(z.API_ZW_SEND_DATA, list(range(200)), 3)
+        self.assertTrue(zmessage.IsValidFrame(big))
+        self.assertFalse(zmessage.IsValidFrame(big[:-1] + bytes([big[-1] ^ 1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+history_test.py checks the ring buffers in history.py including
+the spill file.
+"""
+
+import os
+import tempfile
+import unittest
+
+from pyzwaver import zmessage
+from pyzwaver.history import MessageHistory, RawHistory, ReadSpillFile
+
+
+def MakeMessage(node, start, duration, state=zmessage.MESSAGE_STATE_COMPLETED):
+    m = zmessage.Message(None, zmessage.ControllerPriority(), None, node)
+    m.start = start
+    m.end = start + duration
+    m.state = state
+    return m
+
+
+class TestRawHistory(unittest.TestCase):
+
+    def test_ring(self):
+        h = RawHistory(4)
+        self.assertEqual(h.Last(), [])
+        for i in range(10):
+            h.Append(float(i), i % 2 == 0, bytes([i]), "c%d" % i)
+        self.assertEqual(len(h), 4)
+        self.assertEqual(h.total, 10)
+        self.assertEqual([r[0] for r in h.Last()], [6.0, 7.0, 8.0, 9.0])
+        self.assertEqual(h.Last(2), [(8.0, True, bytes([8]), "c8"),
+                                     (9.0, False, bytes([9]), "c9")])
+        self.assertEqual(list(h), h.Last())
+
+    def test_spill(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            h = RawHistory(3, path)
+            records = [(0.5 * i, i % 3 == 0, bytes(range(i)), "x" * (i % 2))
+                       for i in range(20)]
+            for r in records:
+                h.Append(*r)
+            h.Close()
+            spilled = list(ReadSpillFile(path))
+            self.assertEqual(spilled + h.Last(), records)
+        finally:
+            os.remove(path)
+
+    def test_spill_long_comment(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            h = RawHistory(1, path)
+            # the 255 byte limit falls into the middle of a character
+            comment = "\u00e4" * 200
+            h.Append(1.0, True, b"\x01", comment)
+            h.Append(2.0, True, b"\x02", "")
+            h.Close()
+            spilled = list(ReadSpillFile(path))
+            self.assertEqual(spilled, [(1.0, True, b"\x01", comment[:127])])
+        finally:
+            os.remove(path)
+
+
+class TestMessageHistory(unittest.TestCase):
+
+    def test_ring(self):
+        h = MessageHistory(3)
+        mm = [MakeMessage(1, i, 0.1) for i in range(5)]
+        for m in mm:
+            h.Append(m)
+        self.assertEqual(h.Last(), mm[2:])
+        self.assertEqual(h.Last(1), mm[4:])
+        self.assertEqual(len(h), 3)
+
+    def test_slowest_and_aborted(self):
+        h = MessageHistory(10, index_capacity=3)
+        durations = [0.1, 0.9, 0.3, 0.5, 0.2, 0.8, 0.05]
+        mm = []
+        for i, d in enumerate(durations):
+            state = (zmessage.MESSAGE_STATE_TIMEOUT if i % 2 else
+                     zmessage.MESSAGE_STATE_COMPLETED)
+            m = MakeMessage(2, i, d, state)
+            mm.append(m)
+            h.Append(m)
+            h.Completed(m)
+        self.assertEqual(h.Slowest(), [mm[1], mm[5], mm[3]])
+        self.assertEqual(h.Slowest(1), [mm[1]])
+        self.assertEqual(h.Aborted(), [mm[1], mm[3], mm[5]])
+        self.assertEqual(h.Aborted(2), [mm[3], mm[5]])
+        self.assertEqual(h.total_aborted, 3)
+
+    def test_slowest_evicted(self):
+        h = MessageHistory(3, index_capacity=2)
+        durations = [0.9, 0.8, 0.1, 0.2, 0.3, 0.4]
+        mm = []
+        for i, d in enumerate(durations):
+            m = MakeMessage(2, i, d)
+            mm.append(m)
+            h.Append(m)
+            h.Completed(m)
+            slowest = h.Slowest()
+            # only the messages still in the buffer are returned
+            for m in slowest:
+                self.assertIn(m, mm[-3:])
+            self.assertEqual(slowest, sorted(slowest, key=lambda x: x.end - x.start,
+                                             reverse=True))
+            if i == 3:
+                # 0.2 completed while 0.9 and 0.8 filled the index
+                self.assertEqual(slowest, [mm[1]])
+        self.assertEqual(h.Slowest(), [mm[5], mm[4]])
+        self.assertEqual(len(h._slowest), 2)
+
+    def test_uncompleted_evicted(self):
+        h = MessageHistory(2)
+        mm = [MakeMessage(2, i, 0.1) for i in range(5)]
+        for m in mm:
+            h.Append(m)
+        self.assertEqual(len(h._seqs), 2)
+        # completing an evicted message does not index it
+        h.Completed(mm[0])
+        self.assertEqual(h.Slowest(), [])
+        h.Completed(mm[4])
+        self.assertEqual(h.Slowest(), [mm[4]])
+
+
+if __name__ == '__main__':
+    unittest.main()
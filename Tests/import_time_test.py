@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+import_time_test.py guards the import cost of the modules needed by
+command line tools: it runs "python -X importtime" in a subprocess and
+checks which modules get pulled in and how long the import takes.
+
+Run with -v to see the measured times.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# generous, this is meant to catch order of magnitude regressions
+BUDGET_US = 50000
+
+HEAVY_MODULES = {"asyncio", "serial", "numpy", "tornado", "cryptography"}
+
+
+def ImportTimes(statement):
+    """Returns module -> cumulative import time in us"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    # the first run may have to write the .pyc files
+    for _ in range(2):
+        p = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                           env=env, stderr=subprocess.PIPE,
+                           universal_newlines=True, check=True)
+    out = {}
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            out[name.strip()] = int(cumulative)
+    return out
+
+
+class TestImportTime(unittest.TestCase):
+
+    def _Check(self, statement, module):
+        times = ImportTimes(statement)
+        heavy = {m.split(".")[0] for m in times} & HEAVY_MODULES
+        self.assertEqual(heavy, set(), statement)
+        total = times[module]
+        if "-v" in sys.argv:
+            print("\n%s: %dus" % (statement, total))
+        self.assertLess(total, BUDGET_US)
+
+    def test_zwave(self):
+        self._Check("import pyzwaver.zwave", "pyzwaver.zwave")
+
+    def test_command(self):
+        self._Check("from pyzwaver import command", "pyzwaver.command")
+
+    def test_lazy_maps(self):
+        statement = ("import pyzwaver.zwave as z;"
+                     "assert 'STRING_TO_SUBCMD' not in vars(z);"
+                     "assert z.STRING_TO_SUBCMD['Basic_Set'] == 0x2001;"
+                     "assert 'STRING_TO_SUBCMD' in vars(z)")
+        ImportTimes(statement)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+log_format_test.py checks that raw messages passed to logging are only
+prettified when the record is emitted and the structured log format.
+"""
+
+import io
+import json
+import logging
+import unittest
+
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+
+# SOF len:09 REQU API_APPLICATION_COMMAND_HANDLER:04 00 node:09 len:03 SwitchBinary_Report
+FRAME = bytes([0x01, 0x09, 0x00, 0x04, 0x00, 0x09, 0x03, 0x25, 0x03, 0xff, 0x21])
+
+
+class CountingRawMessage(zmessage.LazyRawMessage):
+    __slots__ = ()
+    decoded = 0
+
+    def __str__(self):
+        if self._pretty is None:
+            CountingRawMessage.decoded += 1
+        return super().__str__()
+
+
+class TestLogFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("log_format_test")
+        self.logger.propagate = False
+        self.stream = io.StringIO()
+        self.handler = logging.StreamHandler(self.stream)
+        self.logger.addHandler(self.handler)
+        CountingRawMessage.decoded = 0
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_lazy(self):
+        self.logger.setLevel(logging.WARNING)
+        self.logger.info("recv: %s", CountingRawMessage(FRAME))
+        self.assertEqual(CountingRawMessage.decoded, 0)
+        self.assertEqual(self.stream.getvalue(), "")
+
+        self.logger.setLevel(logging.INFO)
+        self.logger.info("recv: %s", CountingRawMessage(FRAME))
+        self.assertEqual(CountingRawMessage.decoded, 1)
+        self.assertEqual(self.stream.getvalue(),
+                         "recv: %s\n" % zmessage.PrettifyRawMessage(FRAME))
+
+    def test_decoded_once(self):
+        self.logger.setLevel(logging.INFO)
+        stream2 = io.StringIO()
+        handler2 = logging.StreamHandler(stream2)
+        self.logger.addHandler(handler2)
+        self.logger.info("recv: %s", CountingRawMessage(FRAME))
+        self.logger.removeHandler(handler2)
+        self.assertEqual(CountingRawMessage.decoded, 1)
+        self.assertEqual(stream2.getvalue(), self.stream.getvalue())
+
+    def test_structured(self):
+        self.logger.setLevel(logging.INFO)
+        self.handler.setFormatter(zmessage.StructuredLogFormatter())
+        self.logger.info("recv: %s", zmessage.LazyRawMessage(FRAME))
+        self.logger.warning("no frames: %d", 5)
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        record = json.loads(lines[0])
+        self.assertEqual(record["level"], "INFO")
+        self.assertIn("SwitchBinary_Report", record["msg"])
+        self.assertEqual(record["frames"], [{
+            "raw": FRAME.hex(),
+            "fields": {"kind": "REQU", "func": "API_APPLICATION_COMMAND_HANDLER",
+                       "node": 9, "command": "SwitchBinary_Report"}}])
+        record = json.loads(lines[1])
+        self.assertEqual(record["msg"], "no frames: 5")
+        self.assertNotIn("frames", record)
+
+    def test_fields(self):
+        payload = zmessage.MakeRawMessageWithId(
+            z.API_ZW_SEND_DATA, [7, 2, 0x20, 0x02, 0x25], 0x42)
+        fields = zmessage.DecodeRawMessageFields(payload)
+        self.assertEqual(fields, {"kind": "REQU", "func": "API_ZW_SEND_DATA",
+                                  "node": 7, "command": "Basic_Get",
+                                  "cb": 0x42})
+        self.assertEqual(zmessage.DecodeRawMessageFields(None), {})
+        self.assertEqual(zmessage.DecodeRawMessageFields(bytes([z.ACK])), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+logging_bench.py measures the CPU time the drivers spend per frame on
+logging.info("recv: %s", ...) with logging at WARNING, i.e. when
+nothing is emitted: prettifying the frame eagerly versus passing a
+zmessage.LazyRawMessage.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+
+TD = os.path.join(os.path.dirname(__file__), "..", "TestData")
+INPUTS = ["node.09.input.txt", "node.10.input.txt"]
+ROUNDS = 500
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+def LoadFrames():
+    out = []
+    for name in INPUTS:
+        with open(os.path.join(TD, name)) as fp:
+            for line in fp:
+                token = line.split()
+                if token and not line.startswith("#"):
+                    out.append(bytes(ParseToken(t) for t in token))
+    return out
+
+
+def Eager(frames):
+    for m in frames:
+        logging.info("recv: %s", zmessage.PrettifyRawMessage(m))
+
+
+def Lazy(frames):
+    for m in frames:
+        logging.info("recv: %s", zmessage.LazyRawMessage(m))
+
+
+def Measure(log, frames):
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        log(frames)
+    return (time.process_time() - start) / (ROUNDS * len(frames))
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    frames = LoadFrames()
+    eager = Measure(Eager, frames)
+    lazy = Measure(Lazy, frames)
+    print("frames: %d  rounds: %d  level: WARNING" % (len(frames), ROUNDS))
+    print("%-6s %6.2f us/frame" % ("eager", 1e6 * eager))
+    print("%-6s %6.2f us/frame  (saved %.2f us/frame)" % (
+        "lazy", 1e6 * lazy, 1e6 * (eager - lazy)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
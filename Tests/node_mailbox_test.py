@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+node_mailbox_test.py checks that commands for sleeping nodes are held
+until they wake up.
+"""
+
+import logging
+import unittest
+
+from pyzwaver import command
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import NODE_STATE_DISCOVERED, Nodeset
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.history = []
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m: zmessage.Message):
+        self.history.append(m)
+
+
+def SentCommands(driver):
+    # SOF len REQU SEND_DATA node len class cmd ...
+    return [(m.payload[4], (m.payload[6], m.payload[7])) for m in driver.history
+            if m.payload[3] == z.API_ZW_SEND_DATA]
+
+
+class TestNodeMailbox(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = FakeDriver()
+        self.translator = CommandTranslator(self.driver)
+        self.nodeset = Nodeset(self.translator, 1)
+        self.node = self.nodeset.GetNode(5)
+        for cls in [z.Battery, z.WakeUp, z.Basic, z.Security2]:
+            self.node.put(0, z.Version_CommandClassReport,
+                          {"class": cls, "version": 1})
+        self.driver.history.clear()
+
+    def _ProtocolInfo(self, flags):
+        self.nodeset.put(5, 1, command.CUSTOM_COMMAND_PROTOCOL_INFO,
+                         {"protocol_version": 4, "flags": flags,
+                          "device_type": (4, 7, 1)})
+
+    def test_listening(self):
+        self._ProtocolInfo({"listening", "routing"})
+        self.node.BatchCommandSubmitFilteredSlow([(z.Battery_Get, {})])
+        self.assertEqual(SentCommands(self.driver), [(5, z.Battery_Get)])
+        self.assertEqual(self.node.mailbox.Held(), 0)
+
+    def test_sleeping(self):
+        self._ProtocolInfo({"routing"})
+        self.node.BatchCommandSubmitFilteredSlow(
+            [(z.Battery_Get, {}), (z.Basic_Get, {}), (z.Battery_Get, {})])
+        self.node.BatchCommandSubmitFilteredFast([(z.Basic_Set, {"level": 0})])
+        self.assertEqual(SentCommands(self.driver), [])
+        self.assertEqual(self.node.mailbox.Held(), 3)
+        # security handshakes are not held
+        self.node.BatchCommandSubmitFilteredFast([(z.Security2_KexGet, {})])
+        self.assertEqual(SentCommands(self.driver), [(5, z.Security2_KexGet)])
+        self.driver.history.clear()
+
+        self.nodeset.put(5, 2, z.WakeUp_Notification, {})
+        self.assertEqual(SentCommands(self.driver), [
+            (5, z.Battery_Get), (5, z.Basic_Get), (5, z.Basic_Set),
+            (5, z.WakeUp_NoMoreInformation)])
+        self.assertEqual(self.driver.history[-1].priority,
+                         zmessage.NodePriorityLo(5))
+        self.assertEqual(self.node.mailbox.Held(), 0)
+        self.assertEqual(self.node.mailbox.wakeups, 1)
+        self.assertEqual(self.node.mailbox.flushed, 3)
+
+    def _Pings(self):
+        return [m.payload[4] for m in self.driver.history
+                if m.payload[3] == z.API_ZW_GET_NODE_PROTOCOL_INFO]
+
+    def test_wakeup_nothing_held(self):
+        self._ProtocolInfo({"routing"})
+        self.node.MaybeChangeState(NODE_STATE_DISCOVERED)
+        self.nodeset.put(5, 2, z.WakeUp_Notification, {})
+        # the node is not sent back to sleep needlessly
+        self.assertEqual(self.driver.history, [])
+        self.assertEqual(self.node.mailbox.wakeups, 1)
+
+    def test_wakeup_listening(self):
+        self._ProtocolInfo({"listening"})
+        self.node.MaybeChangeState(NODE_STATE_DISCOVERED)
+        self.nodeset.put(5, 2, z.WakeUp_Notification, {})
+        self.assertEqual(self.driver.history, [])
+
+    def test_ping_held(self):
+        self._ProtocolInfo({"routing"})
+        self.node.Ping(3, False, "test")
+        self.node.Ping(3, True, "test")
+        self.assertEqual(self._Pings(), [])
+        self.assertEqual(self.node.mailbox.Held(), 1)
+        self.nodeset.put(5, 2, z.WakeUp_Notification, {})
+        self.assertEqual(self._Pings(), [5])
+        self.assertEqual(SentCommands(self.driver),
+                         [(5, z.WakeUp_NoMoreInformation)])
+        self.assertEqual(self.node.mailbox.Held(), 0)
+
+    def test_ping_listening(self):
+        self._ProtocolInfo({"listening"})
+        self.node.Ping(3, False, "test")
+        self.assertEqual(self._Pings(), [5])
+
+    def test_sets_keep_order(self):
+        self._ProtocolInfo({"routing"})
+        for level in [255, 0, 255]:
+            self.node.BatchCommandSubmitFilteredFast(
+                [(z.Basic_Set, {"level": level})])
+        self.assertEqual(self.node.mailbox.Held(), 3)
+        self.node.mailbox.WakeUp()
+        levels = [m.payload[8] for m in self.driver.history
+                  if m.payload[3] == z.API_ZW_SEND_DATA and
+                  (m.payload[6], m.payload[7]) == z.Basic_Set]
+        self.assertEqual(levels, [255, 0, 255])
+
+    def test_flirs(self):
+        self._ProtocolInfo({"routing", "sensor_1000ms"})
+        self.node.BatchCommandSubmitFilteredSlow([(z.Basic_Get, {})])
+        self.assertEqual(SentCommands(self.driver), [(5, z.Basic_Get)])
+
+    def test_becomes_listening(self):
+        self._ProtocolInfo({"routing"})
+        self.node.BatchCommandSubmitFilteredSlow([(z.Basic_Get, {})])
+        self.assertEqual(SentCommands(self.driver), [])
+        self._ProtocolInfo({"listening"})
+        self.assertEqual(SentCommands(self.driver), [(5, z.Basic_Get)])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+parse_alloc_bench.py uses tracemalloc to measure the memory allocated
+while the CommandTranslator parses the frames of the replay data.
+
+It compares frames handed over as bytes (which is what the drivers
+deliver and which are parsed from a bytes window without further
+copies) with the previous behavior of copying the command into a list
+of ints first.
+
+A memoryview was considered as well but at 184 bytes a view costs more
+than the typical Z-Wave command it would avoid copying.
+"""
+
+import logging
+import os
+import sys
+import tracemalloc
+
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+
+TD = os.path.join(os.path.dirname(__file__), "..", "TestData")
+INPUTS = ["node.09.input.txt", "node.10.input.txt", "commands.input.txt"]
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+def LoadFrames():
+    out = []
+    for name in INPUTS:
+        with open(os.path.join(TD, name)) as fp:
+            for line in fp:
+                token = line.split()
+                if token and not line.startswith("#"):
+                    m = bytes(ParseToken(t) for t in token)
+                    if m[3] == z.API_APPLICATION_COMMAND_HANDLER:
+                        out.append(m)
+    return out
+
+
+class FakeDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+
+class Sink(object):
+
+    def put(self, n, ts, key, value):
+        pass
+
+
+class CopyingTranslator(CommandTranslator):
+    """Copies the command into a list of ints like the translator used to"""
+
+    def put(self, ts, m):
+        super().put(ts, list(m))
+
+
+def Measure(translator_class, frames):
+    """Returns the average and the max of the bytes allocated per frame"""
+    translator = translator_class(FakeDriver())
+    translator.AddListener(Sink())
+    # warm up the codec cache
+    for m in frames:
+        translator.put(0, m)
+    peaks = []
+    tracemalloc.start()
+    for m in frames:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        translator.put(0, m)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks), max(peaks)
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    frames = LoadFrames()
+    print("frames: %d" % len(frames))
+    for name, translator_class, ff in [
+            ("list copy", CopyingTranslator, frames),
+            ("bytes window", CommandTranslator, frames)]:
+        avg, peak = Measure(translator_class, ff)
+        print("%-12s avg: %6.0f bytes/frame  max: %6d bytes" % (name, avg, peak))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
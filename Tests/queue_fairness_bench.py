@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+queue_fairness_bench.py simulates a skewed load on the outbound queue:
+two nodes queue a RefreshAllParameters style burst of 255
+Configuration_Gets each (the second one while the first is still being
+worked on) while a number of other nodes send a steady trickle of
+SwitchBinary_Gets.
+
+It reports the wait times (in simulated time) per kind of node and the
+Jain fairness index over the messages served per heavy node while both
+have a backlog (1.0 is perfectly fair, 0.5 means one node got it all)
+for the current MessageQueueOut and the previous PriorityQueue based one.
+"""
+
+import collections
+import queue
+import sys
+
+from pyzwaver import zmessage
+from pyzwaver import zwave as z
+from pyzwaver.driver import MessageQueueOut
+
+# node -> arrival time of its burst
+HEAVY_NODES = {5: 0.0, 11: 3.0}
+LIGHT_NODES = [2, 3, 4, 6, 7, 8, 9, 10]
+LIGHT_PERIOD = 0.5
+DURATION = 15.0
+
+
+class LegacyMessageQueueOut:
+    """The PriorityQueue based MessageQueueOut this replaced (bugs included)"""
+
+    def __init__(self):
+        self._q = queue.PriorityQueue()
+        self._lo_counts = collections.defaultdict(int)
+        self._hi_counts = collections.defaultdict(int)
+        self._lo_min = 0
+        self._hi_min = 0
+        self._counter = 0
+
+    def qsize(self):
+        return self._q.qsize()
+
+    def put(self, priority, message):
+        if self._q.empty():
+            self._lo_counts = collections.defaultdict(int)
+            self._hi_counts = collections.defaultdict(int)
+            self._lo_min = 0
+            self._hi_min = 0
+
+        level, count, node = priority
+        if level == 2:
+            count = self._hi_counts[node]
+            count = max(count + 1, self._hi_min)
+            self._hi_counts[node] = count
+        elif level == 3:
+            count = self._lo_counts[node]
+            count = max(count + 1, self._lo_min)
+            self._lo_counts[node] = count
+        else:
+            count = self._counter
+            self._counter += 1
+        self._q.put(((level, count, node), message))
+
+    def get(self):
+        priority, message = self._q.get()
+        level = priority[0]
+        if level == 2:
+            self._hi_min = priority[1]
+        elif level == 2:
+            self._lo_min = priority[1]
+        return message
+
+
+def MakeMessage(node, cmd):
+    payload = zmessage.MakeRawMessageWithId(
+        z.API_ZW_SEND_DATA, [node, len(cmd)] + cmd + [5], 1)
+    return zmessage.Message(payload, zmessage.NodePriorityLo(node), None, node)
+
+
+def ServiceTime(m):
+    # roughly: fixed round trip plus time on the air
+    return 0.02 + 0.0001 * len(m.payload)
+
+
+def Arrivals():
+    out = []
+    for n, t in HEAVY_NODES.items():
+        for p in range(255):
+            out.append((t, MakeMessage(n, [0x70, 0x05, p])))
+    for i, n in enumerate(LIGHT_NODES):
+        t = 0.01 * i
+        while t < DURATION:
+            out.append((t, MakeMessage(n, [0x25, 0x02])))
+            t += LIGHT_PERIOD
+    out.sort(key=lambda x: x[0])
+    return out
+
+
+def Simulate(q):
+    """Returns the waits per node and the messages served per heavy node
+    while all heavy nodes had a backlog"""
+    arrivals = Arrivals()
+    enqueued = {}
+    waits = collections.defaultdict(list)
+    pending = collections.Counter()
+    contended = collections.Counter()
+    now = 0.0
+    i = 0
+    while i < len(arrivals) or q.qsize():
+        while i < len(arrivals) and arrivals[i][0] <= now:
+            t, m = arrivals[i]
+            enqueued[m] = t
+            pending[m.node] += 1
+            q.put(m.priority, m)
+            i += 1
+        if q.qsize() == 0:
+            now = arrivals[i][0]
+            continue
+        m = q.get()
+        if all(pending[n] for n in HEAVY_NODES) and m.node in HEAVY_NODES:
+            contended[m.node] += 1
+        pending[m.node] -= 1
+        waits[m.node].append(now - enqueued[m])
+        now += ServiceTime(m)
+    return waits, contended
+
+
+def Percentile(values, p):
+    values = sorted(values)
+    return values[int(p / 100.0 * (len(values) - 1))]
+
+
+def Jain(xs):
+    return sum(xs) ** 2 / (len(xs) * sum(x * x for x in xs))
+
+
+def Report(name, result):
+    waits, contended = result
+    light = [w for n in LIGHT_NODES for w in waits[n]]
+    heavy = [w for n in HEAVY_NODES for w in waits[n]]
+    print("%-22s jain: %.3f  served while contended: %s" % (
+        name, Jain([contended[n] for n in HEAVY_NODES]), dict(contended)))
+    for kind, w in [("light", light), ("heavy", heavy)]:
+        print("    %-6s msgs: %4d  p50: %6.0fms  p99: %6.0fms  max: %6.0fms" % (
+            kind, len(w), 1000 * Percentile(w, 50), 1000 * Percentile(w, 99),
+            1000 * max(w)))
+
+
+def main():
+    Report("MessageQueueOut", Simulate(MessageQueueOut()))
+    Report("LegacyMessageQueueOut", Simulate(LegacyMessageQueueOut()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
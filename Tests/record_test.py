@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+record_test.py checks that Records behave like the dicts they replace
+and that a Nodeset storing compact values renders the same as one
+storing dicts.
+"""
+
+import logging
+import os
+import unittest
+
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import Nodeset
+from pyzwaver.record import Compact, Record, RecordClass
+
+TD = os.path.join(os.path.dirname(__file__), "..", "TestData")
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+class FakeDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+def Replay(name, compact):
+    translator = CommandTranslator(FakeDriver())
+    nodeset = Nodeset(translator, 1, compact_values=compact)
+    with open(os.path.join(TD, name)) as fp:
+        for ts, line in enumerate(fp):
+            token = line.split()
+            if token and not line.startswith("#"):
+                translator.put(ts, [ParseToken(t) for t in token])
+    return nodeset
+
+
+class TestRecord(unittest.TestCase):
+
+    def test_dict_compatible(self):
+        d = {"type": 1, "unit": 2, "exp": 1, "rate": 1,
+             "mantissa": [0, 23], "_value": 2.3,
+             "keys": 5, "class": 0x25}
+        r = Compact(d)
+        self.assertIsInstance(r, Record)
+        self.assertEqual(r, d)
+        self.assertEqual(d, r)
+        self.assertEqual(repr(r), repr(d))
+        self.assertEqual(r["class"], 0x25)
+        self.assertEqual(r["keys"], 5)
+        self.assertEqual(r.get("dt"), None)
+        self.assertEqual(r.get("dt", 7), 7)
+        self.assertIn("unit", r)
+        self.assertNotIn("dt", r)
+        self.assertEqual(list(r), list(d))
+        self.assertEqual(list(r.keys()), list(d.keys()))
+        self.assertEqual(list(r.values()), list(d.values()))
+        self.assertEqual(list(r.items()), list(d.items()))
+        self.assertEqual(len(r), len(d))
+        self.assertEqual(dict(r.items()), d)
+        with self.assertRaises(KeyError):
+            _ = r["dt"]
+        self.assertNotEqual(r, dict(d, unit=3))
+        self.assertNotEqual(r, {"unit": 2})
+
+    def test_nested(self):
+        d = {"sensor": 1, "value": {"exp": 1, "unit": 0, "_value": 2.5}}
+        r = Compact(d)
+        self.assertIsInstance(r["value"], Record)
+        self.assertEqual(r, d)
+        self.assertEqual(r.ToDict(), d)
+        self.assertIs(type(r.ToDict()["value"]), dict)
+        self.assertEqual(repr(r), repr(d))
+        # not convertible
+        self.assertEqual(Compact({1: 2}), {1: 2})
+        self.assertEqual(Compact(5), 5)
+
+    def test_classes_are_shared(self):
+        a = Compact({"level": 1})
+        b = Compact({"level": 2})
+        self.assertIs(type(a), type(b))
+        self.assertIs(type(a), RecordClass(("level",)))
+        self.assertFalse(hasattr(a, "__dict__"))
+
+    def test_replay(self):
+        for name in ["node.09.input.txt", "node.10.input.txt"]:
+            expected = Replay(name, False)
+            got = Replay(name, True)
+            self.assertEqual(sorted(got.nodes), sorted(expected.nodes))
+            for n, node in expected.nodes.items():
+                self.assertEqual(str(got.nodes[n]), str(node))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.CRITICAL)
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+render_node_bench.py measures example_webserver.RenderNode() and
+Node.RefreshDynamicValues() over a synthetic network while dynamic
+values (meters, sensors, switches) keep coming in, once with the
+derived views of NodeValues cached and once with the cache dropped
+before every call (which is what computing them afresh costs).
+
+This requires tornado (because of example_webserver).
+"""
+
+import logging
+import sys
+import time
+
+import example_webserver
+from pyzwaver import command
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import Nodeset
+
+NODES = range(2, 202)
+ROUNDS = 10
+REPEATS = 5
+
+CLASSES = [z.Basic, z.SwitchBinary, z.SwitchMultilevel, z.SensorMultilevel,
+           z.Meter, z.Configuration, z.Association, z.AssociationGroupInformation,
+           z.Version, z.ManufacturerSpecific, z.Battery, z.WakeUp, z.Alarm,
+           z.SceneActuatorConf, z.ColorSwitch, z.ZwavePlusInfo, z.Powerlevel,
+           z.Firmware, z.DeviceResetLocally, z.MultiChannel]
+
+
+class NullDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+class FakeDb(object):
+
+    def GetNodeName(self, num):
+        return None
+
+
+def MeterReport(unit, value):
+    return {"value": {"type": 1, "unit": unit, "exp": 0, "rate": 1,
+                      "mantissa": [value & 0xff], "_value": value}}
+
+
+def SensorReport(kind, value):
+    return {"type": kind, "value": {"exp": 0, "unit": 0, "_value": value,
+                                    "mantissa": [value & 0xff]}}
+
+
+def DynamicReports(n, ts):
+    return [
+        (z.SwitchBinary_Report, {"level": 255 * (ts % 2)}),
+        (z.SwitchMultilevel_Report, {"level": (n + ts) % 100}),
+        (z.Meter_Report, MeterReport(0, n + ts)),
+        (z.Meter_Report, MeterReport(2, n * ts)),
+        (z.SensorMultilevel_Report, SensorReport(1, 20 + ts % 5)),
+    ]
+
+
+def StaticReports(n):
+    out = [
+        (command.CUSTOM_COMMAND_PROTOCOL_INFO,
+         {"protocol_version": 4, "flags": {"listening", "routing"},
+          "device_type": (4, 16, 1)}),
+        (z.ManufacturerSpecific_Report,
+         {"manufacturer": 0x86, "type": 3, "product": n}),
+        (z.Version_Report, {"library": 3, "protocol": 4, "firmware": 5,
+                            "hardware": 1}),
+        (z.SensorMultilevel_SupportedReport, {"bits": {"size": 1, "value": 0x1b}}),
+        (z.Meter_SupportedReport, {"type": 0x81, "scale": 0x35}),
+        (z.ColorSwitch_SupportedReport, {"bits": {"size": 2, "value": 0x1c}}),
+        (z.Association_GroupingsReport, {"count": 5}),
+        (z.Battery_Report, {"level": n % 100}),
+    ]
+    for cls in CLASSES:
+        out.append((z.Version_CommandClassReport,
+                    {"class": cls, "version": 1 + cls % 3}))
+    for g in range(1, 6):
+        out.append((z.Association_Report,
+                    {"group": g, "count": 5, "seq": 0, "nodes": [1, n]}))
+        out.append((z.AssociationGroupInformation_NameReport,
+                    {"group": g, "name": "Group %d" % g}))
+        out.append((z.AssociationGroupInformation_InfoReport,
+                    {"mode": 0, "groups": [(g, 0, 0, 1, 0, 0)]}))
+        out.append((z.AssociationGroupInformation_ListReport,
+                    {"group": g, "commands": [[z.Basic, 1]]}))
+    for p in range(1, 31):
+        out.append((z.Configuration_Report,
+                    {"parameter": p, "value": {"size": 1, "value": p % 4}}))
+    for s in range(1, 11):
+        out.append((z.SceneActuatorConf_Report,
+                    {"scene": s, "level": 99, "delay": 0}))
+    return out
+
+
+def MakeNodeset():
+    nodeset = Nodeset(CommandTranslator(NullDriver()), 1)
+    for n in NODES:
+        for key, values in StaticReports(n):
+            nodeset.put(n, 0.0, key, values)
+    return nodeset
+
+
+def Run(nodeset, db, cached, refresh):
+    for ts in range(ROUNDS):
+        for n, node in nodeset.nodes.items():
+            for key, values in DynamicReports(n, ts):
+                nodeset.put(n, float(ts), key, values)
+            if not cached:
+                node.values._views.clear()
+            example_webserver.RenderNode(node, db)
+            if not refresh:
+                continue
+            if not cached:
+                node.values._views.clear()
+            node.RefreshDynamicValues()
+
+
+def Best(fun, *args):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fun(*args)
+        t = time.perf_counter() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    db = FakeDb()
+    nodeset = MakeNodeset()
+    a = example_webserver.RenderNode(nodeset.nodes[2], db)
+    nodeset.nodes[2].values._views.clear()
+    b = example_webserver.RenderNode(nodeset.nodes[2], db)
+    assert a == b
+
+    calls = ROUNDS * len(NODES)
+    print("nodes: %d  calls: %d" % (len(NODES), calls))
+    for refresh in [False, True]:
+        what = "render+refresh" if refresh else "render"
+        t_fresh = Best(Run, nodeset, db, False, refresh)
+        t_cached = Best(Run, nodeset, db, True, refresh)
+        print("%-14s fresh  %9.0f nodes/sec" % (what, calls / t_fresh))
+        print("%-14s cached %9.0f nodes/sec  (%.2fx)" % (
+            what, calls / t_cached, t_fresh / t_cached))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
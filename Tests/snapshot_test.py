@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+snapshot_test.py checks that a Nodeset survives SaveSnapshot() and
+RestoreSnapshot() and that restored nodes are refreshed according to
+the StalenessPolicy.
+"""
+
+import logging
+import os
+import tempfile
+import unittest
+
+from pyzwaver import command
+from pyzwaver import snapshot
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import Nodeset, StalenessPolicy, NODE_STATE_NONE, \
+    NODE_STATE_DISCOVERED, NODE_STATE_INTERVIEWED
+
+DAY = 24 * 3600.0
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.history = []
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        self.history.append(m)
+
+
+def Populate(nodeset, n, ts, listening=True):
+    flags = {"routing", "listening"} if listening else {"routing"}
+    nodeset.put(n, ts, command.CUSTOM_COMMAND_PROTOCOL_INFO,
+                {"protocol_version": 4, "flags": flags,
+                 "device_type": (4, 16, 1)})
+    nodeset.put(n, ts, command.CUSTOM_COMMAND_APPLICATION_UPDATE,
+                {"generic": 16, "specific": 1,
+                 "commands": [z.SwitchBinary, z.Meter, z.Version,
+                              z.ManufacturerSpecific, z.Association],
+                 "controls": [z.Basic]})
+    nodeset.put(n, ts, z.ManufacturerSpecific_Report,
+                {"manufacturer": 0x86, "type": 3, "product": 6})
+    nodeset.put(n, ts, z.Version_CommandClassReport,
+                {"class": z.Meter, "version": 3})
+    nodeset.put(n, ts, z.SwitchBinary_Report, {"level": 255})
+    nodeset.put(n, ts, z.Meter_Report,
+                {"value": {"type": 1, "unit": 0, "exp": 2, "rate": 1,
+                           "mantissa": [0, 0, 4, 210], "_value": 12.34}})
+    nodeset.put(n, ts, z.Association_Report,
+                {"group": 1, "count": 5, "seq": 0, "nodes": [1, 3]})
+    nodeset.put(n, ts, z.Security2_NetworkKeyReport,
+                {"keys": 1, "key": b"\x00\x01\xff"})
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "pyzwaver.snapshot")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_encoding(self):
+        x = {"a": (1, (2, 3)), "b": {"x", "y"}, "c": b"\x00\xff",
+             "d": {(1, 0): [1, 2], 7: None}, "e": [1.5, "s", True],
+             (50, 2): {}}
+        line = snapshot.Encode(x)
+        self.assertNotIn("\n", line)
+        self.assertEqual(snapshot.Decode(line), x)
+
+    def test_roundtrip(self):
+        for compact in [False, True]:
+            nodeset = Nodeset(CommandTranslator(FakeDriver()), 1,
+                              compact_values=compact)
+            Populate(nodeset, 5, 1000.0)
+            Populate(nodeset, 6, 1000.0, listening=False)
+            nodeset.GetNode(6).name = "Kitchen"
+            nodeset.put(7, 1000.0, z.Battery_Report, {"level": 80})
+            nodeset.SaveSnapshot(self.path)
+
+            driver = FakeDriver()
+            restored = Nodeset(CommandTranslator(driver), 1,
+                               compact_values=compact)
+            fresh, stale = restored.RestoreSnapshot(self.path, now=2000.0)
+            self.assertEqual((fresh, stale), ([5, 6], []))
+            self.assertEqual(sorted(restored.nodes), [5, 6, 7])
+            for n in [5, 6, 7]:
+                a = nodeset.nodes[n]
+                b = restored.nodes[n]
+                self.assertEqual(a.name, b.name)
+                self.assertEqual(a._controls, b._controls)
+                self.assertEqual(a.values._values, b.values._values)
+                self.assertEqual(dict(a.values._maps), dict(b.values._maps))
+                self.assertEqual(a.BasicString(), b.BasicString())
+            self.assertEqual(restored.nodes[5].state, NODE_STATE_INTERVIEWED)
+            self.assertEqual(restored.nodes[7].state, NODE_STATE_NONE)
+            # the sleeping node holds its refresh until it wakes up
+            self.assertEqual(restored.nodes[6].mailbox.listening, False)
+            self.assertGreater(restored.nodes[6].mailbox.Held(), 0)
+            self.assertEqual({m.node for m in driver.history}, {5})
+            # only dynamic values are refreshed
+            for m in driver.history:
+                self.assertNotEqual(m.payload[6:8], bytes(z.ManufacturerSpecific_Get))
+
+    def test_stale(self):
+        nodeset = Nodeset(CommandTranslator(FakeDriver()), 1)
+        Populate(nodeset, 5, 1000.0)
+        Populate(nodeset, 6, 1000.0 + 8 * DAY)
+        nodeset.SaveSnapshot(self.path)
+        driver = FakeDriver()
+        restored = Nodeset(CommandTranslator(driver), 1)
+        fresh, stale = restored.RestoreSnapshot(self.path, now=1000.0 + 9 * DAY)
+        self.assertEqual((fresh, stale), ([6], [5]))
+        self.assertEqual(restored.nodes[5].state, NODE_STATE_DISCOVERED)
+        self.assertIn(bytes(z.ManufacturerSpecific_Get),
+                      [m.payload[6:8] for m in driver.history if m.node == 5])
+        # the interview completes with the next ManufacturerSpecific_Report
+        restored.put(5, 1000.0 + 9 * DAY, z.ManufacturerSpecific_Report,
+                     {"manufacturer": 0x86, "type": 3, "product": 6})
+        self.assertEqual(restored.nodes[5].state, NODE_STATE_INTERVIEWED)
+
+        restored = Nodeset(CommandTranslator(FakeDriver()), 1)
+        fresh, stale = restored.RestoreSnapshot(
+            self.path, StalenessPolicy(max_static_age=None), now=1e10)
+        self.assertEqual((fresh, stale), ([5, 6], []))
+
+    def test_filter_nodes(self):
+        nodeset = Nodeset(CommandTranslator(FakeDriver()), 1)
+        Populate(nodeset, 5, 1000.0)
+        Populate(nodeset, 6, 1000.0)
+        nodeset.SaveSnapshot(self.path)
+        driver = FakeDriver()
+        restored = Nodeset(CommandTranslator(driver), 1)
+        fresh, stale = restored.RestoreSnapshot(self.path, now=2000.0,
+                                                nodes={1, 6})
+        self.assertEqual((fresh, stale), ([6], []))
+        self.assertEqual(sorted(restored.nodes), [6])
+        self.assertEqual({m.node for m in driver.history}, {6})
+
+    def test_bad_version(self):
+        with open(self.path, "w") as fp:
+            fp.write('{"version":1000,"ts":0}\n')
+        nodeset = Nodeset(CommandTranslator(FakeDriver()), 1)
+        self.assertRaises(ValueError, nodeset.RestoreSnapshot, self.path)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+timer_service_test.py checks ordering, cancellation and the counters
+of the TimerService.
+"""
+
+import threading
+import time
+import unittest
+
+from pyzwaver.timer_service import TimerService
+
+
+class TestTimerService(unittest.TestCase):
+
+    def setUp(self):
+        self.timers = TimerService()
+
+    def tearDown(self):
+        self.timers.Terminate()
+
+    def test_order(self):
+        fired = []
+        done = threading.Event()
+        self.timers.Schedule(0.03, fired.append, 3)
+        self.timers.Schedule(0.01, fired.append, 1)
+        now = time.time()
+        # same deadline: fire in scheduling order
+        self.timers.ScheduleAt(now + 0.02, fired.append, 2)
+        self.timers.ScheduleAt(now + 0.02, fired.append, 22)
+        self.timers.Schedule(0.04, done.set)
+        self.assertTrue(done.wait(1.0))
+        self.assertEqual(fired, [1, 2, 22, 3])
+        self.assertEqual(self.timers.scheduled, 5)
+        self.assertEqual(self.timers.fired, 5)
+        self.assertEqual(self.timers.Pending(), 0)
+
+    def test_cancel(self):
+        fired = []
+        done = threading.Event()
+        t = self.timers.Schedule(0.01, fired.append, 1)
+        t2 = self.timers.Schedule(0.02, fired.append, 2)
+        self.timers.Cancel(t)
+        # cancelling twice is harmless
+        self.timers.Cancel(t)
+        self.timers.Schedule(0.03, done.set)
+        self.assertTrue(done.wait(1.0))
+        self.assertEqual(fired, [2])
+        self.assertEqual(self.timers.cancelled, 1)
+        self.assertEqual(self.timers.fired, 2)
+        # cancelling a timer which has fired already is a no-op
+        self.timers.Cancel(t2)
+        self.assertEqual(self.timers.cancelled, 1)
+
+    def test_failing_callback(self):
+        done = threading.Event()
+        self.timers.Schedule(0.0, lambda: 1 / 0)
+        self.timers.Schedule(0.01, done.set)
+        self.assertTrue(done.wait(1.0))
+        self.assertEqual(self.timers.fired, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+value_change_test.py checks that Nodeset listeners are only notified
+about commands which changed a cached value.
+"""
+
+import logging
+import unittest
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import Nodeset, NodeValues
+
+
+class FakeDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+class ChangeListener(object):
+
+    def __init__(self):
+        self.changes = []
+
+    def put(self, n, ts, key, change):
+        self.changes.append((n, ts, key, change.subkey, change.old, change.new))
+
+
+def SensorReport(kind, unit, value):
+    return {"type": kind, "value": {"exp": 1, "unit": unit, "_value": value,
+                                    "mantissa": [int(value * 10)]}}
+
+
+class TestValueChange(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = ChangeListener()
+
+    def MakeNodeset(self, compact=False, deadbands=None):
+        nodeset = Nodeset(CommandTranslator(FakeDriver()), 1,
+                          compact_values=compact, deadbands=deadbands)
+        nodeset.AddListener(self.listener)
+        return nodeset
+
+    def test_duplicates(self):
+        for compact in [False, True]:
+            self.listener.changes.clear()
+            nodeset = self.MakeNodeset(compact)
+            nodeset.put(5, 1.0, z.SwitchBinary_Report, {"level": 0})
+            nodeset.put(5, 2.0, z.SwitchBinary_Report, {"level": 0})
+            nodeset.put(5, 3.0, z.SwitchBinary_Report, {"level": 255})
+            nodeset.put(5, 4.0, z.Battery_Report, {"level": 90})
+            nodeset.put(5, 5.0, z.Battery_Report, {"level": 90})
+            self.assertEqual(self.listener.changes, [
+                (5, 1.0, z.SwitchBinary_Report, None, None, {"level": 0}),
+                (5, 3.0, z.SwitchBinary_Report, None, {"level": 0},
+                 {"level": 255}),
+                (5, 4.0, z.Battery_Report, None, None, {"level": 90}),
+            ])
+            # the cache still has the latest timestamp
+            self.assertEqual(nodeset.nodes[5].values._values[z.Battery_Report][0], 5.0)
+
+    def test_map_entries(self):
+        nodeset = self.MakeNodeset()
+        nodeset.put(5, 1.0, z.SensorMultilevel_Report, SensorReport(1, 0, 20.0))
+        nodeset.put(5, 2.0, z.SensorMultilevel_Report, SensorReport(5, 0, 40.0))
+        nodeset.put(5, 3.0, z.SensorMultilevel_Report, SensorReport(1, 0, 20.0))
+        nodeset.put(5, 4.0, z.SensorMultilevel_Report, SensorReport(1, 0, 20.1))
+        self.assertEqual([c[1:4] for c in self.listener.changes], [
+            (1.0, z.SensorMultilevel_Report, (1, 0)),
+            (2.0, z.SensorMultilevel_Report, (5, 0)),
+            (4.0, z.SensorMultilevel_Report, (1, 0)),
+        ])
+        self.assertEqual(self.listener.changes[-1][4]["_value"], 20.0)
+        self.assertEqual(self.listener.changes[-1][5]["_value"], 20.1)
+
+    def test_deadband(self):
+        nodeset = self.MakeNodeset(
+            deadbands={z.SensorMultilevel_Report: 0.5,
+                       (z.SensorMultilevel_Report, (5, 0)): 5.0})
+        for i, v in enumerate([20.0, 20.2, 20.4, 20.6, 20.6, 20.0, 19.9]):
+            nodeset.put(5, float(i), z.SensorMultilevel_Report,
+                        SensorReport(1, 0, v))
+        for i, v in enumerate([40.0, 43.0, 46.0]):
+            nodeset.put(5, 10.0 + i, z.SensorMultilevel_Report,
+                        SensorReport(5, 0, v))
+        got = [(c[1], c[3], c[4] and c[4]["_value"], c[5]["_value"])
+               for c in self.listener.changes]
+        # slow drift is reported relative to the last reported value
+        self.assertEqual(got, [
+            (0.0, (1, 0), None, 20.0),
+            (3.0, (1, 0), 20.0, 20.6),
+            (5.0, (1, 0), 20.6, 20.0),
+            (10.0, (5, 0), None, 40.0),
+            (12.0, (5, 0), 40.0, 46.0),
+        ])
+        # but the cache always has the latest reading
+        self.assertEqual(nodeset.nodes[5].values.Sensors()[0][-1], 19.9)
+
+    def test_no_listener(self):
+        values = NodeValues()
+        self.assertIsNotNone(values.Set(1.0, z.Battery_Report, {"level": 1}))
+        self.assertIsNone(values.Set(2.0, z.Battery_Report, {"level": 1}))
+        self.assertIsNone(values.Set(3.0, z.Battery_Report, None))
+        nodeset = Nodeset(CommandTranslator(FakeDriver()), 1)
+        nodeset.AddListener(self.listener)
+        node_info = {"generic": 16, "specific": 1, "controls": [],
+                     "commands": [z.SwitchBinary]}
+        for ts in [1.0, 2.0]:
+            nodeset.put(6, ts, command.CUSTOM_COMMAND_APPLICATION_UPDATE,
+                        node_info)
+        self.assertEqual(len(self.listener.changes), 1)
+        self.assertEqual(self.listener.changes[0][2],
+                         command.CUSTOM_COMMAND_APPLICATION_UPDATE)
+        self.assertNotIn(None, nodeset.nodes[6].put(
+            3.0, command.CUSTOM_COMMAND_APPLICATION_UPDATE, node_info))
+        node = nodeset.GetNode(5)
+        self.assertEqual(len(node.put(1.0, z.Battery_Report, {"level": 1})), 1)
+        self.assertEqual(node.put(2.0, z.Battery_Report, {"level": 1}), [])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
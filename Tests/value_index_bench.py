@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+value_index_bench.py measures fleet-wide queries ("all batteries below
+20%", "all power readings") over a synthetic network by iterating over
+all nodes and via the ValueIndex of the Nodeset. It also reports the
+cost of maintaining the index when storing reports.
+"""
+
+import logging
+import sys
+import time
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import Nodeset
+from pyzwaver.value import SENSOR_KIND_BATTERY, SENSOR_KIND_ELECTRIC
+
+NODES = range(2, 202)
+ROUNDS = 200
+REPEATS = 5
+
+
+class NullDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+def Reports(n, ts):
+    """A plausible set of reports: every node has a few sensors and
+    a configuration, every 4th is a battery device, every 3rd a meter"""
+    out = [
+        (z.SwitchBinary_Report, {"level": 255 * (n % 2)}),
+        (z.Configuration_Report, {"parameter": 1, "size": 1, "value": n}),
+        (z.SensorMultilevel_Report,
+         {"type": 1, "value": {"exp": 0, "unit": 0, "mantissa": [20],
+                               "_value": 20 + ts % 3}}),
+    ]
+    if n % 4 == 0:
+        out.append((z.Battery_Report, {"level": n % 100}))
+    if n % 3 == 0:
+        for unit in [0, 2, 4, 5]:
+            out.append((z.Meter_Report,
+                        {"value": {"type": 1, "unit": unit, "exp": 0,
+                                   "rate": 1, "mantissa": [n],
+                                   "_value": n + ts % 7}}))
+    return out
+
+
+def MakeNodeset(indexed):
+    nodeset = Nodeset(CommandTranslator(NullDriver()), 1)
+    if not indexed:
+        nodeset.index = None
+    for n in NODES:
+        nodeset.put(n, 0.0, command.CUSTOM_COMMAND_APPLICATION_UPDATE,
+                    {"generic": 16, "specific": 1, "controls": [],
+                     "commands": [z.SwitchBinary, z.Battery, z.Meter]})
+    return nodeset
+
+
+def BruteForce(nodeset):
+    low = []
+    power = []
+    for n, node in nodeset.nodes.items():
+        for _, kind, _, val in node.values.MiscSensors():
+            if kind == SENSOR_KIND_BATTERY and val < 20:
+                low.append(n)
+        for subkey, kind, unit, val in node.values.Meters():
+            if kind == SENSOR_KIND_ELECTRIC and unit == "W":
+                power.append((n, subkey, val))
+    return low, power
+
+
+def Indexed(nodeset):
+    low = [x[0] for x in nodeset.Readings(SENSOR_KIND_BATTERY) if x[3] < 20]
+    power = [(n, subkey, val) for n, _, subkey, val in
+             nodeset.Readings(SENSOR_KIND_ELECTRIC, "W")]
+    return low, power
+
+
+def Best(fun, *args):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fun(*args)
+        t = time.perf_counter() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+
+def Store(nodeset, reports):
+    for ts in range(10):
+        for n, key, values in reports:
+            nodeset.put(n, float(ts), key, values)
+
+
+def Query(fun, nodeset):
+    for _ in range(ROUNDS):
+        fun(nodeset)
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    reports = [(n, key, values) for n in NODES for key, values in Reports(n, 0)]
+    plain = MakeNodeset(False)
+    indexed = MakeNodeset(True)
+    Store(plain, reports)
+    Store(indexed, reports)
+    assert sorted(BruteForce(indexed)[1]) == sorted(Indexed(indexed)[1])
+
+    t_plain = Best(Store, plain, reports)
+    t_indexed = Best(Store, indexed, reports)
+    print("nodes: %d  reports: %d" % (len(NODES), 10 * len(reports)))
+    print("%-12s %9.0f reports/sec" % ("store", 10 * len(reports) / t_plain))
+    print("%-12s %9.0f reports/sec  (%.2fx)" % (
+        "store+index", 10 * len(reports) / t_indexed, t_plain / t_indexed))
+
+    t_brute = Best(Query, BruteForce, indexed)
+    t_index = Best(Query, Indexed, indexed)
+    print("%-12s %9.0f queries/sec" % ("iterate", ROUNDS / t_brute))
+    print("%-12s %9.0f queries/sec  (%.2fx)" % (
+        "index", ROUNDS / t_index, t_brute / t_index))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+value_index_test.py checks the fleet-wide queries of Nodeset against
+iterating over all nodes.
+"""
+
+import logging
+import os
+import tempfile
+import unittest
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.node import Nodeset
+from pyzwaver.value import SENSOR_KIND_BATTERY, SENSOR_KIND_ELECTRIC, \
+    SENSOR_KIND_TEMPERATURE
+
+
+class FakeDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+def MeterReport(unit, value):
+    return {"value": {"type": 1, "unit": unit, "exp": 0, "rate": 1,
+                      "mantissa": [value], "_value": value}}
+
+
+def SensorReport(kind, unit, value):
+    return {"type": kind, "value": {"exp": 0, "unit": unit, "_value": value,
+                                    "mantissa": [value]}}
+
+
+def MakeNodeset():
+    nodeset = Nodeset(CommandTranslator(FakeDriver()), 1)
+    for n in range(2, 30):
+        nodeset.put(n, 1.0, command.CUSTOM_COMMAND_APPLICATION_UPDATE,
+                    {"generic": 16, "specific": 1, "controls": [],
+                     "commands": [z.Battery] if n % 2 else [z.Meter]})
+        if n % 2:
+            nodeset.put(n, 2.0, z.Battery_Report, {"level": 3 * n})
+            nodeset.put(n, 2.0, z.SensorMultilevel_Report,
+                        SensorReport(1, 0, n))
+        else:
+            nodeset.put(n, 2.0, z.Meter_Report, MeterReport(0, n))
+            nodeset.put(n, 2.0, z.Meter_Report, MeterReport(2, 10 * n))
+    return nodeset
+
+
+def BruteForce(nodeset, kind, unit=None):
+    out = []
+    for n, node in nodeset.nodes.items():
+        values = node.values
+        for key, k, u, val in values.MiscSensors():
+            if k == kind and unit in (None, u):
+                out.append((n, key, None, val))
+        for subkey, k, u, val in values.Sensors():
+            if k == kind and unit in (None, u):
+                out.append((n, z.SensorMultilevel_Report, subkey, val))
+        for subkey, k, u, val in values.Meters():
+            if k == kind and unit in (None, u):
+                out.append((n, z.Meter_Report, subkey, val))
+    return sorted(out)
+
+
+class TestValueIndex(unittest.TestCase):
+
+    def test_readings(self):
+        nodeset = MakeNodeset()
+        for kind, unit in [(SENSOR_KIND_BATTERY, None),
+                           (SENSOR_KIND_ELECTRIC, None),
+                           (SENSOR_KIND_ELECTRIC, "W"),
+                           (SENSOR_KIND_ELECTRIC, "kWh"),
+                           (SENSOR_KIND_TEMPERATURE, "C"),
+                           (SENSOR_KIND_TEMPERATURE, "F")]:
+            self.assertEqual(sorted(nodeset.Readings(kind, unit)),
+                             BruteForce(nodeset, kind, unit))
+        low = [x[0] for x in nodeset.Readings(SENSOR_KIND_BATTERY) if x[3] < 20]
+        self.assertEqual(low, [3, 5])
+        # values are current
+        nodeset.put(3, 3.0, z.Battery_Report, {"level": 100})
+        low = [x[0] for x in nodeset.Readings(SENSOR_KIND_BATTERY) if x[3] < 20]
+        self.assertEqual(low, [5])
+        self.assertEqual(nodeset.Readings("Gas"), [])
+
+    def test_nodes(self):
+        nodeset = MakeNodeset()
+        self.assertEqual(nodeset.NodesWithValue(z.Meter_Report),
+                         list(range(2, 30, 2)))
+        self.assertEqual(nodeset.NodesWithValue(z.Alarm_Report), [])
+        for cls in [z.Battery, z.Meter, z.Basic, z.Alarm]:
+            self.assertEqual(
+                sorted(nodeset.NodesWithCommandClass(cls)),
+                [n for n, node in sorted(nodeset.nodes.items())
+                 if node.values.HasCommandClass(cls)])
+        # version 0 means not supported
+        nodeset.put(2, 3.0, z.Version_CommandClassReport,
+                    {"class": z.Meter, "version": 0})
+        self.assertNotIn(2, nodeset.NodesWithCommandClass(z.Meter))
+        nodeset.put(2, 3.0, z.Version_CommandClassReport,
+                    {"class": z.Meter, "version": 3})
+        self.assertIn(2, nodeset.NodesWithCommandClass(z.Meter))
+
+        nodeset.DropNode(2)
+        self.assertNotIn(2, nodeset.NodesWithValue(z.Meter_Report))
+        self.assertNotIn(2, nodeset.NodesWithCommandClass(z.Meter))
+        self.assertNotIn(2, [x[0] for x in nodeset.Readings(SENSOR_KIND_ELECTRIC)])
+
+    def test_snapshot(self):
+        nodeset = MakeNodeset()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "snapshot")
+            nodeset.SaveSnapshot(path)
+            restored = Nodeset(CommandTranslator(FakeDriver()), 1)
+            restored.RestoreSnapshot(path)
+        self.assertEqual(sorted(restored.Readings(SENSOR_KIND_ELECTRIC)),
+                         sorted(nodeset.Readings(SENSOR_KIND_ELECTRIC)))
+        self.assertEqual(sorted(restored.NodesWithCommandClass(z.Battery)),
+                         sorted(nodeset.NodesWithCommandClass(z.Battery)))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+value_memory_bench.py measures the memory needed to cache 10k parsed
+values in NodeValues with the plain dicts from command.ParseCommand and
+with compact Records (see record.py).
+
+The values are the commands from TestData/commands.input.txt (cycled)
+with their nested values freshly parsed for every entry.
+"""
+
+import logging
+import os
+import sys
+import tracemalloc
+
+from pyzwaver import command
+from pyzwaver import zwave as z
+from pyzwaver.node import NodeValues
+
+INPUT = os.path.join(os.path.dirname(__file__), "..", "TestData",
+                     "commands.input.txt")
+COUNT = 10000
+
+
+def ParseToken(t):
+    if t == "SOF":
+        return z.SOF
+    if t == "REQU":
+        return z.REQUEST
+    if t == "RESP":
+        return z.RESPONSE
+    if ":" in t:
+        return int(t.split(":", 1)[1], 16)
+    return int(t, 16)
+
+
+def LoadCommands():
+    out = []
+    with open(INPUT) as fp:
+        for line in fp:
+            token = line.split()
+            if not token or line.startswith("#"):
+                continue
+            m = bytes(ParseToken(t) for t in token)
+            if m[3] == z.API_APPLICATION_COMMAND_HANDLER:
+                out.append(command.MaybePatchCommand(m[7:7 + m[6]]))
+    return out
+
+
+def Measure(compact, commands):
+    """Returns the bytes allocated for COUNT cached values"""
+    tracemalloc.start()
+    values = NodeValues(compact)
+    for i in range(COUNT):
+        data = commands[i % len(commands)]
+        values.SetMapEntry(float(i), (data[0], data[1]), i,
+                           command.ParseCommand(data))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    commands = LoadCommands()
+    # warm up the codec and record class caches
+    Measure(True, commands)
+    plain = Measure(False, commands)
+    compact = Measure(True, commands)
+    print("values: %d (from %d distinct commands)" % (COUNT, len(commands)))
+    print("%-8s %8.0f kB  %5.0f bytes/value" % ("dicts", plain / 1024,
+                                                plain / COUNT))
+    print("%-8s %8.0f kB  %5.0f bytes/value  (%.0f%%)" % (
+        "records", compact / 1024, compact / COUNT, 100.0 * compact / plain))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+value_series_test.py checks the ValueSeries ring buffer and the time
+series NodeValues records for commands with a SeriesPolicy.
+"""
+
+import logging
+import unittest
+
+from pyzwaver import zwave as z
+from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.history import SeriesPolicy, ValueSeries
+from pyzwaver.node import Nodeset, DEFAULT_SERIES_POLICIES
+
+
+class FakeDriver(object):
+
+    def AddListener(self, l):
+        pass
+
+    def SendMessage(self, m):
+        pass
+
+
+def MeterReport(kwh):
+    mantissa = int(kwh * 100)
+    return {"value": {"type": 1, "unit": 0, "exp": 2, "rate": 1,
+                      "mantissa": list(mantissa.to_bytes(4, "big")),
+                      "_value": kwh}}
+
+
+class TestValueSeries(unittest.TestCase):
+
+    def test_wrap(self):
+        s = ValueSeries(SeriesPolicy(capacity=4))
+        for i in range(10):
+            s.Append(float(i), i * 10.0)
+        self.assertEqual(len(s), 4)
+        self.assertEqual(s.total, 10)
+        self.assertEqual(s.Last(), [(6.0, 60.0), (7.0, 70.0),
+                                    (8.0, 80.0), (9.0, 90.0)])
+        self.assertEqual(s.Last(1), [(9.0, 90.0)])
+        self.assertEqual(s.Range(7.0, 8.5), [(7.0, 70.0), (8.0, 80.0)])
+        self.assertEqual(s.Range(start=8.0), [(8.0, 80.0), (9.0, 90.0)])
+        self.assertEqual(s.Range(end=2.0), [])
+        self.assertEqual(s.Latest(), (9.0, 90.0))
+
+    def test_resolution(self):
+        s = ValueSeries(SeriesPolicy(capacity=100, resolution=60.0))
+        for t, v in [(0, 1), (10, 2), (59, 3), (60, 4), (130, 5), (170, 6)]:
+            s.Append(float(t), float(v))
+        # one sample per minute, the latest in each minute wins
+        self.assertEqual(s.Last(), [(59.0, 3.0), (60.0, 4.0), (170.0, 6.0)])
+
+    def test_max_age(self):
+        s = ValueSeries(SeriesPolicy(capacity=100, max_age=100.0))
+        for t in range(0, 500, 10):
+            s.Append(float(t), 1.0)
+        self.assertEqual(s.Range()[0][0], 390.0)
+        self.assertEqual(len(s), 11)
+        self.assertEqual(ValueSeries(SeriesPolicy()).Latest(), None)
+
+
+class TestNodeValuesSeries(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        nodeset = Nodeset(CommandTranslator(FakeDriver()), 1)
+        nodeset.put(12, 100.0, z.Battery_Report, {"level": 80})
+        self.assertEqual(nodeset.nodes[12].values.SeriesKeys(), [])
+        self.assertEqual(nodeset.History(12, z.Battery_Report), [])
+
+    def test_history(self):
+        for compact in [False, True]:
+            nodeset = Nodeset(CommandTranslator(FakeDriver()), 1,
+                              compact_values=compact,
+                              series_policies=DEFAULT_SERIES_POLICIES)
+            day = 24 * 3600.0
+            now = 10 * day
+            for i in range(3 * 24):
+                ts = now - 2 * day + i * 3600.0
+                nodeset.put(12, ts, z.Meter_Report, MeterReport(i / 4))
+                nodeset.put(12, ts, z.Battery_Report, {"level": 100 - i})
+            # not tracked
+            nodeset.put(12, now, z.Version_Report, {"library": 3})
+            values = nodeset.nodes[12].values
+            self.assertEqual(sorted(values.SeriesKeys()),
+                             [(z.Meter_Report, (1, 0)), (z.Battery_Report, None)])
+            # retention is 24h for meters
+            kwh = nodeset.History(12, z.Meter_Report, (1, 0), start=now - day)
+            self.assertEqual(len(kwh), 24 + 1)
+            self.assertEqual(kwh[-1], (now + day - 3600.0, 71 / 4))
+            self.assertEqual(kwh[0], (now - 3600.0, 47 / 4))
+            battery = values.History(z.Battery_Report, start=now - 3600.0,
+                                     end=now)
+            self.assertEqual(battery, [(now - 3600.0, 53.0), (now, 52.0)])
+            self.assertEqual(nodeset.History(99, z.Battery_Report), [])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
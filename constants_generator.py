@@ -357,7 +357,10 @@ CMD_TO_STRING = {}
 SUBCMD_TO_PARSE_TABLE = {}
 
 _ALLOWED_PARAMETER_FORMATS = {
-    "3{XXX}",  # 24bit
+    "3{default}",  # 24bit
+    "3{max}",
+    "3{min}",
+    "3{step}",
     "A{code}",
     "A{name}",
     "A{commands}",
@@ -712,7 +715,7 @@ C("WakeUp", 0x84,
   Notification=(0x07, ""),
   NoMoreInformation=(0x08, ""),
   IntervalCapabilitiesGet=(0x09, ""),
-  IntervalCapabilitiesReport=(0x0a, "3{XXX},3{XXX},3{XXX},3{XXX}"))
+  IntervalCapabilitiesReport=(0x0a, "3{min},3{max},3{default},3{step}"))
 
 C("Association", 0x85,
   Set=(0x1, "B{group},L{nodes}"),
@@ -791,7 +794,7 @@ C("Security2", 0x9f,
   KexFail=(0x07, "B{type}"),
   PublicKeyReport=(0x08, "B{mode},L{key}"),
   NetworkKeyGet=(0x09, "B{key}"),
-  NetworkKeyReport=(0x0a, "B{key},L{key}"),
+  NetworkKeyReport=(0x0a, "B{keys},L{key}"),
   NetworkKeyVerify=(0x0b, ""),
   TransferEnd=(0x0c, "B{mode}"),
   CommandsSupportedGet=(0x0d, ""),
@@ -991,13 +994,73 @@ def GetGenericCommands(generic):
 ############################################################
 #
 ############################################################
+# sequence: container for the (immutable) tables, python uses tuples
+# so that they become constants of the compiled module
 FORMAT = collections.namedtuple(
-    "FORMAT", ['comment', 'final', 'constint', 'terminator'])
+    "FORMAT", ['comment', 'final', 'constint', 'terminator', 'sequence'])
 
 DART_FORMAT = FORMAT(comment="// ", final="final ",
-                     constint="const int ", terminator=";")
+                     constint="const int ", terminator=";", sequence=list)
 
-PYTHON_FORMAT = FORMAT(comment="# ", final="", constint="", terminator="")
+PYTHON_FORMAT = FORMAT(comment="# ", final="", constint="", terminator="",
+                       sequence=tuple)
+
+# Python only: these are built on first use (PEP 562) as not every user
+# of the module needs them.
+# The SUBCMD_* tables are flat tuples indexed by cls * 256 + sub so that the
+# hot paths can do a plain index operation instead of a dict probe.
+_PYTHON_LAZY_MAPS = '''
+def _MakeStringToSubcmd():
+    return {v: k for k, v in SUBCMD_TO_STRING.items()}
+
+
+def _MakeFlatTable(d, default):
+    out = [default] * 65536
+    for k, v in d.items():
+        out[k] = v
+    return tuple(out)
+
+
+_LAZY_MAPS = {
+    "STRING_TO_SUBCMD": _MakeStringToSubcmd,
+    "SUBCMD_NAMES": lambda: _MakeFlatTable(SUBCMD_TO_STRING, None),
+    "SUBCMD_PARSE_TABLES": lambda: _MakeFlatTable(SUBCMD_TO_PARSE_TABLE, None),
+    "SUBCMD_FLAGS": lambda: _MakeFlatTable(SUBCMD_TO_FLAGS, 0),
+}
+
+
+def __getattr__(name):
+    make = _LAZY_MAPS.get(name)
+    if make is None:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    value = make()
+    globals()[name] = value
+    return value
+
+'''
+
+SUBCMD_FLAG_GET = 1
+SUBCMD_FLAG_REPORT = 2
+SUBCMD_FLAG_SECURITY = 4
+
+_SUBCMD_FLAG_NAMES = [
+    (SUBCMD_FLAG_GET, "SUBCMD_FLAG_GET"),
+    (SUBCMD_FLAG_REPORT, "SUBCMD_FLAG_REPORT"),
+    (SUBCMD_FLAG_SECURITY, "SUBCMD_FLAG_SECURITY"),
+]
+
+
+def SubCommandFlags(k):
+    flags = 0
+    name = SUBCMD_TO_STRING[k]
+    if name.endswith("Get"):
+        flags |= SUBCMD_FLAG_GET
+    if name.endswith("Report"):
+        flags |= SUBCMD_FLAG_REPORT
+    if CMD_TO_STRING[k[0]] in ("Security", "Security2"):
+        flags |= SUBCMD_FLAG_SECURITY
+    return flags
 
 
 def DumpDartConstants(fmt: FORMAT, string_maps=True):
@@ -1079,11 +1142,25 @@ def DumpDartConstants(fmt: FORMAT, string_maps=True):
             DumpDictEntry4(k[0] * 256 + k[1], v)
         print("}" + fmt.terminator)
 
-        print("")
-        print(fmt.final + "STRING_TO_SUBCMD = {")
-        for k, v in sorted(SUBCMD_TO_STRING.items()):
-            print("    '%s': 0x%04x," % (v, k[0] * 256 + k[1]))
-        print("}" + fmt.terminator)
+        if fmt.sequence is tuple:
+            print("")
+            for v, name in _SUBCMD_FLAG_NAMES:
+                print("%s = %d" % (name, v))
+            print("")
+            print("SUBCMD_TO_FLAGS = {")
+            for k in sorted(SUBCMD_TO_STRING.keys()):
+                flags = SubCommandFlags(k)
+                if flags:
+                    print("    0x%04x: %d,  # %s" %
+                          (k[0] * 256 + k[1], flags, SUBCMD_TO_STRING[k]))
+            print("}")
+            print(_PYTHON_LAZY_MAPS, end="")
+        else:
+            print("")
+            print(fmt.final + "STRING_TO_SUBCMD = {")
+            for k, v in sorted(SUBCMD_TO_STRING.items()):
+                print("    '%s': 0x%04x," % (v, k[0] * 256 + k[1]))
+            print("}" + fmt.terminator)
 
     print("")
     print(fmt.final + "GENERIC_SPECIFIC_DB = {")
@@ -1138,8 +1215,12 @@ def DumpDartConstants(fmt: FORMAT, string_maps=True):
             if mapped not in ALLOWED_MAPPED:
                 print("%x %s" % (mapped, CMD_TO_STRING.get(mapped)))
                 assert False
-        print("    0x%04x: ['%s', %s, %s, 0x%02x]," %
-              (k[0] * 256 + k[1], v[0], cmd, cntrl, mapped))
+        entry = "'%s', %s, %s, 0x%02x" % (
+            v[0], fmt.sequence(cmd), fmt.sequence(cntrl), mapped)
+        if fmt.sequence is tuple:
+            print("    0x%04x: (%s)," % (k[0] * 256 + k[1], entry))
+        else:
+            print("    0x%04x: [%s]," % (k[0] * 256 + k[1], entry))
     print("}" + fmt.terminator)
 
     print("")
@@ -1153,7 +1234,7 @@ def DumpDartConstants(fmt: FORMAT, string_maps=True):
                   CMD_TO_STRING[last] + " (0x%02x = %d)" % (last, last))
         subcmd = SUBCMD_TO_STRING.get((k[0], k[1]), "").split("_")[-1]
         key = k[0] * 256 + k[1]
-        s = "    0x%04x: %s," % (key, v)
+        s = "    0x%04x: %s," % (key, fmt.sequence(v))
         print("%s  %s%s (%d)" % (s, fmt.comment, subcmd, k[1]))
     print("}" + fmt.terminator)
 
@@ -24,6 +24,10 @@ zwave_out/<home-id>/<node-number>/<command> json-payload
 topic format for incoming messages is
 zwave_in/<home-id>/<node-number>/<command> json-payload
 
+topic format for changes of node values (only published when the
+value differs from the previous one) is
+zwave_changed/<home-id>/<node-number>/<command> {"subkey": ..., "old": ..., "new": ...}
+
 to send a command to the proxy use something like:
 mosquitto_pub -h <mqtt-broker> -t zwave_out/<home-id>/<node-num>/Basic_Set -m '{"level": 255}'
 
@@ -43,7 +47,8 @@ from pyzwaver.controller import Controller
 from pyzwaver.driver import Driver, MakeSerialDevice
 from pyzwaver.command_translator import CommandTranslator
 from pyzwaver import command
-from pyzwaver.node import Nodeset, XMIT_OPTIONS
+from pyzwaver.node import Nodeset, ValueChange, XMIT_OPTIONS
+from pyzwaver.record import Record
 from pyzwaver.zwave import STRING_TO_SUBCMD
 from pyzwaver.zmessage import NodePriorityHi
 
@@ -68,11 +73,13 @@ class MyFormatter(logging.Formatter):
             record.msg % record.args)
 
 
-# json does not by default handle bytes, set
+# json does not by default handle bytes, set, Record
 class PythonObjectEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, set):
-            return list(set)
+            return list(obj)
+        elif isinstance(obj, Record):
+            return obj.ToDict()
         elif isinstance(obj, bytes):
             return "".join(map(chr, obj))
         return json.JSONEncoder.default(self, obj)
@@ -94,6 +101,23 @@ class EventListener(object):
             json.dumps(values, cls=PythonObjectEncoder))
 
 
+class ChangeListener(object):
+    """Registered with the Nodeset, only sees values which changed"""
+
+    def __init__(self, home_id, mqtt_client: mqtt.Client):
+        self._home_id = home_id
+        self._mqtt_client = mqtt_client
+
+    def put(self, n, _ts, key, change: ValueChange):
+        if key[0] is None or command.IsCustom(key):
+            return
+        name = command.StringifyCommand(key)
+        self._mqtt_client.publish(
+            "zwave_changed/%d/%d/%s" % (self._home_id, n, name),
+            json.dumps({"subkey": change.subkey, "old": change.old,
+                        "new": change.new}, cls=PythonObjectEncoder))
+
+
 def main():
     global driver, controller, translator, nodeset
 
@@ -114,6 +138,9 @@ def main():
     parser.add_argument('--verbosity', type=int,
                         default=30,  # = logging.WARNING
                         help='Lower numbers mean more verbosity')
+    parser.add_argument('--pipeline_depth', type=int,
+                        default=4,
+                        help='how many controller local queries (e.g. routing info) may be in flight at the same time')
 
     args = parser.parse_args()
     # note: this makes sure we have at least one handler
@@ -126,7 +153,7 @@ def main():
     logging.warning("opening serial: [%s]", args.serial_port)
     device = MakeSerialDevice(args.serial_port)
 
-    driver = Driver(device)
+    driver = Driver(device, args.pipeline_depth)
 
     logging.warning("controller initializing")
     controller = Controller(driver, pairing_timeout_secs=60)
@@ -143,7 +170,7 @@ def main():
         logging.warning("Initialized MQTT client")
         logging.warning("Pinging %d nodes", len(controller.nodes))
         for n in controller.nodes:
-            translator.Ping(n, 5, False, "initial")
+            nodeset.GetNode(n).Ping(5, False, "initial")
             time.sleep(0.5)
             client.subscribe("zwave_out/%d/#" % controller.props.home_id)
 
@@ -160,7 +187,9 @@ def main():
             n,
             tokens[3],
             msg.payload)
-        translator.SendCommand(n, key, values, NodePriorityHi(n), XMIT_OPTIONS)
+        # held until the node wakes up if it is sleeping
+        nodeset.GetNode(n).mailbox.SendCommand(
+            key, values, NodePriorityHi(n), XMIT_OPTIONS)
         # print(n, key, data)
 
     logging.info("Initializing MQTT client")
@@ -169,6 +198,7 @@ def main():
     client.on_message = on_message
 
     translator.AddListener(EventListener(controller.props.home_id, client))
+    nodeset.AddListener(ChangeListener(controller.props.home_id, client))
     client.connect(
         args.mqtt_broker_host,
         port=args.mqtt_broker_port,
@@ -39,7 +39,7 @@ import threading
 import time
 
 from pyzwaver.controller import Controller
-from pyzwaver.driver import Driver, MakeSerialDevice, MessageStatsString
+from pyzwaver.driver import Driver, MakeSerialDevice
 from pyzwaver.command_translator import CommandTranslator
 from pyzwaver import command
 from pyzwaver.node import Nodeset, NODE_STATE_NONE, NODE_STATE_DISCOVERED
@@ -157,7 +157,7 @@ class Screen(logging.Handler):
         i += self._printyx(i, 0, lines)
 
         i += self._titleyx(i, 0, "STATS")
-        lines = MessageStatsString(self.driver.History()).split("\n")
+        lines = str(self.driver.Stats()).split("\n")
         i += self._printyx(i, 0, lines)
 
         i = 1
@@ -187,7 +187,7 @@ def InitializeDevices(stdscr, driver, controller):
         screen = 0
     logging.info("Pinging %d nodes", len(controller.nodes))
     for n in controller.nodes:
-        translator.Ping(n, 5, False, "initial")
+        nodeset.GetNode(n).Ping(5, False, "initial")
         time.sleep(0.5)
 
     logging.info("Waiting for all nodes to be interviewed")
@@ -216,7 +216,7 @@ def InitializeDevices(stdscr, driver, controller):
             if node.IsInterviewed():
                 ready_nodes.add(n)
             elif node.state == NODE_STATE_NONE:
-                translator.Ping(n, 3, False, "undiscovered")
+                node.Ping(3, False, "undiscovered")
             elif node.state == NODE_STATE_DISCOVERED:
                 if driver.OutQueueSizeForNode(
                         n) < 10 and random.randint(0, 5) == 0:
@@ -238,6 +238,10 @@ def main():
                         default=logging.ERROR,
                         help='Lower numbers mean more verbosity')
 
+    parser.add_argument('--pipeline_depth', type=int,
+                        default=4,
+                        help='how many controller local queries (e.g. routing info) may be in flight at the same time')
+
     parser.add_argument(
         '--curses',
         default=False,
@@ -257,7 +261,7 @@ def main():
     logging.info("opening serial: [%s]", args.serial_port)
     device = MakeSerialDevice(args.serial_port)
 
-    driver = Driver(device)
+    driver = Driver(device, args.pipeline_depth)
     controller = Controller(driver, pairing_timeout_secs=60)
     controller.Initialize()
     success = controller.WaitUntilInitialized(2)
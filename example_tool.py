@@ -75,7 +75,7 @@ def InitController(args, update_routing=False) -> Tuple[Driver, Controller]:
     logging.info("opening serial: [%s]", args.serial_port)
     device = MakeSerialDevice(args.serial_port)
 
-    driver = Driver(device)
+    driver = Driver(device, args.pipeline_depth)
     controller = Controller(driver, pairing_timeout_secs=args.pairing_timeout_sec)
     controller.Initialize()
     controller.WaitUntilInitialized()
@@ -183,6 +183,9 @@ def main():
                         help='The USB serial device representing the Z-Wave controller stick. '
                              'Common settings are: dev/ttyUSB0, dev/ttyACM0')
 
+    parser.add_argument("--pipeline_depth", type=int, default=4,
+                        help="how many controller local queries (e.g. routing info) may be in flight at the same time")
+
     subparsers = parser.add_subparsers(help="sub-commands")
 
     s = subparsers.add_parser("pair", help="Pair a Z-wave node")
@@ -35,6 +35,7 @@ import json
 import logging
 import math
 import multiprocessing
+import os
 import random
 import shelve
 import sys
@@ -85,6 +86,22 @@ tornado.options.define("db",
                        type=str,
                        help="where state is persisted, e.g. node names, etc.")
 
+tornado.options.define("snapshot",
+                       default="",
+                       type=str,
+                       help="where node state is persisted to speed up restarts, " +
+                       "e.g. pyzwaver.snapshot (empty to disable)")
+
+tornado.options.define("snapshot_secs",
+                       default=600,
+                       type=int,
+                       help="seconds between snapshots of the node state")
+
+tornado.options.define("pipeline_depth",
+                       default=4,
+                       type=int,
+                       help="how many controller local queries (e.g. routing info) may be in flight at the same time")
+
 tornado.options.define("serial_port",
                        default="/dev/ttyUSB0",
                        # default="/dev/ttyACM0",
@@ -170,7 +187,7 @@ def GetRandomNodeToRefresh():
 
 
 class NodeUpdater(object):
-    """The NodeUpdater is registered with the TRANSLATOR and keeps
+    """The NodeUpdater is registered with the NODESET and keeps
     track of those node which have changed.
     Every second updates will be emitted for those changed nodes.
     """
@@ -203,7 +220,7 @@ class NodeUpdater(object):
             #logging.warning("refresh thread update: %d", n)
 
             if node.state < NODE_STATE_DISCOVERED:
-                TRANSLATOR.Ping(n, 3, False, "refresher")
+                node.Ping(3, False, "refresher")
             elif node.state < NODE_STATE_INTERVIEWED:
                 if random.random() < 0.1:
                     logging.warning("[%d] (%s) trigger static", n, node.state)
@@ -212,7 +229,7 @@ class NodeUpdater(object):
         except Exception as e:
             logging.error(e)
 
-    def put(self, n, _ts, _key, _values):
+    def put(self, n, _ts, _key, _change):
         # print ("got event ", n, _key, _values)
         # SendToSocket("E:[%d] %s" % (n, "@NO EVENT@"))
         if n not in self._nodes_to_update:
@@ -296,7 +313,7 @@ def RenderDriver(driver: Driver):
 
 def DriverLogs(driver: Driver):
     out = []
-    for t, sent, m, comment in driver._raw_history:
+    for t, sent, m, comment in driver.RawHistory():
         t = TimeFormatMs(t)
         d = sent and "=>" or "<="
         m = zmessage.PrettifyRawMessage(m)
@@ -306,9 +323,7 @@ def DriverLogs(driver: Driver):
 
 def DriverSlow(driver: Driver):
     out = []
-    for m in driver.History():
-        if not m.end:
-            continue
+    for m in sorted(driver.SlowestMessages(), key=lambda x: x.start):
         dur = int(1000.0 * (m.end - m.start))
         if dur < 300:
             continue
@@ -321,11 +336,7 @@ def DriverSlow(driver: Driver):
 
 def DriverBad(driver: Driver):
     out = []
-    for m in driver.History():
-        if not m.end:
-            continue
-        if not m.WasAborted():
-            continue
+    for m in driver.AbortedMessages():
         dur = int(1000.0 * (m.end - m.start))
         d = "%4d" % dur
         t = TimeFormatMs(m.start)
@@ -514,7 +525,7 @@ class NodeActionHandler(BaseHandler):
                 node.BatchCommandSubmitFilteredFast(ch.MultilevelSwitchSet(p))
             elif cmd == "ping":
                 # force it
-                TRANSLATOR.Ping(num, 3, True, "manual")
+                node.Ping(3, True, "manual")
             elif cmd == "refresh_static":
                 node.RefreshStaticValues()
             elif cmd == "refresh_semistatic":
@@ -749,7 +760,7 @@ def main():
     logging.info("opening serial")
     device = MakeSerialDevice(OPTIONS.serial_port)
 
-    DRIVER = Driver(device)
+    DRIVER = Driver(device, OPTIONS.pipeline_depth)
     CONTROLLER = Controller(
         DRIVER, pairing_timeout_secs=OPTIONS.pairing_timeout_secs)
     CONTROLLER.Initialize()
@@ -760,6 +771,16 @@ def main():
     TRANSLATOR = CommandTranslator(DRIVER)
     NODESET = Nodeset(TRANSLATOR, CONTROLLER.GetNodeId())
 
+    restored = []
+    if OPTIONS.snapshot and os.path.exists(OPTIONS.snapshot):
+        try:
+            # nodes removed from the network in the meantime are skipped
+            fresh, stale = NODESET.RestoreSnapshot(
+                OPTIONS.snapshot, nodes=CONTROLLER.nodes)
+            restored = fresh + stale
+        except Exception as e:
+            logging.error("cannot restore snapshot %s: %s", OPTIONS.snapshot, e)
+
     cp = CONTROLLER.props.product
     NODESET.put(
         CONTROLLER.GetNodeId(),
@@ -767,12 +788,21 @@ def main():
         z.ManufacturerSpecific_Report,
         {'manufacturer': cp[0], 'type': cp[1], 'product': cp[2]})
     for n in CONTROLLER.nodes:
-        TRANSLATOR.Ping(n, 3, False, "refresher")
+        # restored nodes are already being refreshed
+        if n not in restored:
+            NODESET.GetNode(n).Ping(3, False, "refresher")
     updater = NodeUpdater()
-    TRANSLATOR.AddListener(updater)
+    NODESET.AddListener(updater)
     logging.warning("listening on port %d", OPTIONS.port)
     application.listen(OPTIONS.port)
     tornado.ioloop.PeriodicCallback(updater.Periodic, 2000).start()
+    if OPTIONS.snapshot:
+        def SaveSnapshot():
+            NODESET.SaveSnapshot(OPTIONS.snapshot)
+
+        atexit.register(SaveSnapshot)
+        tornado.ioloop.PeriodicCallback(
+            SaveSnapshot, OPTIONS.snapshot_secs * 1000).start()
     tornado.ioloop.IOLoop.instance().start()
     return 0
 
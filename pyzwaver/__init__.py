@@ -1,20 +1,27 @@
 
-from . import command
-from . import command_helper
-from . import command_translator
-from . import controller
-from . import driver
-from . import node
-from . import value
-from . import zmessage
-from . import zwave
+# The submodules are imported on first access (PEP 562) so that e.g.
+# "from pyzwaver import zwave" does not pull in asyncio, serial, ...
 
-__all__ = ['command',
+__all__ = ['async_driver',
+           'command',
            'command_helper',
            'command_translator',
            'controller',
            'driver',
+           'history',
            'node',
+           'record',
+           'snapshot',
+           'timer_service',
            'value',
            'zmessage',
            'zwave']
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    # importing a submodule binds it in globals()
+    __import__(__name__ + "." + name)
+    return globals()[name]
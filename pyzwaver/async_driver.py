@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+async_driver.py contains an asyncio based alternative to driver.Driver
+which does not spawn any threads.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+from typing import Optional
+
+from pyzwaver import zmessage
+from pyzwaver.driver import MessageQueueOut, MessageStats
+from pyzwaver.history import MessageHistory, RawHistory
+
+
+async def MakeAsyncSerialDriver(loop, port="/dev/ttyUSB0"):
+    """
+    Opens the serial port via pyserial-asyncio and returns an AsyncDriver
+    attached to it.
+    """
+    # pyserial-asyncio is only needed if you use the AsyncDriver
+    import serial_asyncio
+    _, driver = await serial_asyncio.create_serial_connection(
+        loop, lambda: AsyncDriver(loop), port, baudrate=115200)
+    return driver
+
+
+class AsyncDriver(asyncio.Protocol):
+    """
+    AsyncDriver is a drop-in replacement for Driver for programs
+    built around an asyncio event loop (e.g. tornado).
+
+    It honors the same contract: outgoing messages are handed over via
+    SendMessage() and incoming messages are passed to the listeners
+    registered via AddListener().
+    Unlike Driver everything happens on the event loop:
+    * the serial transport invokes data_received() when bytes arrive
+    * a single task works through the outgoing queue and awaits the
+      completion of each message
+    * message timeouts are loop timers rather than threads
+    * listeners are invoked on the loop
+
+    Listeners must not block as they run on the event loop.
+    SendMessage() may be called from other threads, the message is then
+    handed over to the loop via call_soon_threadsafe().
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 history_capacity=10000, spill_path=None):
+        self._loop = loop or asyncio.get_event_loop()
+        self._transport = None
+        self._out_queue = MessageQueueOut()  # stuff being send to the stick
+        self._raw_history = RawHistory(history_capacity, spill_path)
+        # a message is copied into this once if makes it into _inflight.
+        self._history = MessageHistory(history_capacity)
+        self._stats = MessageStats()
+        self._listeners = []
+        self._frame_reader = zmessage.RawFrameReader()
+        self._inflight: Optional[zmessage.Message] = None
+        self._inflight_done: Optional[asyncio.Future] = None
+        # futures for callers awaiting the completion of specific messages
+        self._completions = {}
+        self._rtt = collections.defaultdict(zmessage.RttEstimator)
+        self._queue_not_empty = asyncio.Event()
+        self._sending_task = None
+        self._terminate = False
+
+    def __str__(self):
+        out = [str(self._out_queue),
+               "inflight: " + str(self._inflight),
+               str(self._frame_reader),
+               str(self._stats)]
+        return "\n".join(out)
+
+    # ============================================================
+    # asyncio.Protocol interface
+    # ============================================================
+    def connection_made(self, transport):
+        self._transport = transport
+        # Make sure we flush old stuff
+        for _ in range(3):
+            transport.write(zmessage.RAW_MESSAGE_NAK)
+        self._sending_task = self._loop.create_task(self._SendingTask())
+
+    def connection_lost(self, exc):
+        logging.warning("connection lost: %s", exc)
+        self._terminate = True
+        self._queue_not_empty.set()
+
+    def data_received(self, data):
+        ts = time.time()
+        for m in self._frame_reader.Feed(data):
+            self._HandleReceived(ts, m)
+
+    # ============================================================
+    # Driver interface
+    # ============================================================
+    def AddListener(self, listener):
+        self._listeners.append(listener)
+
+    def HasInflight(self):
+        return self._inflight is not None
+
+    def History(self, n=None):
+        """Returns the last n messages sent (oldest first)"""
+        return self._history.Last(n)
+
+    def RawHistory(self, n=None):
+        """Returns the last n (ts, sent, frame, comment) records (oldest first)"""
+        return self._raw_history.Last(n)
+
+    def Stats(self) -> MessageStats:
+        return self._stats
+
+    def SlowestMessages(self, n=None):
+        return self._history.Slowest(n)
+
+    def AbortedMessages(self, n=None):
+        return self._history.Aborted(n)
+
+    def GetInFlightMessage(self):
+        """"
+        Returns the current outbound message being processed or None.
+        """
+        return self._inflight
+
+    def OutQueueString(self):
+        out = ["queue length: %d" % self._out_queue.qsize(),
+               "by node: %s" % str(self._out_queue),
+               "saved by merging duplicates: %d" % self._out_queue.coalesced]
+        return "\n".join(out)
+
+    def NodeTimings(self):
+        """Round trip estimates, timeouts and delays per node"""
+        return {n: r.Dict() for n, r in self._rtt.items()}
+
+    def SavedTransmissions(self):
+        """Number of messages which were merged into queued duplicates"""
+        return self._out_queue.coalesced
+
+    def OutQueueSizeForNode(self, n):
+        return self._out_queue.qsize_for_node(n)
+
+    def DropQueuedMessagesForNode(self, n):
+        """
+        Aborts all messages for node n which have not been sent yet.
+        Returns the number of messages dropped.
+        """
+        dropped = self._out_queue.DropForNode(n)
+        ts = time.time()
+        for m in dropped:
+            m.Complete(ts, None, zmessage.MESSAGE_STATE_ABORTED)
+            self._Finish(m)
+        return len(dropped)
+
+    def SendMessage(self, m: zmessage.Message):
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._Enqueue(m)
+        else:
+            self._loop.call_soon_threadsafe(self._Enqueue, m)
+
+    def SendMessageAndWait(self, m: zmessage.Message) -> asyncio.Future:
+        """
+        Like SendMessage() but returns a future which resolves to the
+        message once it has reached a final state (see m.state).
+        Must be called from the event loop.
+        """
+        done = self._loop.create_future()
+        self._completions[m] = done
+        self.SendMessage(m)
+        return done
+
+    async def WaitUntilAllPreviousMessagesHaveBeenHandled(self):
+        # send dummy message to clear out pipe
+        await self.SendMessageAndWait(zmessage.Message(
+            None, zmessage.LowestPriority(), None, None))
+
+    async def Terminate(self):
+        await self.WaitUntilAllPreviousMessagesHaveBeenHandled()
+        self._terminate = True
+        self._queue_not_empty.set()
+        if self._sending_task:
+            await self._sending_task
+        self._raw_history.Close()
+        logging.info("AsyncDriver terminated")
+
+    # ============================================================
+    # Internals
+    # ============================================================
+    def _LogSent(self, ts, m, comment):
+        self._raw_history.Append(ts, True, m, comment)
+        logging.info("sent: %s", zmessage.LazyRawMessage(m))
+
+    def _LogReceived(self, ts, m, comment):
+        logging.info("recv: %s", zmessage.LazyRawMessage(m))
+        self._raw_history.Append(ts, False, m, comment)
+
+    def _Enqueue(self, m: zmessage.Message):
+        self._out_queue.put(m.priority, m)
+        self._queue_not_empty.set()
+
+    def _SendRaw(self, payload, comment=""):
+        self._LogSent(time.time(), payload, comment)
+        self._transport.write(payload)
+
+    def _ForwardToListeners(self, ts, m):
+        for listener in self._listeners:
+            listener.put(ts, m)
+
+    def _HandleReceived(self, ts, m):
+        message = self._inflight
+        was_final = (message is not None and
+                     message.state in zmessage.MESSAGE_STATES_FINAL)
+        next_action, comment = zmessage.NextActionForReceivedMessage(
+            message, ts, m)
+        self._LogReceived(ts, m, comment)
+        if next_action == zmessage.DO_ACK:
+            self._SendRaw(zmessage.RAW_MESSAGE_ACK)
+        elif next_action == zmessage.DO_RETRY:
+            self._loop.call_later(zmessage.RETRY_BACKOFF * message.can,
+                                  self._Retry, message)
+        elif next_action == zmessage.DO_PROPAGATE:
+            self._SendRaw(zmessage.RAW_MESSAGE_ACK)
+            # do not hold up the processing of the remaining frames
+            self._loop.call_soon(self._ForwardToListeners, ts, m)
+
+        if (message is not None and not was_final and
+                message.state in zmessage.MESSAGE_STATES_FINAL):
+            self._inflight_done.set_result(None)
+
+    def _Retry(self, message):
+        if (message is self._inflight and
+                message.state not in zmessage.MESSAGE_STATES_FINAL):
+            self._SendRaw(message.payload, "re-try")
+
+    def _Timeout(self, message):
+        if (message is not self._inflight or
+                message.state in zmessage.MESSAGE_STATES_FINAL):
+            return
+        logging.error("message timeout: %s",
+                      zmessage.LazyRawMessage(message.payload))
+        message.Complete(time.time(), None, zmessage.MESSAGE_STATE_TIMEOUT)
+        self._inflight_done.set_result(None)
+
+    def _Finish(self, message):
+        for m in [message] + message.duplicates:
+            done = self._completions.pop(m, None)
+            if done is not None and not done.done():
+                done.set_result(m)
+
+    async def _Transmit(self, message: zmessage.Message):
+        ts = time.time()
+        message.Start(ts)
+        if message.payload is None:
+            message.Complete(ts, None, zmessage.MESSAGE_STATE_COMPLETED)
+            return
+        rtt = zmessage.RttForMessage(self._rtt, message)
+        delay = rtt.Delay()
+        if delay:
+            await asyncio.sleep(delay)
+        self._history.Append(message)
+        self._inflight = message
+        self._inflight_done = self._loop.create_future()
+        timer = self._loop.call_later(
+            zmessage.MessageTimeout(message, rtt), self._Timeout, message)
+        message.sent = time.time()
+        self._SendRaw(message.payload)
+        await self._inflight_done
+        timer.cancel()
+        self._inflight = None
+        self._history.Completed(message)
+        self._stats.Add(message)
+        rtt.Update(message)
+
+    async def _SendingTask(self):
+        logging.warning("AsyncDriver sending task started")
+        while not self._terminate:
+            if self._out_queue.qsize() == 0:
+                self._queue_not_empty.clear()
+                # re-check as SendMessage() may have slipped in
+                if self._out_queue.qsize() == 0:
+                    await self._queue_not_empty.wait()
+                continue
+            # does not block as we are the only consumer
+            message = self._out_queue.get()
+            try:
+                await self._Transmit(message)
+            except Exception as e:
+                logging.error("failure while sending %s: %s", message, e)
+            self._Finish(message)
+        logging.warning("AsyncDriver sending task terminated")
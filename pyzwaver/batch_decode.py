@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+batch_decode.py contains a vectorized decoder for the readings in
+Meter_Report and SensorMultilevel_Report frames which is meant for
+backfilling history from captures (e.g. the spill file of RawHistory).
+
+This module requires numpy which is otherwise not needed by pyzwaver.
+
+Only the first reading of a report is decoded. Commands wrapped in
+MultiChannel/Security encapsulation are skipped.
+"""
+
+import numpy as np
+
+from pyzwaver import zwave as z
+from pyzwaver.history import ReadSpillFile
+
+READING_DTYPE = np.dtype([
+    ("ts", np.float64),
+    ("node", np.uint16),
+    # z.Meter or z.SensorMultilevel
+    ("cls", np.uint8),
+    ("type", np.uint8),
+    ("unit", np.uint8),
+    ("value", np.float64),
+])
+
+# bytes of a frame we need to look at: the header up to the command
+# (7 bytes), command class and command, two bytes of bitfields
+# and a mantissa of at most 7 bytes
+_WIDTH = 18
+_MANTISSA = 11
+
+
+def _FrameMatrix(frames):
+    """Returns the first _WIDTH bytes of every frame (zero padded) and
+    the lengths of the frames"""
+    lengths = np.fromiter((len(f) for f in frames), dtype=np.int64,
+                          count=len(frames))
+    buf = b"".join(bytes(f[:_WIDTH]).ljust(_WIDTH, b"\0") for f in frames)
+    m = np.frombuffer(buf, dtype=np.uint8).reshape(len(frames), _WIDTH)
+    return m.astype(np.int64), lengths
+
+
+def _Mantissa(m, size):
+    """Big endian signed integers of the given sizes starting at _MANTISSA"""
+    out = np.zeros(len(m), dtype=np.int64)
+    for k in range(_WIDTH - _MANTISSA):
+        take = k < size
+        out = np.where(take, (out << 8) | m[:, _MANTISSA + k], out)
+    bits = 8 * size
+    negative = (size > 0) & (out >= (np.int64(1) << np.maximum(bits - 1, 0)))
+    return np.where(negative, out - (np.int64(1) << bits), out)
+
+
+def DecodeReadings(frames, timestamps=None) -> np.ndarray:
+    """
+    Decodes the readings of all the Meter_Report and
+    SensorMultilevel_Report frames in frames (raw frames as received
+    from the stick, e.g. bytes) and returns them as a structured array
+    of READING_DTYPE. Other and malformed frames are skipped.
+
+    The values match what command.ParseCommand() reports as "_value"
+    including the fix-ups of command.MaybePatchCommand().
+    """
+    frames = list(frames)
+    if timestamps is None:
+        timestamps = np.full(len(frames), np.nan)
+    else:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+    if not frames:
+        return np.zeros(0, dtype=READING_DTYPE)
+    m, lengths = _FrameMatrix(frames)
+
+    cls = m[:, 7]
+    is_meter = (cls == z.Meter_Report[0]) & (m[:, 8] == z.Meter_Report[1])
+    is_sensor = ((cls == z.SensorMultilevel_Report[0]) &
+                 (m[:, 8] == z.SensorMultilevel_Report[1]))
+    ok = ((lengths >= _MANTISSA + 1) & (m[:, 0] == z.SOF) &
+          (m[:, 2] == z.REQUEST) &
+          (m[:, 3] == z.API_APPLICATION_COMMAND_HANDLER) &
+          (is_meter | is_sensor))
+
+    b1 = m[:, 9]
+    b2 = m[:, 10]
+    cmd_len = m[:, 6]
+    # fix-ups as in MaybePatchCommand
+    fix_a = is_sensor & (b1 == 1) & ((b2 & 7) > cmd_len - 4)
+    b2 = np.where(fix_a, 1 << 5 | 2, b2)
+    fix_b = is_sensor & (b1 == 1) & ((b2 & 0x10) != 0)
+    b2 = np.where(fix_b, b2 & 0xe7, b2)
+
+    size = b2 & 7
+    exp = (b2 >> 5) & 7
+    kind = np.where(is_meter, b1 & 0x1f, b1)
+    unit = np.where(is_meter, (b2 & 0x18) >> 3 | ((b1 & 0x80) >> 7) << 2,
+                    (b2 >> 3) & 3)
+    ok &= cmd_len >= 4 + size
+    ok &= lengths >= 7 + cmd_len
+    ok &= is_meter | (size == 1) | (size == 2) | (size == 4)
+
+    value = _Mantissa(m, size) / np.power(10.0, exp)
+
+    out = np.zeros(int(ok.sum()), dtype=READING_DTYPE)
+    out["ts"] = timestamps[ok]
+    out["node"] = m[ok, 5]
+    out["cls"] = cls[ok]
+    out["type"] = kind[ok]
+    out["unit"] = unit[ok]
+    out["value"] = value[ok]
+    return out
+
+
+def DecodeReadingsFromSpillFile(path) -> np.ndarray:
+    """Decodes the readings of the received frames in a RawHistory spill file"""
+    frames = []
+    timestamps = []
+    for ts, sent, frame, _ in ReadSpillFile(path):
+        if not sent:
+            frames.append(frame)
+            timestamps.append(ts)
+    return DecodeReadings(frames, timestamps)
@@ -59,7 +59,7 @@ def StringifyCommand(key):
     s = _CUSTOM_COMMAND_STRINGS.get(key)
     if s:
         return s
-    s = z.SUBCMD_TO_STRING.get(key[0] * 256 + key[1])
+    s = z.SUBCMD_NAMES[key[0] * 256 + key[1]]
     if s:
         return s
     return "Unknown:%02x:%02x" % (key[0], key[1])
@@ -81,6 +81,10 @@ def NodeDescription(basic_generic_specific):
 
 # ======================================================================
 # Parse Helpers
+#
+# The helpers work on any sequence of byte values, in particular on the
+# bytes of the received frame. Intermediate slices are only fed to
+# int.from_bytes()/bytes(), values handed out to the caller are lists.
 # ======================================================================
 def _GetSignedValue(data):
     return int.from_bytes(data, 'big', signed=True)
@@ -108,7 +112,7 @@ def _GetReading(m, index, units_extra):
     exp = (c & 0xe0) >> 5
     mantissa = m[index + 1: index + 1 + size]
     value = _GetSignedValue(mantissa) / pow(10, exp)
-    return index + 1 + size, units, mantissa, exp, value
+    return index + 1 + size, units, list(mantissa), exp, value
 
 
 def _GetTimeDelta(m, index):
@@ -139,7 +143,7 @@ def _ParseMeter(m, index):
     mantissa = m[index: index + size]
     index += size
     value = _GetSignedValue(mantissa) / pow(10, exp)
-    out["mantissa"], out["_value"] = mantissa, value
+    out["mantissa"], out["_value"] = list(mantissa), value
     if index + 2 <= len(m):
         # TODO: provide non-raw version of this
         index, out["dt"] = _GetTimeDelta(m, index)
@@ -147,7 +151,7 @@ def _ParseMeter(m, index):
     if index + size <= len(m):
         mantissa = m[index: index + size]
         value = _GetSignedValue(mantissa) / pow(10, out["exp"])
-        out["mantissa%d" % n], out["_value%d" % n] = mantissa, value
+        out["mantissa%d" % n], out["_value%d" % n] = list(mantissa), value
         index += size
         n += 1
     return index, out
@@ -171,6 +175,12 @@ def _ParseWord(m, index):
     return index + 2, m[index] * 256 + m[index + 1]
 
 
+def _ParseInt24(m, index):
+    if len(m) < index + 3:
+        raise ValueError("cannot parse 24bit int")
+    return index + 3, int.from_bytes(m[index:index + 3], 'big')
+
+
 ENCODING_TO_DECODER = [
     "ascii",
     "latin1",  # "cp437" ,
@@ -184,25 +194,30 @@ def DecodeName(m):
 
 
 def _ParseName(m, index):
-    assert len(m) > index
-    return len(m), m[index:]
+    if len(m) <= index:
+        raise ValueError("cannot parse name")
+    return len(m), list(m[index:])
 
 
 def _ParseStringWithLength(m, index):
+    if len(m) <= index or len(m) < index + 1 + m[index]:
+        raise ValueError("cannot parse string")
     size = m[index]
     return 1 + size + index, bytes(m[index + 1: index + 1 + size])
 
 
 def _ParseStringWithLengthAndEncoding(m, index):
+    if len(m) <= index or len(m) < index + 1 + (m[index] & 0x1f):
+        raise ValueError("cannot parse string")
     encoding = m[index] >> 5
     size = m[index] & 0x1f
-    return 1 + size, {"encoding": encoding,
-                      "text": m[index + 1:index + 1 + size]}
+    return index + 1 + size, {"encoding": encoding,
+                              "text": list(m[index + 1:index + 1 + size])}
 
 
 def _ParseListRest(m, index):
     size = len(m) - index
-    return index + size, m[index:index + size]
+    return index + size, list(m[index:index + size])
 
 
 def _ParseGroups(m, index):
@@ -222,24 +237,15 @@ def _ParseNonce(m, index):
     size = 8
     if len(m) < index + size:
         raise ValueError("malformed nonce:")
-    return index + size, m[index:index + size]
+    return index + size, list(m[index:index + size])
 
 
 def _GetIntLittleEndian(m):
-    x = 0
-    shift = 0
-    for i in m:
-        x += i << shift
-        shift += 8
-    return x
+    return int.from_bytes(m, 'little')
 
 
 def _GetIntBigEndian(m):
-    x = 0
-    for i in m:
-        x <<= 8
-        x += i
-    return x
+    return int.from_bytes(m, 'big')
 
 
 def _ParseRestLittleEndianInt(m, index):
@@ -249,6 +255,8 @@ def _ParseRestLittleEndianInt(m, index):
 
 
 def _ParseSizedLittleEndianInt(m, index):
+    if len(m) <= index or len(m) < index + 1 + m[index]:
+        raise ValueError("cannot parse sized int")
     size = m[index]
     index += 1
     return index + size, {"size": size,
@@ -289,10 +297,12 @@ def _ParseSensor(m, index):
     mantissa = m[index + 1: index + 1 + size]
     value = _GetSignedValue(mantissa) / pow(10, precision)
     return index + 1 + size, {"exp": precision,
-                              "unit": unit, "mantissa": mantissa, "_value": value}
+                              "unit": unit, "mantissa": list(mantissa), "_value": value}
 
 
 def _ParseValue(m, index):
+    if len(m) <= index or len(m) < index + 1 + (m[index] & 0x7):
+        raise ValueError("cannot parse value")
     size = m[index] & 0x7
     start = index + 1
     return index + 1 + size, {"size": size,
@@ -313,20 +323,24 @@ def _ParseDate(m, index):
 
 
 def _ParseExtensions(m, index):
+    if len(m) <= index:
+        raise ValueError("cannot parse extensions")
     mode = m[index]
     index += 1
     extensions = []
     unencrypted = [mode]
     has_unencypted_extension = (mode & 1) != 0
     while has_unencypted_extension:
+        if len(m) < index + 2 or m[index] < 2 or len(m) < index + m[index]:
+            raise ValueError("malformed extension")
         size = m[index]
         kind = m[index + 1]
-        data = m[index + 2: index + size]
+        data = list(m[index + 2: index + size])
         unencrypted += m[index: index + size]
         index += size
         extensions.append((kind, data))
         has_unencypted_extension = (kind & 128) != 0
-    return len(m), {"mode": mode, "extensions": extensions, "ciphertext": m[index:],
+    return len(m), {"mode": mode, "extensions": extensions, "ciphertext": list(m[index:]),
                     "_plaintext": unencrypted, "_message_size": len(m)}
 
 
@@ -351,7 +365,8 @@ def _MakeDate(date):
 
 def _MakeSensor(args):
     if '_value' in args:
-        v = int(args['_value'] * pow(10, args['exp']))
+        # round() rather than int(): 0.29 * 100 == 28.999999999999996
+        v = round(args['_value'] * pow(10, args['exp']))
         m = _SetSignedValue(v)
     else:
         m = args["mantissa"]
@@ -360,7 +375,7 @@ def _MakeSensor(args):
 
 
 def _MakeMeter(args):
-    c1 = (args["unit"] & 4) << 7 | args["rate"] << 5 | (args["type"] & 0x1f)
+    c1 = (args["unit"] & 4) << 5 | args["rate"] << 5 | (args["type"] & 0x1f)
     c2 = args["exp"] << 5 | (args["unit"] & 3) << 3 | len(args["mantissa"])
     delta = []
     if "dt" in args:
@@ -383,6 +398,10 @@ def _MakeWord(w):
     return [(w >> 8) & 0xff, w & 0xff]
 
 
+def _MakeInt24(v):
+    return [(v >> 16) & 0xff, (v >> 8) & 0xff, v & 0xff]
+
+
 def _MakeName(n):
     return n
 
@@ -471,18 +490,20 @@ _OPTIONAL_COMPONENTS = {'b', 't'}
 # Whenever you augment this make sure there is a test case in
 # TestData/commands.input.txt
 _PARSE_ACTIONS = {
+    "3": (_ParseInt24, _MakeInt24),
     "A": (_ParseStringWithLength, _MakeStringWithLength),
     "B": (_ParseByte, _MakeByte),
     "C": (_ParseDate, _MakeDate),
     "E": (_ParseExtensions, _MakeExtensions),
     "F": (_ParseStringWithLengthAndEncoding, _MakeString),
     "G": (_ParseGroups, _MakeGroups),
+    "K": (_ParseListRest, _MakeList),
     "L": (_ParseListRest, _MakeList),
     "M": (_ParseMeter, _MakeMeter),
     "N": (_ParseName, _MakeName),
     "O": (_ParseNonce, _MakeNonce),
     "R": (_ParseRestLittleEndianInt, _MakeLittleEndianInt),  # as integer
-    # "T": _ParseSizedLittleEndianInt,
+    "T": (_ParseSizedLittleEndianInt, _MakeSizedLittleEndianInt),
     "V": (_ParseValue, _MakeValue),
     "W": (_ParseWord, _MakeWord),
 
@@ -493,61 +514,113 @@ _PARSE_ACTIONS = {
 }
 
 
-def _GetParameterDescriptors(m):
-    if len(m) < 2:
-        logging.error("malformed command %s", m)
-        return None
-    key = m[0] * 256 + m[1]
-    return z.SUBCMD_TO_PARSE_TABLE[key]
+# ======================================================================
+# Codecs
+#
+# The parse tables in zwave.py are compiled lazily (once per command key)
+# into a parser and an assembler closure with the helpers and field names
+# already resolved.
+# ======================================================================
+
+def _CompileParser(table):
+    steps = tuple((_PARSE_ACTIONS[t[0]][0], t[2:-1], t[0] in _OPTIONAL_COMPONENTS)
+                  for t in table)
+    if all(t[0] == "B" for t in table):
+        names = tuple(name for _, name, _ in steps)
+        end = 2 + len(names)
+
+        def ParseBytes(m):
+            if len(m) < end:
+                raise ValueError("cannot parse byte")
+            return dict(zip(names, m[2:end]))
+
+        return ParseBytes
+
+    def Parse(m):
+        out = {}
+        index = 2
+        for parser, name, optional in steps:
+            index, value = parser(m, index)
+            if value is None:
+                if not optional:
+                    raise ValueError("missing value for %s" % name)
+            else:
+                out[name] = value
+        return out
+
+    return Parse
+
+
+def _CompileAssembler(key, table):
+    steps = tuple((_PARSE_ACTIONS[t[0]][1], t[2:-1], t[0] in _OPTIONAL_COMPONENTS)
+                  for t in table)
+    head = [key >> 8, key & 0xff]
+    if all(t[0] == "B" for t in table):
+        names = tuple(name for _, name, _ in steps)
+
+        def AssembleBytes(args):
+            data = head[:]
+            for name in names:
+                v = args.get(name)
+                if v is None:
+                    raise ValueError("missing args for [%s]" % name)
+                data.append(v)
+            return data
+
+        return AssembleBytes
+
+    def Assemble(args):
+        data = head[:]
+        for maker, name, optional in steps:
+            v = args.get(name)
+            if v is None and not optional:
+                raise ValueError("missing args for [%s]" % name)
+            data += maker(v)
+        return data
+
+    return Assemble
+
+
+# flat table: command key -> (parser, assembler)
+_CODECS = [None] * 65536
+
+
+def _GetCodec(key: int):
+    codec = _CODECS[key]
+    if codec is None:
+        table = z.SUBCMD_PARSE_TABLES[key]
+        if table is None:
+            return None
+        codec = (_CompileParser(table), _CompileAssembler(key, table))
+        _CODECS[key] = codec
+    return codec
 
 
 def ParseCommand(m):
     """ParseCommand decodes an API_APPLICATION_COMMAND request into a map of values"""
-    table = _GetParameterDescriptors(m)
-
-    if table is None:
+    if len(m) < 2:
+        logging.error("malformed command %s", m)
         raise ValueError("unknown command")
-
-    out = {}
-    index = 2
-    for t in table:
-        kind = t[0]
-        name = t[2:-1]
-        new_index, value = _PARSE_ACTIONS[kind][0](m, index)
-        if value is None:
-            if kind not in _OPTIONAL_COMPONENTS:
-                raise ValueError("missing value for %s" % name)
-        else:
-            out[name] = value
-
-        index = new_index
-    return out
+    codec = _GetCodec(m[0] * 256 + m[1])
+    if codec is None:
+        raise ValueError("unknown command")
+    return codec[0](m)
 
 
 def AssembleCommand(key: tuple, args: dict):
     """
     Convert command from dictionary representation to wire representation
     """
-    table = z.SUBCMD_TO_PARSE_TABLE[key[0] * 256 + key[1]]
-    assert table is not None
-    data = [
-        key[0],
-        key[1]
-    ]
-    # logging.debug("${raw_cmd[0]} ${raw_cmd[1]}: table length:
-    # ${table.length}")
-    for t in table:
-        kind = t[0]
-        name = t[2:-1]
-        v = args.get(name)
-        if v is None and kind not in _OPTIONAL_COMPONENTS:
-            raise ValueError("missing args for [%s]" % name)
-
-        data += _PARSE_ACTIONS[kind][1](v)
-    return data
+    codec = _GetCodec(key[0] * 256 + key[1])
+    assert codec is not None
+    return codec[1](args)
 
 
 def MaybePatchCommand(m):
+    """
+    Works around known firmware bugs. m is never modified: if a fix-up is
+    necessary a patched copy (a list) is returned.
+    """
     # if m[0] == z.MultiInstance and m[1] == z.MultiInstance_Encap:
     #    logging.warning("received MultiInstance_Encap for instance")
     #    return m[4:]
@@ -562,6 +635,7 @@ def MaybePatchCommand(m):
             Hexify(m),
             m[3],
             x)
+        m = list(m)
         m[3] = x
 
     if ((m[0], m[1]) == z.SensorMultilevel_Report and
@@ -573,10 +647,11 @@ def MaybePatchCommand(m):
             Hexify(m),
             m[3],
             x)
+        m = list(m)
         m[3] = x
 
     if (m[0], m[1]) == z.Version_CommandClassReport and len(m) == 3:
-        m.append(1)
+        m = list(m) + [1]
     # if (m[0], m[1]) == z.SensorMultilevel_Report and (m[3] & 7) not in (1, 2, 4):
     #     size = m[3] & 7
     #     if size == 3:
@@ -19,6 +19,7 @@
 
 """
 
+import functools
 import logging
 import struct
 import sys
@@ -66,6 +67,58 @@ def _NodeName(n):
         n) if IsMultichannelNode(n) else str(n)
 
 
+# max number of distinct (command, args, channel, xmit) combos we keep
+# pre-assembled frames for
+COMMAND_CACHE_SIZE = 1024
+
+
+def _Freeze(v):
+    """Makes command args hashable (in a way _Thaw() can undo)"""
+    if isinstance(v, dict):
+        items = tuple(v.items())
+        try:
+            # common case: all values are scalars
+            hash(items)
+        except TypeError:
+            items = tuple((k, _Freeze(x)) for k, x in items)
+        return dict, items
+    if isinstance(v, list):
+        return list, tuple(_Freeze(x) for x in v)
+    if isinstance(v, set):
+        return set, frozenset(v)
+    return v
+
+
+def _Thaw(v):
+    if type(v) is tuple and v:
+        kind = v[0]
+        if kind is dict:
+            return {k: _Thaw(x) for k, x in v[1]}
+        if kind is list:
+            return [_Thaw(x) for x in v[1]]
+        if kind is set:
+            return set(v[1])
+    return v
+
+
+def _AssembleCommand(key, values, channel):
+    raw_cmd = command.AssembleCommand(key, values)
+    if channel is not None:
+        raw_cmd = list(z.MultiChannel_CmdEncap) + [0, channel] + raw_cmd
+    return raw_cmd
+
+
+@functools.lru_cache(maxsize=COMMAND_CACHE_SIZE)
+def _CommandTemplate(key, frozen_values, channel, xmit):
+    raw_cmd = _AssembleCommand(key, _Thaw(frozen_values), channel)
+    return zmessage.RawCommandTemplate(raw_cmd, xmit)
+
+
+def CommandCacheInfo():
+    """Hit/miss statistics of the pre-assembled command cache"""
+    return _CommandTemplate.cache_info()
+
+
 class CommandTranslator(object):
     """
     The CommandTranslator class registers itself as a listener to the driver.
@@ -154,8 +207,17 @@ class CommandTranslator(object):
         self._driver.SendMessage(mesg)
 
     def SendCommand(self, n: int, key: tuple, values: dict, priority: tuple, xmit: int):
+        channel = None
+        if IsMultichannelNode(n):
+            n, channel = SplitMultiChannelNode(n)
         try:
-            raw_cmd = command.AssembleCommand(key, values)
+            frozen = _Freeze(values)
+            try:
+                template = _CommandTemplate(key, frozen, channel, xmit)
+            except TypeError:
+                # unhashable args: skip the cache
+                template = zmessage.RawCommandTemplate(
+                    _AssembleCommand(key, values, channel), xmit)
         except BaseException as e:
             logging.error("cannot assemble command for %s %s %s: %s",
                           command.StringifyCommand(key),
@@ -169,10 +231,7 @@ class CommandTranslator(object):
         def handler(_):
             logging.debug("@@handler invoked")
 
-        if IsMultichannelNode(n):
-            n, c = SplitMultiChannelNode(n)
-            raw_cmd = list(z.MultiChannel_CmdEncap) + [0, c] + raw_cmd
-        m = zmessage.MakeRawCommandWithId(n, raw_cmd, xmit)
+        m = template.Make(n)
         self._SendMessage(n, m, priority, handler)
 
     def _RequestNodeInfo(self, n, retries):
@@ -183,7 +242,7 @@ class CommandTranslator(object):
             if m is not None and m[4] != 0:
                 return  # success
             logging.warning("[%s] RequestNodeInfo failed: %s",
-                            _NodeName(n), zmessage.PrettifyRawMessage(m))
+                            _NodeName(n), zmessage.LazyRawMessage(m))
             self._RequestNodeInfo(n, retries - 1)
 
         if retries > 0:
@@ -217,7 +276,7 @@ class CommandTranslator(object):
             if mesg is None:
                 return
             logging.info("[%s] is failed check: %d, %s", _NodeName(n),
-                         mesg[4], zmessage.PrettifyRawMessage(mesg))
+                         mesg[4], zmessage.LazyRawMessage(mesg))
             failed = mesg[4] != 0
             self._PushToListeners(
                 n, time.time(), command.CUSTOM_COMMAND_FAILED_NODE, {
@@ -260,7 +319,9 @@ class CommandTranslator(object):
         n = m[5]
         size = m[6]
         try:
-            data = [int(x) for x in m[7:7 + size]]
+            # frames from the drivers are bytes, so this is a compact
+            # immutable window which is parsed without further copies
+            data = m[7:7 + size]
             if len(data) < 2:
                 logging.error("impossible short message: %s", repr(data))
                 return
@@ -287,7 +348,7 @@ class CommandTranslator(object):
                 value = command.ParseCommand(data)
         except BaseException as e:
             logging.error("[%d] cannot parse: %s: %s", n,
-                          zmessage.PrettifyRawMessage(m), str(e))
+                          zmessage.LazyRawMessage(m), str(e))
             print("-" * 60)
             traceback.print_exc(file=sys.stdout)
             print("-" * 60)
@@ -302,7 +363,7 @@ class CommandTranslator(object):
             if n != 0:
                 logging.error(
                     "update request failed: %s",
-                    zmessage.PrettifyRawMessage(m))
+                    zmessage.LazyRawMessage(m))
         elif kind == z.UPDATE_STATE_NODE_INFO_RECEIVED:
             # the node is awake now and/or has changed values
             n = m[5]
@@ -342,4 +403,4 @@ class CommandTranslator(object):
             self._HandleMessageApplicationUpdate(ts, m)
         else:
             logging.error("unhandled message: %s",
-                          zmessage.PrettifyRawMessage(m))
+                          zmessage.LazyRawMessage(m))
@@ -21,15 +21,15 @@ driver.py contains the code interacting directly with serial device
 
 import collections
 import logging
+import math
 import queue
 import serial
 import threading
 import time
 
-from typing import List, Tuple
-
-from pyzwaver import zwave as z
 from pyzwaver import zmessage
+from pyzwaver.history import MessageHistory, RawHistory
+from pyzwaver.timer_service import TimerService
 
 
 def MakeSerialDevice(port="/dev/ttyUSB0"):
@@ -45,102 +45,303 @@ def MakeSerialDevice(port="/dev/ttyUSB0"):
     return dev
 
 
+class LatencySketch:
+    """
+    Streaming percentile estimates using log spaced buckets:
+    values are counted in the bucket i with gamma^(i-1) < v <= gamma^i
+    which bounds the relative error of the estimates by accuracy.
+    """
+
+    def __init__(self, accuracy=0.02):
+        self._gamma = (1.0 + accuracy) / (1.0 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = collections.Counter()
+        self.count = 0
+
+    def Add(self, value):
+        self._buckets[math.ceil(math.log(max(value, 1e-3)) / self._log_gamma)] += 1
+        self.count += 1
+
+    def Percentile(self, p):
+        if self.count == 0:
+            return 0.0
+        rank = p / 100.0 * (self.count - 1)
+        seen = 0
+        for i in sorted(self._buckets):
+            seen += self._buckets[i]
+            if seen > rank:
+                break
+        # the bucket mid point (in the relative sense)
+        return 2.0 * self._gamma ** i / (self._gamma + 1.0)
+
+
+class _NodeStats:
+
+    def __init__(self):
+        self.cnt = 0
+        self.can = 0
+        self.dur = 0
+        self.bad = 0
+        self.latency = LatencySketch()
+
+
+class MessageStats:
+    """
+    Running aggregates over the messages processed by a driver.
+    Add() is called once for every message which has reached a
+    final state so that rendering the stats is O(number of nodes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.with_can = 0
+        self.total_can = 0
+        self.sum_duration = 0
+        self.by_state = collections.Counter()
+        self._by_node = collections.defaultdict(_NodeStats)
+
+    def Add(self, m: zmessage.Message):
+        with self._lock:
+            node = self._by_node[m.node]
+            self.count += 1
+            if m.can > 0:
+                self.with_can += 1
+                self.total_can += m.can
+                node.can += 1
+            self.by_state[m.state] += 1
+            node.cnt += 1
+            if m.WasAborted():
+                node.bad += 1
+            if m.end:
+                duration = 1000.0 * (m.end - m.start)
+                node.latency.Add(duration)
+                node.dur += round(duration)
+                self.sum_duration += round(duration)
+
+    def Dict(self):
+        with self._lock:
+            by_node = {}
+            for n, s in self._by_node.items():
+                by_node[n] = {
+                    "count": s.cnt,
+                    "with_can": s.can,
+                    "aborted": s.bad,
+                    "avg_ms": s.dur // s.cnt,
+                    "p50_ms": s.latency.Percentile(50),
+                    "p95_ms": s.latency.Percentile(95),
+                    "p99_ms": s.latency.Percentile(99),
+                }
+            return {
+                "count": self.count,
+                "with_can": self.with_can,
+                "total_can": self.total_can,
+                "avg_ms": self.sum_duration // max(self.count, 1),
+                "by_state": dict(self.by_state),
+                "by_node": by_node,
+            }
+
+    def __str__(self):
+        d = self.Dict()
+        out = [
+            "processed: %d  with-can: %d (total can: %d) avg-time: %dms" %
+            (d["count"], d["with_can"], d["total_can"], d["avg_ms"]),
+            "by state:"
+        ]
+        for n in sorted(d["by_state"].keys()):
+            out.append(" %-20s: %4d" % (n, d["by_state"][n]))
+
+        out.append("node  cnt nt can dur. bad    p50   p95   p99")
+        by_node = d["by_node"]
+        for n in sorted(by_node.keys()):
+            s = by_node[n]
+            out.append(" %2d: %4d (%3d) %4dms (%3d) %5d %5d %5d" % (
+                n, s["count"], s["with_can"], s["avg_ms"], s["aborted"],
+                s["p50_ms"], s["p95_ms"], s["p99_ms"]))
+        return "\n".join(out)
+
+
 def MessageStatsString(history):
-    cutoff = 0
-    with_can = 0
-    total_can = 0
-    by_node_cnt = collections.Counter()
-    by_node_can = collections.Counter()
-    by_node_dur = collections.Counter()
-    by_node_bad = collections.Counter()
-    by_state = collections.Counter()
-    sum_duration = 0
-    mm = history
-    if cutoff > 0:
-        mm = mm[-cutoff:]
-    count = len(mm)
-    for m in mm:
-        node = m.node
-        if m.can > 0:
-            with_can += 1
-            total_can += m.can
-            by_node_can[node] += 1
-        by_state[m.state] += 1
-        by_node_cnt[node] += 1
-        if m.WasAborted():
-            by_node_bad[node] += 1
-        if m.end:
-            duration = int(1000.0 * (m.end - m.start))
-            by_node_dur[node] += duration
-            sum_duration += duration
-    out = [
-        "processed: %d  with-can: %d (total can: %d) avg-time: %dms" %
-        (count, with_can, total_can, sum_duration // count),
-        "by state:"
-    ]
-    for n in sorted(by_state.keys()):
-        out.append(" %-20s: %4d" % (n, by_state[n]))
-
-    out.append("node  cnt nt can dur. bad")
-    for n in sorted(by_node_cnt.keys()):
-        out.append(" %2d: %4d (%3d) %4dms (%3d)" % (
-            n, by_node_cnt[n], by_node_can[n],
-            by_node_dur[n] // by_node_cnt[n], by_node_bad[n]))
-    return "\n".join(out)
+    stats = MessageStats()
+    for m in history:
+        stats.Add(m)
+    return str(stats)
+
+
+def _Cost(message: zmessage.Message):
+    if message.payload is None:
+        return 1
+    return len(message.payload)
+
+
+class _Level:
+    """
+    Per node FIFOs of a single priority level served by deficit round robin.
+
+    Like in FQ-CoDel nodes which just became active are served before the
+    ones which have used up their quantum already. So a node sending
+    the occasional message gets it out quickly even if other nodes have
+    large backlogs.
+    """
+
+    def __init__(self, quantum):
+        self._quantum = quantum
+        self.queues = {}
+        self.deficit = {}
+        # node -> coalescing key -> queued message which a later
+        # message may still be merged into
+        self.keys = {}
+        # round robin orders of the nodes with non-empty queues
+        self._new = collections.deque()
+        self._old = collections.deque()
+
+    def Empty(self):
+        return not self.queues
+
+    def Put(self, node, message):
+        """Returns False if the message was merged into a queued one"""
+        key = message.CoalescingKey()
+        if key is None:
+            # a Get queued before this (e.g. a Set) would read a stale value
+            self.keys.pop(node, None)
+        else:
+            keys = self.keys.setdefault(node, {})
+            queued = keys.get(key)
+            if queued is not None:
+                queued.Merge(message)
+                return False
+            keys[key] = message
+        q = self.queues.get(node)
+        if q is None:
+            q = self.queues[node] = collections.deque()
+            self.deficit[node] = self._quantum
+            self._new.append(node)
+        q.append(message)
+        return True
+
+    def _Forget(self, node, message):
+        key = message.CoalescingKey()
+        keys = self.keys.get(node)
+        if key is not None and keys and keys.get(key) is message:
+            del keys[key]
+            if not keys:
+                del self.keys[node]
+
+    def Get(self):
+        while True:
+            active = self._new if self._new else self._old
+            node = active[0]
+            q = self.queues[node]
+            cost = _Cost(q[0])
+            if self.deficit[node] >= cost:
+                self.deficit[node] -= cost
+                message = q.popleft()
+                self._Forget(node, message)
+                if not q:
+                    self._Remove(node)
+                return node, message
+            self.deficit[node] += self._quantum
+            active.popleft()
+            self._old.append(node)
+
+    def _Remove(self, node):
+        if node in self._new:
+            self._new.remove(node)
+        else:
+            self._old.remove(node)
+        del self.queues[node]
+        del self.deficit[node]
+
+    def Drop(self, node, predicate):
+        q = self.queues.get(node)
+        if q is None:
+            return []
+        dropped = []
+        kept = collections.deque()
+        for m in q:
+            (dropped if predicate(m) else kept).append(m)
+        for m in dropped:
+            self._Forget(node, m)
+        if not kept:
+            self._Remove(node)
+        elif dropped:
+            self.queues[node] = kept
+        return dropped
 
 
 class MessageQueueOut:
     """
     MessageQueue for outbound messages. Tries to support
     priorities and fairness.
+
+    Messages are queued by the level and node of their priority tuple,
+    (the middle element is ignored).
+    Lower levels are always served first. Within a level each node has its
+    own FIFO and the nodes are served by deficit round robin (the cost of
+    a message is the length of its payload) so that one node with a lot
+    of queued messages cannot starve the others.
+
+    A Get which is already queued for the same node and level is not
+    queued again but merged into the queued copy (see Message.Merge),
+    unless a message which cannot be merged (e.g. a Set) was queued for
+    the node and level in between.
     """
 
+    # bytes a node may send per round - about the size of a typical
+    # Get so that busy nodes take turns sending single messages
+    QUANTUM = 16
+
     def __init__(self):
-        self._q = queue.PriorityQueue()
-        self._lo_counts = collections.defaultdict(int)
-        self._hi_counts = collections.defaultdict(int)
-        self._lo_min = 0
-        self._hi_min = 0
-        self._counter = 0
+        self._cond = threading.Condition()
+        self._levels = {}
+        self._size = 0
         self._per_node_size = collections.defaultdict(int)
+        # number of messages merged into queued ones, i.e. not sent
+        self.coalesced = 0
 
     def qsize(self):
-        return self._q.qsize()
+        return self._size
 
     def qsize_for_node(self, n):
         return self._per_node_size[n]
 
     def put(self, priority, message):
-        if self._q.empty():
-            self._lo_counts = collections.defaultdict(int)
-            self._hi_counts = collections.defaultdict(int)
-            self._lo_min = 0
-            self._hi_min = 0
-
-        level, count, node = priority
-        if level == 2:
-            count = self._hi_counts[node]
-            count = max(count + 1, self._hi_min)
-            self._hi_counts[node] = count
-        elif level == 3:
-            count = self._lo_counts[node]
-            count = max(count + 1, self._lo_min)
-            self._lo_counts[node] = count
-        else:
-            count = self._counter
-            self._counter += 1
-        self._per_node_size[node] += 1
-        self._q.put(((level, count, node), message))
+        level, _, node = priority
+        with self._cond:
+            if level not in self._levels:
+                self._levels[level] = _Level(self.QUANTUM)
+            if not self._levels[level].Put(node, message):
+                self.coalesced += 1
+                return
+            self._size += 1
+            self._per_node_size[node] += 1
+            self._cond.notify()
 
     def get(self):
-        priority, message = self._q.get()
-        level = priority[0]
-        if level == 2:
-            self._hi_min = priority[1]
-        elif level == 2:
-            self._lo_min = priority[1]
-        self._per_node_size[priority[2]] -= 1
-        return message
+        """Blocks until a message is available"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._size > 0)
+            for level in sorted(self._levels):
+                q = self._levels[level]
+                if not q.Empty():
+                    node, message = q.Get()
+                    self._size -= 1
+                    self._per_node_size[node] -= 1
+                    return message
+            assert False, "inconsistent queue size"
+
+    def DropForNode(self, node, predicate=lambda m: True):
+        """
+        Removes the queued messages for the node which satisfy the
+        predicate and returns them.
+        """
+        out = []
+        with self._cond:
+            for level in sorted(self._levels):
+                out += self._levels[level].Drop(node, predicate)
+            self._size -= len(out)
+            self._per_node_size[node] -= len(out)
+        return out
 
     def __str__(self):
         non_empty = {a: b for a, b in self._per_node_size.items() if b}
@@ -170,18 +371,37 @@ class Driver(object):
     * forwarding_thread: forwards messages in the _in_queue
       to the listeners. We do not do this in the rx_thread because
       we do not want the latter to be blocked.
+    * the thread of the TimerService: sends messages once their per node
+      delay has passed, re-sends them after a CAN and times them out.
+
+    With pipeline_depth > 1 up to that many controller local queries
+    (see zmessage.IsPipelineable) are sent without waiting for the
+    responses of the previous ones.
+
+    Only the last history_capacity raw frames and messages are kept in
+    memory. Older raw frames are appended to spill_path if provided.
     """
 
-    def __init__(self, serialDevice):
+    def __init__(self, serialDevice, pipeline_depth=1,
+                 history_capacity=10000, spill_path=None):
         self._device = serialDevice
         self._out_queue = MessageQueueOut()  # stuff being send to the stick
-        self._raw_history: List[Tuple[int, bool, zmessage.Message, str]] = []
+        self._raw_history = RawHistory(history_capacity, spill_path)
         # a message is copied into this once if makes it into _inflight.
-        self._history: List[zmessage.Message] = []
+        self._history = MessageHistory(history_capacity)
+        self._stats = MessageStats()
         self._device_idle = True
         self._terminate = False  # True if we want to shut things down
         self._in_queue = queue.Queue()  # stuff coming from the stick unrelated to _inflight
         self._listeners = []   # receive all the stuff from _in_queue
+        self._frame_reader = zmessage.RawFrameReader()
+        self._last = None
+        # handles timeouts, per node delays and retries of _inflight
+        self._timers = TimerService("DriverTimers")
+        self._inflight = zmessage.InflightMessage(
+            self._timers, self._SendRaw, pipeline_depth,
+            self._MessageCompleted)
+        self._send_lock = threading.Lock()
 
         # Make sure we flush old stuff
         self._ClearDevice()
@@ -199,15 +419,13 @@ class Driver(object):
             target=self._DriverForwardingThread, name="DriverForward")
         self._forwarding_thread.start()
 
-        self._last = None
-        self._inflight = zmessage.InflightMessage()
-
-        self._send_lock = threading.Lock()
-
     def __str__(self):
         out = [str(self._out_queue),
                "inflight: " + str(self._inflight.GetMessage()),
-               MessageStatsString(self._history)]
+               "pipelined: %d" % self._inflight.PipelinedCount(),
+               str(self._frame_reader),
+               str(self._timers),
+               str(self._stats)]
         return "\n".join(out)
 
     def AddListener(self, listener):
@@ -216,19 +434,37 @@ class Driver(object):
     def HasInflight(self):
         return self._inflight.GetMessage() is not None
 
-    def History(self):
-        return self._history
+    def History(self, n=None):
+        """Returns the last n messages sent (oldest first)"""
+        return self._history.Last(n)
+
+    def RawHistory(self, n=None):
+        """Returns the last n (ts, sent, frame, comment) records (oldest first)"""
+        return self._raw_history.Last(n)
+
+    def Stats(self) -> MessageStats:
+        return self._stats
+
+    def SlowestMessages(self, n=None):
+        return self._history.Slowest(n)
+
+    def AbortedMessages(self, n=None):
+        return self._history.Aborted(n)
 
     def _LogSent(self, ts, m, comment):
-        self._raw_history.append((ts, True, m, comment))
-        logging.info("sent: %s", zmessage.PrettifyRawMessage(m))
+        self._raw_history.Append(ts, True, m, comment)
+        logging.info("sent: %s", zmessage.LazyRawMessage(m))
 
     def _LogReceived(self, ts, m, comment):
-        logging.info("recv: %s", zmessage.PrettifyRawMessage(m))
-        self._raw_history.append((ts, False, m, comment))
+        logging.info("recv: %s", zmessage.LazyRawMessage(m))
+        self._raw_history.Append(ts, False, m, comment)
 
     def _RecordInflight(self, m):
-        self._history.append(m)
+        self._history.Append(m)
+
+    def _MessageCompleted(self, m):
+        self._history.Completed(m)
+        self._stats.Add(m)
 
     def SendMessage(self, m: zmessage.Message):
         self._out_queue.put(m.priority, m)
@@ -260,6 +496,8 @@ class Driver(object):
         self.SendMessage(zmessage.Message(
             None, zmessage.LowestPriority(), cb, None))
         lock.acquire()
+        self._timers.Terminate()
+        self._raw_history.Close()
         logging.info("Driver terminated")
 
     def GetInFlightMessage(self):
@@ -270,19 +508,39 @@ class Driver(object):
 
     def OutQueueString(self):
         out = ["queue length: %d" % self._out_queue.qsize(),
-               "by node: %s" % str(self._out_queue)]
+               "by node: %s" % str(self._out_queue),
+               "saved by merging duplicates: %d" % self._out_queue.coalesced]
         return "\n".join(out)
 
+    def NodeTimings(self):
+        """Round trip estimates, timeouts and delays per node"""
+        return self._inflight.RttDict()
+
+    def SavedTransmissions(self):
+        """Number of messages which were merged into queued duplicates"""
+        return self._out_queue.coalesced
+
     def OutQueueSizeForNode(self, n):
         return self._out_queue.qsize_for_node(n)
 
+    def DropQueuedMessagesForNode(self, n):
+        """
+        Aborts all messages for node n which have not been sent yet.
+        Returns the number of messages dropped.
+        """
+        dropped = self._out_queue.DropForNode(n)
+        ts = time.time()
+        for m in dropped:
+            m.Complete(ts, None, zmessage.MESSAGE_STATE_ABORTED)
+        return len(dropped)
+
     def _SendRaw(self, payload, comment=""):
         # if len(payload) >= 5:
         #    if self._last == payload[4]:
         #        time.sleep(SEND_DELAY_LARGE)
         #    self._last = payload[4]
 
-        # logging.info("sending: %s", zmessage.PrettifyRawMessage(payload))
+        # logging.info("sending: %s", zmessage.LazyRawMessage(payload))
         # TODO: maybe add some delay for non-control payload: len(payload) ==
         # 0)
         # play it safe an use a lock to make sure only one thread
@@ -302,7 +560,6 @@ class Driver(object):
             inflight = self._out_queue.get()  # type: zmessage.Message
             if self._inflight.StartMessage(inflight, time.time()):
                 self._RecordInflight(inflight)
-                self._SendRaw(inflight.payload, "")
                 self._inflight.WaitForMessageCompletion()
         logging.warning("_DriverSendingThread terminated")
 
@@ -318,43 +575,39 @@ class Driver(object):
 
     def _DriverReceivingThread(self):
         logging.warning("_DriverReceivingThread started")
-        buf = b""
         last_sof_arrival = None
         while not self._terminate:
+            # block (with timeout) for the first byte then grab everything
+            # else that is already available in one go
             r = self._device.read(1)
             if not r:
                 # logging.warning("received empty message/timeout")
                 continue
-            buf += r
-            m = buf[0:1]
+            waiting = self._device.in_waiting
+            if waiting:
+                r += self._device.read(waiting)
             ts = time.time()
-            if m[0] == z.SOF:
-                if last_sof_arrival is None:
-                    last_sof_arrival = ts
-                # see if we have a complete message by trying to extract it
-                m = zmessage.ExtracRawMessage(buf)
-                if not m:
-                    if ts - last_sof_arrival > 2.0:
-                        # Note, this does not seem to happen in practice
-                        logging.error("incomplete message after 2sec: %s", repr(buf))
-                        # make sure we notice when it does
-                        assert False
-                        last_sof_arrival = None
-                    continue
-            last_sof_arrival = None
-            buf = buf[len(m):]
-            next_action, comment = self._inflight.NextActionForReceivedMessage(
-                ts, m)
-            self._LogReceived(ts, m, comment)
-            if next_action == zmessage.DO_ACK:
-                self._SendRaw(zmessage.RAW_MESSAGE_ACK)
-            elif next_action == zmessage.DO_RETRY:
-                # small race here (the message may no longer be around) -
-                # should be benign
-                self._SendRaw(self._inflight.GetMessage().payload, "re-try")
-            elif next_action == zmessage.DO_PROPAGATE:
-                self._SendRaw(zmessage.RAW_MESSAGE_ACK)
-                self._in_queue.put((ts, m))
+            for m in self._frame_reader.Feed(r):
+                next_action, comment = self._inflight.NextActionForReceivedMessage(
+                    ts, m)
+                self._LogReceived(ts, m, comment)
+                if next_action == zmessage.DO_ACK:
+                    self._SendRaw(zmessage.RAW_MESSAGE_ACK)
+                elif next_action == zmessage.DO_PROPAGATE:
+                    self._SendRaw(zmessage.RAW_MESSAGE_ACK)
+                    self._in_queue.put((ts, m))
+                # Note, DO_RETRY is taken care of by _inflight
+
+            if self._frame_reader.Pending() == 0:
+                last_sof_arrival = None
+            elif last_sof_arrival is None:
+                last_sof_arrival = ts
+            elif ts - last_sof_arrival > 2.0:
+                # Note, this does not seem to happen in practice
+                logging.error("incomplete message after 2sec: %d bytes",
+                              self._frame_reader.Pending())
+                # make sure we notice when it does
+                assert False
 
         logging.warning("_DriverReceivingThread terminated")
 
@@ -0,0 +1,331 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+history.py contains bounded containers for the raw frames and messages
+processed by the drivers and for the time series of node values.
+"""
+
+import array
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import threading
+
+# spill file record header: timestamp, sent, comment length, frame length
+_SPILL_HEADER = struct.Struct("<dBBH")
+
+
+def ReadSpillFile(path):
+    """
+    Yields the (ts, sent, frame, comment) records spilled by RawHistory
+    in the order they were evicted.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as fp:
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            end = len(mm)
+            while pos + _SPILL_HEADER.size <= end:
+                ts, sent, comment_len, frame_len = _SPILL_HEADER.unpack_from(
+                    mm, pos)
+                pos += _SPILL_HEADER.size
+                frame = mm[pos:pos + frame_len]
+                pos += frame_len
+                comment = mm[pos:pos + comment_len].decode("utf-8", "replace")
+                pos += comment_len
+                yield ts, bool(sent), frame, comment
+
+
+class RawHistory:
+    """
+    Fixed capacity ring buffer of the raw frames sent to and received
+    from the stick as (ts, sent, frame, comment) records.
+
+    If spill_path is given, records being evicted are appended to a
+    compact binary log which can be read back with ReadSpillFile().
+    """
+
+    def __init__(self, capacity=10000, spill_path=None):
+        self._capacity = capacity
+        self._ts = array.array("d", bytes(8 * capacity))
+        self._sent = bytearray(capacity)
+        self._frames = [None] * capacity
+        self._comments = [None] * capacity
+        # total number of records ever appended
+        self.total = 0
+        self._lock = threading.Lock()
+        self._spill = None
+        if spill_path:
+            self._spill = open(spill_path, "ab")
+
+    def __len__(self):
+        return min(self.total, self._capacity)
+
+    def _Spill(self, i):
+        frame = self._frames[i]
+        comment = self._comments[i].encode("utf-8")
+        if len(comment) > 255:
+            # do not split a multi byte character
+            comment = comment[:255].decode("utf-8", "ignore").encode("utf-8")
+        self._spill.write(_SPILL_HEADER.pack(
+            self._ts[i], self._sent[i], len(comment), len(frame)))
+        self._spill.write(frame)
+        self._spill.write(comment)
+
+    def Append(self, ts, sent, frame, comment):
+        with self._lock:
+            i = self.total % self._capacity
+            if self._spill and self.total >= self._capacity:
+                self._Spill(i)
+            self._ts[i] = ts
+            self._sent[i] = sent
+            self._frames[i] = frame
+            self._comments[i] = comment
+            self.total += 1
+
+    def Last(self, n=None):
+        """Returns the last n records (oldest first)"""
+        with self._lock:
+            size = min(self.total, self._capacity)
+            if n is None or n > size:
+                n = size
+            out = []
+            for k in range(self.total - n, self.total):
+                i = k % self._capacity
+                out.append((self._ts[i], bool(self._sent[i]),
+                            self._frames[i], self._comments[i]))
+            return out
+
+    def __iter__(self):
+        return iter(self.Last())
+
+    def Flush(self):
+        with self._lock:
+            if self._spill:
+                self._spill.flush()
+
+    def Close(self):
+        with self._lock:
+            if self._spill:
+                self._spill.close()
+                self._spill = None
+
+
+def _Duration(m):
+    return m.end - m.start
+
+
+class MessageHistory:
+    """
+    Fixed capacity ring buffer of the messages which were sent to the
+    stick (in the order they were started).
+
+    Completed() maintains two small indices so that the slowest and the
+    aborted messages can be found without scanning: a min heap with the
+    slowest messages and a ring with the latest aborted ones.
+    Heap entries carry the sequence number of their message and are
+    dropped lazily once the message was evicted from the buffer. As the
+    heap is bounded, a message only makes it into the index if it was
+    among the index_capacity slowest ones in the buffer when it completed.
+    """
+
+    def __init__(self, capacity=5000, index_capacity=100):
+        self._capacity = capacity
+        self._messages = [None] * capacity
+        self.total = 0
+        # id(message) -> sequence number for messages not yet completed
+        self._seqs = {}
+        self._index_capacity = index_capacity
+        # (duration, seq, message)
+        self._slowest = []
+        self._aborted = [None] * index_capacity
+        self.total_aborted = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self._capacity)
+
+    def Append(self, m):
+        with self._lock:
+            i = self.total % self._capacity
+            old = self._messages[i]
+            if old is not None:
+                self._seqs.pop(id(old), None)
+            self._messages[i] = m
+            self._seqs[id(m)] = self.total
+            self.total += 1
+
+    def _IsEvicted(self, seq):
+        return seq < self.total - self._capacity
+
+    def Completed(self, m):
+        """Must be called once m has reached a final state"""
+        if m.start is None or m.end is None:
+            return
+        with self._lock:
+            seq = self._seqs.pop(id(m), None)
+            if seq is not None:
+                slowest = self._slowest
+                while slowest and self._IsEvicted(slowest[0][1]):
+                    heapq.heappop(slowest)
+                entry = (_Duration(m), seq, m)
+                if len(slowest) < self._index_capacity:
+                    heapq.heappush(slowest, entry)
+                elif entry[0] > slowest[0][0]:
+                    heapq.heapreplace(slowest, entry)
+            if m.WasAborted():
+                self._aborted[self.total_aborted % self._index_capacity] = m
+                self.total_aborted += 1
+
+    def Last(self, n=None):
+        """Returns the last n messages (oldest first)"""
+        with self._lock:
+            size = min(self.total, self._capacity)
+            if n is None or n > size:
+                n = size
+            return [self._messages[k % self._capacity]
+                    for k in range(self.total - n, self.total)]
+
+    def __iter__(self):
+        return iter(self.Last())
+
+    def Slowest(self, n=None):
+        """
+        Returns up to n of the slowest messages still in the buffer
+        (slowest first)
+        """
+        with self._lock:
+            out = sorted((e for e in self._slowest if not self._IsEvicted(e[1])),
+                         key=lambda e: e[0], reverse=True)
+        return [m for _, _, m in out[:n]]
+
+    def Aborted(self, n=None):
+        """Returns up to n of the latest aborted messages (oldest first)"""
+        with self._lock:
+            size = min(self.total_aborted, self._index_capacity)
+            if n is None or n > size:
+                n = size
+            return [self._aborted[k % self._index_capacity]
+                    for k in range(self.total_aborted - n, self.total_aborted)]
+
+
+class SeriesPolicy:
+    """
+    Bounds a ValueSeries:
+    capacity:   max number of samples kept
+    resolution: samples falling into the same resolution sized time bucket
+                are merged (the latest one wins), 0 keeps every sample
+    max_age:    samples older than max_age seconds (relative to the newest
+                sample) are dropped, None keeps them until evicted
+    """
+
+    def __init__(self, capacity=1000, resolution=0.0, max_age=None):
+        assert capacity > 0
+        self.capacity = capacity
+        self.resolution = resolution
+        self.max_age = max_age
+
+
+class _SeriesKeyView:
+    """Sequence view of the timestamps of a ValueSeries for bisect"""
+
+    __slots__ = ("_series",)
+
+    def __init__(self, series):
+        self._series = series
+
+    def __len__(self):
+        return len(self._series)
+
+    def __getitem__(self, k):
+        s = self._series
+        return s._ts[(s._first + k) % s._capacity]
+
+
+class ValueSeries:
+    """
+    Fixed capacity ring buffer of (ts, value) samples of a numeric value
+    stored in two arrays of doubles (16 bytes per sample).
+
+    Samples are expected to arrive in timestamp order.
+    """
+
+    def __init__(self, policy: SeriesPolicy):
+        self._policy = policy
+        self._capacity = policy.capacity
+        self._ts = array.array("d", bytes(8 * self._capacity))
+        self._values = array.array("d", bytes(8 * self._capacity))
+        # total number of samples ever appended
+        self.total = 0
+        # absolute index of the oldest sample still retained
+        self._first = 0
+        self._bucket = None
+
+    def __len__(self):
+        return self.total - self._first
+
+    def Append(self, ts: float, value: float):
+        resolution = self._policy.resolution
+        if resolution:
+            bucket = ts // resolution
+            if bucket == self._bucket and self.total > self._first:
+                i = (self.total - 1) % self._capacity
+                self._ts[i] = ts
+                self._values[i] = value
+                return
+            self._bucket = bucket
+        i = self.total % self._capacity
+        self._ts[i] = ts
+        self._values[i] = value
+        self.total += 1
+        self._first = max(self._first, self.total - self._capacity)
+        max_age = self._policy.max_age
+        if max_age is not None:
+            cutoff = ts - max_age
+            while self._ts[self._first % self._capacity] < cutoff:
+                self._first += 1
+
+    def _Slice(self, lo, hi):
+        out = []
+        for k in range(self._first + lo, self._first + hi):
+            i = k % self._capacity
+            out.append((self._ts[i], self._values[i]))
+        return out
+
+    def Range(self, start=None, end=None):
+        """Returns the samples with start <= ts <= end (oldest first)"""
+        keys = _SeriesKeyView(self)
+        lo = 0 if start is None else bisect.bisect_left(keys, start)
+        hi = len(self) if end is None else bisect.bisect_right(keys, end)
+        return self._Slice(lo, hi)
+
+    def Last(self, n=None):
+        """Returns the last n samples (oldest first)"""
+        size = len(self)
+        if n is None or n > size:
+            n = size
+        return self._Slice(size - n, size)
+
+    def Latest(self):
+        if not len(self):
+            return None
+        i = (self.total - 1) % self._capacity
+        return self._ts[i], self._values[i]
@@ -20,16 +20,21 @@ node.py provides the Node and NodeSet abstraction
 """
 
 import collections
+import functools
 import logging
+import time
 from typing import List, Set, Optional, Dict, Any, Tuple
 
 from pyzwaver import command
 from pyzwaver import command_helper as ch
+from pyzwaver import snapshot
 from pyzwaver import zwave as z
 from pyzwaver.command_translator import CommandTranslator
+from pyzwaver.history import SeriesPolicy, ValueSeries
+from pyzwaver.record import Compact
 from pyzwaver.value import GetSensorMeta, GetMeterMeta, SENSOR_KIND_BATTERY, SENSOR_KIND_SWITCH_MULTILEVEL, \
     SENSOR_KIND_SWITCH_BINARY, TEMPERATURE_MODES
-from pyzwaver.zmessage import NodePriorityHi, NodePriorityLo
+from pyzwaver.zmessage import IsCoalescable, NodePriorityHi, NodePriorityLo
 
 SECURE_MODE = False
 
@@ -107,6 +112,12 @@ _COMMANDS_WITH_SPECIAL_ACTIONS = {
     #
     z.Security2_NonceGet: lambda _ts, node, values:
     node.SendNonce(values["seq"]),
+    #
+    command.CUSTOM_COMMAND_PROTOCOL_INFO: lambda _ts, node, values:
+    node.mailbox.SetListeningFromProtocolInfo(values),
+    #
+    z.WakeUp_Notification: lambda _ts, node, _values:
+    node.mailbox.WakeUp(),
 }
 
 XMIT_OPTIONS_NO_ROUTE = (z.TRANSMIT_OPTION_ACK |
@@ -136,6 +147,156 @@ VAL_KEY = Tuple[int, int]
 # timestamp and dict
 VAL_VAL = Tuple[float, Dict]
 
+# A reasonable choice for NodeValues(series_policies=...): a day of meter
+# and sensor readings at one minute resolution, switches and batteries
+# with less resolution but longer retention.
+DEFAULT_SERIES_POLICIES = {
+    z.Meter_Report: SeriesPolicy(1440, 60.0, 24 * 3600.0),
+    z.SensorMultilevel_Report: SeriesPolicy(1440, 60.0, 24 * 3600.0),
+    z.ThermostatSetpoint_Report: SeriesPolicy(1440, 60.0, 24 * 3600.0),
+    z.SwitchBinary_Report: SeriesPolicy(1000, 0.0, 7 * 24 * 3600.0),
+    z.SwitchMultilevel_Report: SeriesPolicy(1000, 10.0, 7 * 24 * 3600.0),
+    z.Battery_Report: SeriesPolicy(720, 3600.0, 30 * 24 * 3600.0),
+}
+
+
+def _Scalar(val):
+    """The numeric value of a report (e.g. "_value" or "level") or None"""
+    if isinstance(val, (int, float)):
+        return val
+    for name in ("_value", "level", "value"):
+        x = val.get(name)
+        if x is not None:
+            return x if isinstance(x, (int, float)) else None
+    return None
+
+
+# kind and unit of the readings in MiscSensors()
+_MISC_SENSOR_META = {
+    z.SwitchMultilevel_Report: (SENSOR_KIND_SWITCH_MULTILEVEL, "% (dimmer)"),
+    z.SwitchBinary_Report: (SENSOR_KIND_SWITCH_BINARY, "on/off"),
+    z.Battery_Report: (SENSOR_KIND_BATTERY, "% (battery)"),
+}
+
+# command -> function computing kind and unit from the subkey
+_READING_META = {
+    z.SensorMultilevel_Report: lambda subkey: GetSensorMeta(*subkey),
+    z.Meter_Report: lambda subkey: GetMeterMeta(*subkey),
+}
+_READING_META.update({key: lambda _subkey, meta=meta: meta
+                      for key, meta in _MISC_SENSOR_META.items()})
+
+
+class ValueIndex:
+    """
+    ValueIndex contains secondary indexes over the NodeValues of all nodes
+    of a Nodeset so that fleet-wide queries cost O(matches).
+
+    The indexes are maintained by NodeValues.Set()/SetMapEntry() and only
+    need updating when a node reports a command (or a map entry) for the
+    first time. Entries are never removed except by DropNode().
+
+    Indexed are:
+    * nodes by the commands they have values for
+    * readings (n, key, subkey) by kind and by (kind, unit), e.g.
+      (SENSOR_KIND_BATTERY, "% (battery)") or ("Electric", "W"),
+      c.f. Sensors(), Meters() and MiscSensors()
+    * nodes by the command classes they support (c.f. HasCommandClass())
+    """
+
+    def __init__(self):
+        # dicts with None values serve as insertion ordered sets
+        self._by_key: Dict[VAL_KEY, Dict[int, None]] = collections.defaultdict(dict)
+        self._by_kind: Dict[str, Dict[Tuple[int, VAL_KEY, Any], None]] = \
+            collections.defaultdict(dict)
+        self._by_kind_unit: Dict[Tuple[str, str], Dict[Tuple[int, VAL_KEY, Any], None]] = \
+            collections.defaultdict(dict)
+        self._by_class: Dict[int, Dict[int, None]] = collections.defaultdict(dict)
+
+    def Add(self, n: int, key: VAL_KEY, subkey: Any):
+        self._by_key[key][n] = None
+        meta = _READING_META.get(key)
+        if meta is not None:
+            kind, unit = meta(subkey)
+            e = (n, key, subkey)
+            self._by_kind[kind][e] = None
+            self._by_kind_unit[(kind, unit)][e] = None
+
+    def SetCommandClass(self, n: int, cls: int, supported: bool):
+        if supported:
+            self._by_class[cls][n] = None
+        else:
+            self._by_class[cls].pop(n, None)
+
+    def DropNode(self, n: int):
+        for index in (self._by_key, self._by_class):
+            for nodes in index.values():
+                nodes.pop(n, None)
+        for index in (self._by_kind, self._by_kind_unit):
+            for entries in index.values():
+                for e in [e for e in entries if e[0] == n]:
+                    del entries[e]
+
+    def Nodes(self, key: VAL_KEY) -> List[int]:
+        return list(self._by_key.get(key, ()))
+
+    def NodesWithCommandClass(self, cls: int) -> List[int]:
+        return list(self._by_class.get(cls, ()))
+
+    def Readings(self, kind: str, unit: Optional[str] = None) -> List[Tuple[int, VAL_KEY, Any]]:
+        if unit is None:
+            return list(self._by_kind.get(kind, ()))
+        return list(self._by_kind_unit.get((kind, unit), ()))
+
+
+# command -> names of the derived views of NodeValues computed from it
+_VIEWS_BY_KEY: Dict[VAL_KEY, List[str]] = {}
+
+
+def _DerivedView(*keys):
+    """
+    Memoizes a NodeValues method without arguments which only depends on
+    the values of the given commands. The cached result is dropped when
+    any of these is written, so it must not be modified by the caller.
+    """
+
+    def decorator(fun):
+        name = fun.__name__
+        for key in keys:
+            _VIEWS_BY_KEY.setdefault(key, []).append(name)
+
+        @functools.wraps(fun)
+        def wrapper(self):
+            try:
+                return self._views[name]
+            except KeyError:
+                out = self._views[name] = fun(self)
+                return out
+
+        return wrapper
+
+    return decorator
+
+
+class ValueChange:
+    """
+    ValueChange describes a change of a value cached in NodeValues.
+
+    subkey is None for commands which are not stored in a map (see
+    NodeValues). old is None if there was no previous value.
+    """
+    __slots__ = ["key", "subkey", "old", "new"]
+
+    def __init__(self, key: VAL_KEY, subkey: Any, old: Any, new: Any):
+        self.key = key
+        self.subkey = subkey
+        self.old = old
+        self.new = new
+
+    def __repr__(self):
+        return "ValueChange(%s, %r, %r, %r)" % (
+            command.StringifyCommand(self.key), self.subkey, self.old, self.new)
+
 
 class NodeValues:
     """
@@ -148,26 +309,138 @@ class NodeValues:
        The corresponding  "XXXGet" command does not take an argument.
     2. We cache several recent messages
        The corresponding  "XXXGet" command takes an argument.
+
+    With compact=True the values are stored as Records (see record.py)
+    which need a fraction of the memory of the parsed dicts.
+
+    series_policies optionally maps commands to SeriesPolicies. For those
+    the numeric value (e.g. "_value" or "level") of every report is also
+    recorded in a bounded ValueSeries per (key, subkey), where subkey is
+    None for commands of the first category, e.g.
+        values.History(z.Meter_Report, (1, 0), start=time.time() - 86400)
+    returns the kWh readings of the last 24h.
+
+    Set() and SetMapEntry() return a ValueChange if the new value differs
+    from the cached one and None otherwise.
+    deadbands optionally maps commands or (command, subkey) pairs to a
+    threshold. For those, changes of the numeric value smaller than the
+    threshold are not reported and ValueChange.old is the value of the
+    last reported change, so a slow drift is eventually reported, e.g.
+        {z.SensorMultilevel_Report: 0.5, (z.Meter_Report, (1, 2)): 10.0}
+
+    index and n optionally connect the NodeValues of node n to the
+    ValueIndex of a Nodeset.
     """
 
-    def __init__(self):
+    def __init__(self, compact=False, series_policies=None, deadbands=None,
+                 index: Optional[ValueIndex] = None, n: int = 0):
+        self._compact = compact
         self._values: Dict[VAL_KEY, VAL_VAL] = {}
         self._maps: Dict[VAL_KEY, Dict[Any, Any]] = collections.defaultdict(dict)
+        self._series_policies: Dict[VAL_KEY, SeriesPolicy] = series_policies or {}
+        self._series: Dict[Tuple[VAL_KEY, Any], ValueSeries] = {}
+        self._deadbands: Dict[Any, float] = deadbands or {}
+        # last reported value of commands with deadband
+        self._reported: Dict[Tuple[VAL_KEY, Any], Any] = {}
+        self._index = index
+        self._n = n
+        # name -> result of the methods decorated with _DerivedView
+        self._views: Dict[str, Any] = {}
 
     def HasValue(self, key: tuple):
         return key in self._values
 
-    def Set(self, ts: float, key: VAL_KEY, val: Dict):
-        if val is None:
+    def _Record(self, ts: float, key: VAL_KEY, subkey: Any, val: Any):
+        x = _Scalar(val)
+        if x is None:
             return
+        series = self._series.get((key, subkey))
+        if series is None:
+            series = ValueSeries(self._series_policies[key])
+            self._series[(key, subkey)] = series
+        series.Append(ts, x)
+
+    def _Change(self, key: VAL_KEY, subkey: Any, old: Optional[VAL_VAL],
+                val: Any) -> Optional[ValueChange]:
+        deadband = self._deadbands.get((key, subkey))
+        if deadband is None:
+            deadband = self._deadbands.get(key)
+        if deadband is None:
+            if old is not None and old[1] == val:
+                return None
+            return ValueChange(key, subkey, None if old is None else old[1], val)
+        last = self._reported.get((key, subkey))
+        if last is not None:
+            a = _Scalar(last)
+            b = _Scalar(val)
+            if a is not None and b is not None:
+                if abs(b - a) < deadband:
+                    return None
+            elif last == val:
+                return None
+        self._reported[(key, subkey)] = val
+        return ValueChange(key, subkey, last, val)
+
+    def Set(self, ts: float, key: VAL_KEY, val: Dict) -> Optional[ValueChange]:
+        if val is None:
+            return None
+        if key in self._series_policies:
+            self._Record(ts, key, None, val)
+        old = self._values.get(key)
+        if old is None and self._index is not None:
+            self._index.Add(self._n, key, None)
+        if self._views and key in _VIEWS_BY_KEY:
+            self._Invalidate(key)
+        change = self._Change(key, None, old, val)
+        if self._compact:
+            val = Compact(val)
         self._values[key] = ts, val
+        return change
+
+    def _Invalidate(self, key: VAL_KEY):
+        for name in _VIEWS_BY_KEY[key]:
+            self._views.pop(name, None)
+
+    def _Index(self, key: VAL_KEY, subkey: Any, old: Optional[VAL_VAL], val: Any):
+        if key == z.Version_CommandClassReport:
+            # c.f. SupportedClasses()
+            self._index.SetCommandClass(self._n, subkey, val != 0)
+        if old is None:
+            self._index.Add(self._n, key, subkey)
 
     def SetMapEntry(self, ts: float, key: VAL_KEY, subkey: Any,
-                    val: Any):
+                    val: Any) -> Optional[ValueChange]:
         if val is None:
-            return
+            return None
+        if key in self._series_policies:
+            self._Record(ts, key, subkey, val)
         m = self._maps[key]
+        old = m.get(subkey)
+        if self._index is not None and (
+                old is None or key == z.Version_CommandClassReport):
+            self._Index(key, subkey, old, val)
+        if self._views and key in _VIEWS_BY_KEY:
+            self._Invalidate(key)
+        change = self._Change(key, subkey, old, val)
+        if self._compact:
+            val = Compact(val)
         m[subkey] = ts, val
+        return change
+
+    def Series(self, key: VAL_KEY, subkey: Any = None) -> Optional[ValueSeries]:
+        return self._series.get((key, subkey))
+
+    def SeriesKeys(self) -> List[Tuple[VAL_KEY, Any]]:
+        return list(self._series.keys())
+
+    def History(self, key: VAL_KEY, subkey: Any = None,
+                start: Optional[float] = None,
+                end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Returns the recorded (ts, value) samples with start <= ts <= end"""
+        series = self._series.get((key, subkey))
+        if series is None:
+            return []
+        return series.Range(start, end)
 
     def Get(self, key: tuple) -> Optional[Dict]:
         v = self._values.get(key)
@@ -175,21 +448,58 @@ class NodeValues:
             return v[1]
         return None
 
+    def GetTimestamp(self, key: tuple) -> Optional[float]:
+        v = self._values.get(key)
+        if v is not None:
+            return v[0]
+        return None
+
+    def Snapshot(self) -> Tuple[List, List]:
+        """Returns the cached values as lists suitable for Restore()"""
+        values = [(key, ts, val) for key, (ts, val) in self._values.items()]
+        maps = [(key, [(subkey, ts, val) for subkey, (ts, val) in m.items()])
+                for key, m in self._maps.items() if m]
+        return values, maps
+
+    def Restore(self, values: List, maps: List):
+        """Restores the cached values from a Snapshot().
+
+        Restored values do not show up in the time series and do not
+        cause ValueChanges.
+        """
+        self._views.clear()
+        for key, ts, val in values:
+            if self._index is not None and key not in self._values:
+                self._index.Add(self._n, key, None)
+            if self._compact:
+                val = Compact(val)
+            self._values[key] = ts, val
+        for key, entries in maps:
+            m = self._maps[key]
+            for subkey, ts, val in entries:
+                if self._index is not None:
+                    self._Index(key, subkey, m.get(subkey), val)
+                if self._compact:
+                    val = Compact(val)
+                m[subkey] = ts, val
+
     def GetMap(self, key: VAL_KEY) -> Dict[Any, Any]:
         return self._maps.get(key, {})
 
+    @_DerivedView(z.ColorSwitch_SupportedReport)
     def ColorSwitchSupported(self):
         v = self.Get(z.ColorSwitch_SupportedReport)
         if not v:
-            return set()
+            return frozenset()
         # TODO - double check
-        return BitsToSetWithOffset(v["bits"]["value"], 0)
+        return frozenset(BitsToSetWithOffset(v["bits"]["value"], 0))
 
+    @_DerivedView(z.SensorMultilevel_SupportedReport)
     def SensorSupported(self):
         v = self.Get(z.SensorMultilevel_SupportedReport)
         if not v:
-            return set()
-        return BitsToSetWithOffset(v["bits"]["value"], 1)
+            return frozenset()
+        return frozenset(BitsToSetWithOffset(v["bits"]["value"], 1))
 
     def MultiChannelEndPointIds(self):
         v = self.Get(z.MultiChannel_EndPointReport)
@@ -197,11 +507,12 @@ class NodeValues:
             return []
         return range(1, v["count"] + 1)
 
+    @_DerivedView(z.Meter_SupportedReport)
     def MeterSupported(self):
         v = self.Get(z.Meter_SupportedReport)
         if not v:
-            return set()
-        return BitsToSetWithOffset(v["scale"], 0)
+            return frozenset()
+        return frozenset(BitsToSetWithOffset(v["scale"], 0))
 
     def MeterFlags(self):
         v = self.Get(z.Meter_SupportedReport)
@@ -227,23 +538,25 @@ class NodeValues:
             return 0, 0, 0
         return v["device_type"]
 
+    @_DerivedView(z.Association_Report, z.Association_GroupingsReport)
     def AssociationGroupIds(self):
         m = self.GetMap(z.Association_Report)
         if m:
-            return m.keys()
+            return tuple(m.keys())
         v = self.Get(z.Association_GroupingsReport)
         if not v or v["count"] in [0, 255]:
             n = 4
         else:
             n = v["count"]
-        return list(range(1, n + 1)) + [255]
+        return tuple(range(1, n + 1)) + (255,)
 
-    def HasCommandClass(self, cls):
+    @_DerivedView(z.Version_CommandClassReport)
+    def SupportedClasses(self):
         m = self.GetMap(z.Version_CommandClassReport)
-        e = m.get(cls)
-        if not e:
-            return False
-        return e != 0
+        return frozenset(cls for cls, (_, version) in m.items() if version != 0)
+
+    def HasCommandClass(self, cls):
+        return cls in self.SupportedClasses()
 
     def NumCommands(self):
         m = self.GetMap(z.Version_CommandClassReport)
@@ -257,10 +570,11 @@ class NodeValues:
         m = self.GetMap(z.Version_CommandClassReport)
         return m.keys()
 
+    @_DerivedView(z.Version_CommandClassReport)
     def CommandVersions(self):
         m = self.GetMap(z.Version_CommandClassReport)
-        return [(cls, command.StringifyCommandClass(cls), val)
-                for cls, (_, val) in m.items() if val != 0]
+        return tuple((cls, command.StringifyCommandClass(cls), val)
+                     for cls, (_, val) in m.items() if val != 0)
 
     def Configuration(self):
         m = self.GetMap(z.Configuration_Report)
@@ -299,23 +613,16 @@ class NodeValues:
 
     def MiscSensors(self):
         out = []
-        v = self.Get(z.SwitchMultilevel_Report)
-        if v is not None:
-            out.append(
-                (z.SwitchMultilevel_Report,
-                 SENSOR_KIND_SWITCH_MULTILEVEL,
-                 "% (dimmer)",
-                 v["level"]))
-        v = self.Get(z.SwitchBinary_Report)
-        if v is not None:
-            out.append((z.SwitchBinary_Report, SENSOR_KIND_SWITCH_BINARY,
-                        "on/off", v["level"]))
-        v = self.Get(z.Battery_Report)
-        if v is not None:
-            out.append((z.Battery_Report, SENSOR_KIND_BATTERY,
-                        "% (battery)", v["level"]))
+        for key, (kind, unit) in _MISC_SENSOR_META.items():
+            v = self.Get(key)
+            if v is not None:
+                out.append((key, kind, unit, v["level"]))
         return out
 
+    @_DerivedView(z.Association_Report,
+                  z.AssociationGroupInformation_NameReport,
+                  z.AssociationGroupInformation_InfoReport,
+                  z.AssociationGroupInformation_ListReport)
     def Associations(self):
         groups = self.GetMap(z.Association_Report)
         names = self.GetMap(z.AssociationGroupInformation_NameReport)
@@ -332,11 +639,8 @@ class NodeValues:
                 return None
             return e[1]
 
-        out = []
-        for n in assocs:
-            out.append((n, foo(groups, n), foo(names, n),
-                        foo(infos, n), foo(lists, n)))
-        return out
+        return tuple((n, foo(groups, n), foo(names, n), foo(infos, n),
+                      foo(lists, n)) for n in assocs)
 
     def Versions(self):
         v = self.Get(z.Version_Report)
@@ -372,24 +676,122 @@ class NodeValues:
         return "\n".join(out)
 
 
+# Security handshakes are driven by the node itself so it is awake
+_MAILBOX_BYPASS_CLASSES = {z.Security, z.Security2}
+
+
+class NodeMailbox:
+    """
+    NodeMailbox sits between a Node and the CommandTranslator.
+
+    Commands for nodes which are always listening are passed through.
+    Commands for nodes which only listen after waking up (battery devices)
+    are held until the node sends a WakeUp_Notification and are then
+    sent in a burst followed by a WakeUp_NoMoreInformation.
+    Identical Gets are only held once, as are pings.
+
+    Until the protocol info for the node is known it is assumed to
+    be listening.
+    """
+
+    def __init__(self, n: int, translator: CommandTranslator):
+        self._n = n
+        self._translator = translator
+        self.listening = True
+        # (key, repr(values)) for Gets, a sequence number for everything
+        # else -> (key, values, priority, xmit)
+        self._held = collections.OrderedDict()
+        self._seq = 0
+        # (retries, force, reason) of a held ping
+        self._ping = None
+        self.wakeups = 0
+        self.flushed = 0
+
+    def Held(self) -> int:
+        return len(self._held) + (self._ping is not None)
+
+    def SetListeningFromProtocolInfo(self, values: Dict):
+        flags = values.get("flags")
+        if flags is None:
+            return
+        # FLiRS devices (sensor_xxxms) can be reached via beaming
+        self.listening = bool(
+            flags & {"listening", "sensor_250ms", "sensor_1000ms"})
+        if self.listening:
+            self._Flush()
+
+    def SendCommand(self, key: tuple, values: Dict, priority: tuple, xmit: int):
+        if self.listening or key[0] in _MAILBOX_BYPASS_CLASSES:
+            self._translator.SendCommand(self._n, key, values, priority, xmit)
+            return
+        if IsCoalescable(key[0] * 256 + key[1]):
+            held_key = (key, repr(values))
+            if held_key in self._held:
+                return
+        else:
+            # Sets and alike must go out in the order they were issued
+            held_key = self._seq
+            self._seq += 1
+        self._held[held_key] = (key, values, priority, xmit)
+
+    def Ping(self, retries: int, force: bool, reason: str):
+        if self.listening:
+            self._translator.Ping(self._n, retries, force, reason)
+            return
+        if self._ping is None or force:
+            self._ping = (retries, force, reason)
+
+    def _Flush(self) -> int:
+        held = list(self._held.values())
+        self._held.clear()
+        ping, self._ping = self._ping, None
+        if ping is not None:
+            self._translator.Ping(self._n, *ping)
+        self.flushed += len(held)
+        for key, values, priority, xmit in held:
+            self._translator.SendCommand(self._n, key, values, priority, xmit)
+        return len(held) + (ping is not None)
+
+    def WakeUp(self):
+        """Must be called when the node has sent a WakeUp_Notification"""
+        self.wakeups += 1
+        if self.listening:
+            return
+        logging.warning("[%d] woke up with %d held commands",
+                        self._n, self.Held())
+        if self._Flush() == 0:
+            # let the node stay awake for whatever else comes up
+            return
+        # the node may go back to sleep once the held commands are
+        # through: this uses the lowest node priority so it is queued
+        # behind everything flushed
+        self._translator.SendCommand(self._n, z.WakeUp_NoMoreInformation, {},
+                                     NodePriorityLo(self._n), XMIT_OPTIONS)
+
+
 class Node:
     """A Node represents a single node in a network.
 
     Incoming commands are passed to it from Nodeset via put()
-    Outgoing commands are send to the CommandTranslator.
+    Outgoing commands are send to the CommandTranslator via the
+    NodeMailbox.
     """
 
     def __init__(self, n: int, translator: CommandTranslator,
-                 is_controller: bool):
+                 is_controller: bool, compact_values=False,
+                 series_policies=None, deadbands=None,
+                 index: Optional[ValueIndex] = None):
         assert n >= 1
         self.n = n
         self.is_controller: bool = is_controller
         self.name = "Node %d" % n
         self._translator = translator
+        self.mailbox = NodeMailbox(n, translator)
         self.state = NODE_STATE_NONE
         self._controls = set()
         #
-        self.values: NodeValues = NodeValues()
+        self.values: NodeValues = NodeValues(compact_values, series_policies,
+                                             deadbands, index, n)
         self.last_contact: float = 0.0
         self.secure_pair = SECURE_MODE
         self._tmp_key_ccm = None
@@ -417,16 +819,9 @@ class Node:
         self._controls |= set(std_controls)
 
         ts = 0.0
-        for k in cmd:
-            if not self.values.HasCommandClass(k):
-                self.values.SetMapEntry(
-                    ts, z.Version_CommandClassReport, k, _NO_VERSION)
-        for k in self._controls:
-            if not self.values.HasCommandClass(k):
-                self.values.SetMapEntry(
-                    ts, z.Version_CommandClassReport, k, _NO_VERSION)
-        for k in std_cmd:
-            if not self.values.HasCommandClass(k):
+        for k in list(cmd) + list(self._controls) + list(std_cmd):
+            # do not clobber versions we already know (including 0)
+            if k not in self.values.GetMap(z.Version_CommandClassReport):
                 self.values.SetMapEntry(
                     ts, z.Version_CommandClassReport, k, _NO_VERSION)
 
@@ -443,6 +838,23 @@ class Node:
     def __str__(self):
         return self.BasicString() + "\n" + str(self.values)
 
+    def Snapshot(self) -> Dict:
+        values, maps = self.values.Snapshot()
+        return {"n": self.n, "state": self.state, "name": self.name,
+                "last_contact": self.last_contact,
+                "controls": self._controls, "values": values, "maps": maps}
+
+    def Restore(self, record: Dict):
+        """Restores the cached state from a Snapshot() but not the
+        state of the node (see Nodeset.RestoreSnapshot())"""
+        self.name = record["name"]
+        self.last_contact = record["last_contact"]
+        self._controls |= record["controls"]
+        self.values.Restore(record["values"], record["maps"])
+        protocol_info = self.values.Get(command.CUSTOM_COMMAND_PROTOCOL_INFO)
+        if protocol_info is not None:
+            self.mailbox.SetListeningFromProtocolInfo(protocol_info)
+
     def BatchCommandSubmitFiltered(self, commands: List[tuple], priority: tuple, xmit: int):
         for c in commands:
             if len(c) != 2:
@@ -457,7 +869,7 @@ class Node:
             #    self._secure_messaging.Send(cmd)
             #    continue
 
-            self._translator.SendCommand(self.n, key, values, priority, xmit)
+            self.mailbox.SendCommand(key, values, priority, xmit)
 
     def BatchCommandSubmitFilteredSlow(self, commands: List[tuple], xmit: int = XMIT_OPTIONS):
         self.BatchCommandSubmitFiltered(commands, NodePriorityLo(self.n), xmit)
@@ -471,6 +883,9 @@ class Node:
     #
     #   return self._secure_commands.HasCommandClass(key0)
 
+    def Ping(self, retries: int, force: bool, reason: str):
+        self.mailbox.Ping(retries, force, reason)
+
     def ProbeNode(self):
         self.BatchCommandSubmitFilteredFast([(z.NoOperation_Set, {})])
 
@@ -580,44 +995,55 @@ class Node:
             self.RefreshDynamicValues()
             self.RefreshSemiStaticValues()
 
-    def put(self, ts: float, key: tuple, values: Dict):
-        """A Node receives new commands via this function"""
+    def put(self, ts: float, key: tuple, values: Dict) -> List[ValueChange]:
+        """A Node receives new commands via this function.
+
+        Returns the changes of the cached values caused by the command.
+        """
         self.last_contact = ts
+        changes = []
 
         if key == command.CUSTOM_COMMAND_APPLICATION_UPDATE:
             # maybe update generic+specific device
             if self.values.Get(command.CUSTOM_COMMAND_PROTOCOL_INFO) is None:
-                self.values.Set(
+                change = self.values.Set(
                     ts, command.CUSTOM_COMMAND_PROTOCOL_INFO, {
                         "device_type": (
                             0, values["generic"], values["specific"])})
+                if change:
+                    changes.append(change)
             k = values["generic"] * 256 + values["specific"]
             v = z.GENERIC_SPECIFIC_DB.get(k)
             if v is None:
                 logging.error("[%d] unknown generic device : %s",
                               self.n, repr(values))
-                return
+                return changes
             self.InitializeUnversioned(
                 values["commands"], values["controls"], v[1], v[2])
             self.MaybeChangeState(NODE_STATE_DISCOVERED)
             if self.state >= NODE_STATE_INTERVIEWED:
                 self.RefreshDynamicValues()
                 self.RefreshSemiStaticValues()
-            return
+            return changes
 
         if self.state < NODE_STATE_DISCOVERED and not command.IsCustom(key):
-            self._translator.Ping(self.n, 3, False, "undiscovered")
+            self.Ping(3, False, "undiscovered")
 
         items_extractor = _COMMANDS_WITH_MAP_VALUES.get(key)
         if items_extractor:
             for k, v in items_extractor(values):
-                self.values.SetMapEntry(ts, key, k, v)
+                change = self.values.SetMapEntry(ts, key, k, v)
+                if change:
+                    changes.append(change)
         else:
-            self.values.Set(ts, key, values)
+            change = self.values.Set(ts, key, values)
+            if change:
+                changes.append(change)
 
         special = _COMMANDS_WITH_SPECIAL_ACTIONS.get(key)
         if special:
             special(ts, self, values)
+        return changes
 
         # elif a == command.ACTION_STORE_SCENE:
         #    if value[0] == 0:
@@ -636,6 +1062,29 @@ class Node:
         #        self.SecurityRequestClasses()
 
 
+class StalenessPolicy:
+    """
+    StalenessPolicy decides whether a node restored from a snapshot
+    needs to be interviewed again.
+
+    That is the case if the node had not been interviewed when the
+    snapshot was taken or if the interview (as witnessed by the
+    ManufacturerSpecific_Report) is older than max_static_age.
+    Pass max_static_age=None to never re-interview interviewed nodes.
+    """
+
+    def __init__(self, max_static_age: Optional[float] = 7 * 24 * 3600.0):
+        self.max_static_age = max_static_age
+
+    def NeedsInterview(self, node: "Node", state: str, now: float) -> bool:
+        if state < NODE_STATE_INTERVIEWED:
+            return True
+        ts = node.values.GetTimestamp(z.ManufacturerSpecific_Report)
+        if ts is None:
+            return True
+        return self.max_static_age is not None and now - ts > self.max_static_age
+
+
 class Nodeset(object):
     """NodeSet represents the collection of all nodes in the network.
 
@@ -644,25 +1093,129 @@ class Nodeset(object):
 
     It is not involved in outgoing messages which have to be sent directly to the
     CommandTranslator.
+
+    Listeners registered via AddListener() are only notified about commands
+    which changed a cached value (see NodeValues): listener.put(n, ts, key, change)
+    is called with a ValueChange for every changed value.
     """
 
-    def __init__(self, translator: CommandTranslator, controller_n):
+    def __init__(self, translator: CommandTranslator, controller_n,
+                 compact_values=False, series_policies=None, deadbands=None):
         self._controller_n: int = controller_n
+        self._compact_values = compact_values
+        self._series_policies = series_policies
+        self._deadbands = deadbands
         self._translator = translator
+        self._listeners = []
         self.nodes: Dict[int, Node] = {}
+        self.index = ValueIndex()
         translator.AddListener(self)
 
+    def AddListener(self, listener):
+        self._listeners.append(listener)
+
     def DropNode(self, n: int):
         del self.nodes[n]
+        self.index.DropNode(n)
 
     def GetNode(self, n: int) -> Node:
         node = self.nodes.get(n)
         if node is None:
-            node = Node(n, self._translator, n == self._controller_n)
+            node = Node(n, self._translator, n == self._controller_n,
+                        self._compact_values, self._series_policies,
+                        self._deadbands, self.index)
             self.nodes[n] = node
         return node
 
     def put(self, n: int, ts: float, key: tuple, values: Dict):
         """NodeSet receives commands via this function"""
         node = self.GetNode(n)
-        node.put(ts, key, values)
+        changes = node.put(ts, key, values)
+        if not self._listeners:
+            return
+        for change in changes:
+            for listener in self._listeners:
+                listener.put(n, ts, key, change)
+
+    def NodesWithValue(self, key: tuple) -> List[int]:
+        """Returns the nodes which have reported the given command"""
+        return self.index.Nodes(key)
+
+    def NodesWithCommandClass(self, cls: int) -> List[int]:
+        return self.index.NodesWithCommandClass(cls)
+
+    def Readings(self, kind: str, unit: Optional[str] = None) -> List[Tuple[int, tuple, Any, Any]]:
+        """
+        Returns the current readings of the given kind (and unit) across
+        all nodes as (n, key, subkey, value) tuples, e.g.
+            [x for x in nodeset.Readings(SENSOR_KIND_BATTERY) if x[3] < 20]
+        are the nodes with a battery level below 20%.
+        """
+        out = []
+        for n, key, subkey in self.index.Readings(kind, unit):
+            values = self.nodes[n].values
+            if subkey is None:
+                val = values.Get(key)
+            else:
+                val = values.GetMap(key)[subkey][1]
+            out.append((n, key, subkey, _Scalar(val)))
+        return out
+
+    def SaveSnapshot(self, path: str):
+        """Saves the state of all nodes to path (see snapshot.py)"""
+        snapshot.WriteSnapshot(
+            path, [self.nodes[n].Snapshot() for n in sorted(self.nodes)])
+
+    def RestoreSnapshot(self, path: str, policy: StalenessPolicy = None,
+                        now: float = None,
+                        nodes=None) -> Tuple[List[int], List[int]]:
+        """
+        Restores the nodes from a snapshot written by SaveSnapshot().
+
+        Nodes which the policy considers fresh go straight to
+        NODE_STATE_INTERVIEWED and only have their dynamic values
+        refreshed. Stale nodes go back to NODE_STATE_DISCOVERED and are
+        interviewed again. Nodes which were not discovered when the
+        snapshot was taken keep their state.
+
+        If nodes is given, e.g. the nodes the controller knows about, the
+        records of other nodes are skipped.
+
+        Returns the numbers of the fresh and of the stale nodes.
+        """
+        if policy is None:
+            policy = StalenessPolicy()
+        if now is None:
+            now = time.time()
+        _, records = snapshot.ReadSnapshot(path)
+        fresh = []
+        stale = []
+        for r in records:
+            if nodes is not None and r["n"] not in nodes:
+                logging.warning("skipping node %d from snapshot", r["n"])
+                continue
+            node = self.GetNode(r["n"])
+            node.Restore(r)
+            state = r["state"]
+            if state < NODE_STATE_DISCOVERED:
+                node.state = state
+            elif policy.NeedsInterview(node, state, now):
+                stale.append(node.n)
+                node.state = NODE_STATE_DISCOVERED
+                node.RefreshStaticValues()
+            else:
+                fresh.append(node.n)
+                node.state = NODE_STATE_INTERVIEWED
+                node.RefreshDynamicValues()
+        logging.warning("restored %d fresh and %d stale nodes from %s",
+                        len(fresh), len(stale), path)
+        return fresh, stale
+
+    def History(self, n: int, key: tuple, subkey: Any = None,
+                start: Optional[float] = None,
+                end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """See NodeValues.History()"""
+        node = self.nodes.get(n)
+        if node is None:
+            return []
+        return node.values.History(key, subkey, start, end)
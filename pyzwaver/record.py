@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+record.py contains a compact, read-only alternative to the dicts produced
+by command.ParseCommand.
+
+A Record stores its fields in __slots__ and behaves like a dict for
+reading (v["level"], v.get("dt"), "unit" in v, items(), ...). Records
+compare equal to dicts with the same items and their repr() matches
+that of the dict. Use ToDict() where a real dict is needed, e.g. for
+json.dumps().
+
+There is one Record class per set of field names which in practice
+means one per command (see SUBCMD_TO_PARSE_TABLE) plus variants for
+optional fields and one per kind of nested value (meter readings, ...).
+"""
+
+from typing import Dict
+
+# field names -> Record class
+_CLASSES = {}
+
+
+class Record:
+    __slots__ = ()
+    # field names in order
+    _fields = ()
+    # field name -> slot descriptor
+    _slots = {}
+
+    def __init__(self, values):
+        for slot, v in zip(self._slots.values(), values):
+            slot.__set__(self, v)
+
+    def __getitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            raise KeyError(key)
+        return slot.__get__(self)
+
+    def get(self, key, default=None):
+        slot = self._slots.get(key)
+        if slot is None:
+            return default
+        return slot.__get__(self)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return [slot.__get__(self) for slot in self._slots.values()]
+
+    def items(self):
+        return [(k, slot.__get__(self)) for k, slot in self._slots.items()]
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return len(self) == len(other) and all(
+                k in other and other[k] == v for k, v in self.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{" + ", ".join("%r: %r" % kv for kv in self.items()) + "}"
+
+    def ToDict(self) -> Dict:
+        """Returns the content as (nested) dicts"""
+        return {k: v.ToDict() if isinstance(v, Record) else v
+                for k, v in self.items()}
+
+
+def RecordClass(fields: tuple):
+    cls = _CLASSES.get(fields)
+    if cls is None:
+        slot_names = tuple("f%d" % i for i in range(len(fields)))
+        cls = type("Record", (Record,), {"__slots__": slot_names,
+                                         "_fields": fields})
+        cls._slots = {name: getattr(cls, s)
+                      for name, s in zip(fields, slot_names)}
+        _CLASSES[fields] = cls
+    return cls
+
+
+def Compact(value):
+    """
+    Converts a (nested) dict with string keys into Records.
+    Other values are returned unchanged.
+    """
+    if not isinstance(value, dict):
+        return value
+    for k in value:
+        if not isinstance(k, str):
+            return value
+    cls = RecordClass(tuple(value.keys()))
+    return cls([Compact(v) for v in value.values()])
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+snapshot.py contains the file format used by Nodeset.SaveSnapshot()
+and Nodeset.RestoreSnapshot().
+
+A snapshot is a JSON-lines file: a header line
+    {"version": 1, "ts": <time of snapshot>}
+followed by one line per record (usually one per node).
+
+JSON has no tuples, sets, bytes or dicts with non-string keys, all of
+which occur in parsed commands and as NodeValues keys, so these are
+encoded as single entry dicts:
+    (1, 2)        -> {"__t": [1, 2]}
+    {"a", "b"}    -> {"__s": ["a", "b"]}
+    b"\x01\x02"   -> {"__b": "0102"}
+    {1: "x"}      -> {"__m": [[1, "x"]]}
+Records (see record.py) are written as plain dicts.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+from pyzwaver.record import Record
+
+SNAPSHOT_VERSION = 1
+
+
+def _Encode(x: Any) -> Any:
+    if isinstance(x, dict):
+        for k in x:
+            if not isinstance(k, str):
+                return {"__m": [[_Encode(k), _Encode(v)] for k, v in x.items()]}
+        return {k: _Encode(v) for k, v in x.items()}
+    elif isinstance(x, list):
+        return [_Encode(v) for v in x]
+    elif isinstance(x, tuple):
+        return {"__t": [_Encode(v) for v in x]}
+    elif isinstance(x, Record):
+        return {k: _Encode(v) for k, v in x.items()}
+    elif isinstance(x, (set, frozenset)):
+        return {"__s": sorted((_Encode(v) for v in x), key=repr)}
+    elif isinstance(x, (bytes, bytearray)):
+        return {"__b": x.hex()}
+    return x
+
+
+def _DecodeObject(d: Dict) -> Any:
+    if len(d) != 1:
+        return d
+    for tag, val in d.items():
+        if tag == "__t":
+            return tuple(val)
+        elif tag == "__s":
+            return set(val)
+        elif tag == "__b":
+            return bytes.fromhex(val)
+        elif tag == "__m":
+            return {k: v for k, v in val}
+    return d
+
+
+def Encode(x: Any) -> str:
+    """Encodes x as a single line of JSON"""
+    return json.dumps(_Encode(x), separators=(",", ":"))
+
+
+def Decode(line: str) -> Any:
+    return json.loads(line, object_hook=_DecodeObject)
+
+
+def WriteSnapshot(path: str, records: List[Dict], ts: float = None):
+    """Writes the records to path, replacing an existing file atomically"""
+    if ts is None:
+        ts = time.time()
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fp:
+        fp.write(Encode({"version": SNAPSHOT_VERSION, "ts": ts}) + "\n")
+        for r in records:
+            fp.write(Encode(r) + "\n")
+    os.replace(tmp, path)
+
+
+def ReadSnapshot(path: str) -> Tuple[Dict, List[Dict]]:
+    """Returns the header and the records of a snapshot.
+
+    Raises ValueError for snapshots written in an unknown format version.
+    """
+    with open(path) as fp:
+        header = Decode(fp.readline())
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError("unsupported snapshot version: %s" %
+                             header.get("version"))
+        records = [Decode(line) for line in fp if line.strip()]
+    return header, records
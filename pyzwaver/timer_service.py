@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+# Copyright 2016 Robert Muth <robert@muth.org>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+"""
+timer_service.py contains a deadline scheduler which runs all
+timers on a single thread.
+"""
+
+import heapq
+import logging
+import threading
+import time
+
+
+class Timer:
+    """Handle for a scheduled callback - see TimerService.Cancel()"""
+
+    __slots__ = ["deadline", "callback", "args", "cancelled"]
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerService:
+    """
+    Runs callbacks at given deadlines on a single thread backed by a
+    heap. This replaces spawning a threading.Timer for every timeout.
+
+    Callbacks with the same deadline run in the order they were
+    scheduled. Callbacks must be short as they delay all later timers.
+    Cancelled timers are only dropped from the heap when they come due.
+    """
+
+    def __init__(self, name="Timers"):
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._terminate = False
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self._thread = threading.Thread(target=self._TimerThread,
+                                        name=name, daemon=True)
+        self._thread.start()
+
+    def __str__(self):
+        return "timers scheduled: %d fired: %d cancelled: %d pending: %d" % (
+            self.scheduled, self.fired, self.cancelled, self.Pending())
+
+    def Pending(self):
+        return self.scheduled - self.fired - self.cancelled
+
+    def ScheduleAt(self, deadline: float, callback, *args) -> Timer:
+        timer = Timer(deadline, callback, args)
+        with self._cond:
+            self.scheduled += 1
+            self._seq += 1
+            heapq.heappush(self._heap, (deadline, self._seq, timer))
+            # only wake up the thread if its next deadline changed
+            if self._heap[0][2] is timer:
+                self._cond.notify()
+        return timer
+
+    def Schedule(self, delay: float, callback, *args) -> Timer:
+        return self.ScheduleAt(time.time() + delay, callback, *args)
+
+    def Cancel(self, timer: Timer):
+        with self._cond:
+            if timer.cancelled or timer.callback is None:
+                return
+            timer.cancelled = True
+            self.cancelled += 1
+
+    def Terminate(self):
+        with self._cond:
+            self._terminate = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _NextDue(self):
+        # Note, caller must hold the lock
+        while not self._terminate:
+            if not self._heap:
+                self._cond.wait()
+                continue
+            deadline, _, timer = self._heap[0]
+            if timer.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            now = time.time()
+            if deadline > now:
+                self._cond.wait(deadline - now)
+                continue
+            heapq.heappop(self._heap)
+            self.fired += 1
+            # mark as fired so a late Cancel() is a no-op
+            callback, timer.callback = timer.callback, None
+            return callback, timer.args
+        return None, None
+
+    def _TimerThread(self):
+        logging.warning("_TimerThread started")
+        while True:
+            with self._cond:
+                callback, args = self._NextDue()
+            if callback is None:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error("timer callback %s failed: %s", callback, e)
+        logging.warning("_TimerThread terminated")
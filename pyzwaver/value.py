@@ -43,7 +43,7 @@ SECURITY_KEY_VERIFY = "SecurityKeyVerify"
 
 
 def GetSingleScalar(key, args):
-    table = z.SUBCMD_TO_PARSE_TABLE[key[0] * 256 + key[1]]
+    table = z.SUBCMD_PARSE_TABLES[key[0] * 256 + key[1]]
     assert len(table) == 1
     name = table[0][2:-1]
     return args[name]
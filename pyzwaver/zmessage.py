@@ -21,12 +21,14 @@ that decides when a message has been properly processed.
 """
 
 import collections
+import json
 import logging
 import threading
 import time
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pyzwaver import zwave as z
+from pyzwaver.timer_service import TimerService
 
 
 # ==================================================
@@ -100,7 +102,7 @@ def PrettifyRawMessage(m):
     elif func == z.API_APPLICATION_COMMAND_HANDLER and len(m) > 8:
         out[6] = "len:" + out[6]
         out[5] = "node:" + out[5]
-        s = z.SUBCMD_TO_STRING.get(m[7] * 256 + m[8])
+        s = z.SUBCMD_NAMES[m[7] * 256 + m[8]]
         if s:
             out[7] = s + ":" + out[7]
             out[8] = "X:" + out[8]
@@ -137,7 +139,7 @@ def PrettifyRawMessage(m):
                 out[4] = "node:" + out[4]
                 out[-2] = "cb:" + out[-2]
                 out[-3] = "xmit:" + out[-3]
-                s = z.SUBCMD_TO_STRING.get(m[6] * 256 + m[7])
+                s = z.SUBCMD_NAMES[m[6] * 256 + m[7]]
                 if s:
                     out[6] = s + ":" + out[6]
                     out[7] = "X:" + out[7]
@@ -149,6 +151,81 @@ def PrettifyRawMessage(m):
     return " ".join(out)
 
 
+def DecodeRawMessageFields(m) -> dict:
+    """Returns the most important fields of a raw message as a dict"""
+    if m is None or len(m) <= 4 or m[0] != z.SOF:
+        return {}
+    out = {
+        "kind": "REQU" if m[2] == z.REQUEST else "RESP",
+        "func": z.API_TO_STRING.get(m[3], "%02x" % m[3]),
+    }
+    func = m[3]
+    if func == z.API_APPLICATION_COMMAND_HANDLER and len(m) > 8:
+        out["node"] = m[5]
+        out["command"] = z.SUBCMD_NAMES[m[7] * 256 + m[8]]
+    elif func == z.API_ZW_APPLICATION_UPDATE and len(m) > 5:
+        out["node"] = m[5]
+    elif (func == z.API_ZW_SEND_DATA and m[2] == z.REQUEST and
+          len(m) > 9):
+        out["node"] = m[4]
+        out["command"] = z.SUBCMD_NAMES[m[6] * 256 + m[7]]
+        out["cb"] = m[-2]
+    return out
+
+
+class LazyRawMessage:
+    """
+    Wraps a raw message passed as an argument to the logging functions
+    so that it is only prettified if a handler actually emits the record,
+    e.g. logging.info("sent: %s", LazyRawMessage(m)).
+
+    The prettified form and the decoded fields (used by
+    StructuredLogFormatter) are computed at most once.
+    """
+
+    __slots__ = ("raw", "_pretty", "_fields")
+
+    def __init__(self, m):
+        self.raw = m
+        self._pretty = None
+        self._fields = None
+
+    def __str__(self):
+        if self._pretty is None:
+            self._pretty = PrettifyRawMessage(self.raw)
+        return self._pretty
+
+    def Fields(self) -> dict:
+        if self._fields is None:
+            self._fields = DecodeRawMessageFields(self.raw)
+        return self._fields
+
+
+class StructuredLogFormatter(logging.Formatter):
+    """
+    Formats log records as one json object per line. The raw bytes and
+    decoded fields of LazyRawMessage arguments are recorded as "frames".
+    Use it with any handler, e.g.:
+        handler.setFormatter(zmessage.StructuredLogFormatter())
+    """
+
+    def format(self, record):
+        out = {
+            "ts": record.created,
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        args = record.args if isinstance(record.args, tuple) else ()
+        frames = [{"raw": a.raw.hex() if a.raw is not None else None,
+                   "fields": a.Fields()}
+                  for a in args if isinstance(a, LazyRawMessage)]
+        if frames:
+            out["frames"] = frames
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out)
+
+
 def RawMessageFuncId(data):
     return data[-2]
 
@@ -185,47 +262,167 @@ def ExtracRawMessage(data):
     return data[0:length + 2]
 
 
+# pre-made single byte frames, e.g. ACK, NAK, CAN, to avoid allocations
+_SINGLE_BYTE_FRAMES = [bytes([i]) for i in range(256)]
+
+
+class RawFrameReader:
+    """
+    Splits the byte stream coming from the serial device into raw messages.
+
+    Feed() accepts whatever chunk of bytes the device had available and returns
+    all the complete frames (SOF messages and single byte ACK/NAK/CAN) found so
+    far. Partial SOF messages are retained until the rest arrives.
+    Consumed bytes are tracked with a cursor so we do not copy the
+    unprocessed part of the buffer after every frame.
+    """
+
+    # compact the buffer once this many consumed bytes have accumulated
+    _COMPACTION_THRESHOLD = 4096
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+        # stats
+        self.reads = 0
+        self.bytes = 0
+        self.frames = 0
+
+    def Pending(self) -> int:
+        """Number of received bytes not yet part of a complete frame"""
+        return len(self._buf) - self._pos
+
+    def Feed(self, data) -> List[bytes]:
+        self.reads += 1
+        self.bytes += len(data)
+        buf = self._buf
+        buf += data
+        pos = self._pos
+        end = len(buf)
+        out = []
+        while pos < end:
+            first = buf[pos]
+            if first != z.SOF:
+                out.append(_SINGLE_BYTE_FRAMES[first])
+                pos += 1
+                continue
+            # same criteria as ExtracRawMessage()
+            if end - pos < 5:
+                break
+            # +2: includes the SOF byte and the length byte
+            frame_end = pos + buf[pos + 1] + 2
+            if frame_end > end:
+                break
+            out.append(bytes(buf[pos:frame_end]))
+            pos = frame_end
+
+        if pos == end:
+            buf.clear()
+            pos = 0
+        elif pos >= self._COMPACTION_THRESHOLD:
+            del buf[:pos]
+            pos = 0
+        self._pos = pos
+        self.frames += len(out)
+        return out
+
+    def __str__(self):
+        reads = max(1, self.reads)
+        return "rx reads: %d  bytes: %d (%.1f/read)  frames: %d (%.2f/read)" % (
+            self.reads, self.bytes, self.bytes / reads,
+            self.frames, self.frames / reads)
+
+
 # ==================================================
 
+# The builders below compute the checksum over the (short) data and fold in
+# the header bytes as ints, then emit the frame with a single formatting op.
+
+
 def MakeRawMessage(func, data):
-    out = [z.SOF, len(data) + 3, z.REQUEST, func] + data
-    # check sum over everything except the first byte
-    out.append(Checksum(out) ^ z.SOF)
-    return bytes(out)
+    n = len(data) + 3
+    checksum = Checksum(data) ^ n ^ z.REQUEST ^ func
+    return b"%c%c%c%c%b%c" % (z.SOF, n, z.REQUEST, func, bytes(data),
+                              checksum)
 
 
 def MakeRawMessageWithId(func, data, cb_id=None):
     if cb_id is None:
         cb_id = CallbackId()
-    out = [z.SOF, len(data) + 4, z.REQUEST, func] + data + [cb_id]
-    # check sum over everything except the first byte
-    out.append(Checksum(out) ^ z.SOF)
-    return bytes(out)
+    n = len(data) + 4
+    checksum = Checksum(data) ^ n ^ z.REQUEST ^ func ^ cb_id
+    return b"%c%c%c%c%b%c%c" % (z.SOF, n, z.REQUEST, func, bytes(data),
+                                cb_id, checksum)
+
+
+def _MakeSendData(func, node, data, xmit, cb_id):
+    if cb_id is None:
+        cb_id = CallbackId()
+    size = len(data)
+    n = size + 7
+    checksum = 0xff ^ n ^ z.REQUEST ^ func ^ node ^ size ^ xmit ^ cb_id
+    for b in data:
+        checksum ^= b
+    return b"%c%c%c%c%c%c%b%c%c%c" % (z.SOF, n, z.REQUEST, func, node, size,
+                                      bytes(data), xmit, cb_id, checksum)
 
 
 def MakeRawCommandWithId(node, data, xmit, cb_id=None):
-    out = [node, len(data)] + data + [xmit]
-    return MakeRawMessageWithId(z.API_ZW_SEND_DATA, out, cb_id)
+    return _MakeSendData(z.API_ZW_SEND_DATA, node, data, xmit, cb_id)
+
+
+class RawCommandTemplate:
+    """
+    Precomputed MakeRawCommandWithId() frame for a given command and xmit.
+    Make() only patches the node, the callback id and the checksum.
+    """
+    __slots__ = ("_head", "_body", "_checksum")
+
+    def __init__(self, data, xmit):
+        frame = MakeRawCommandWithId(0, list(data), xmit, 0)
+        # SOF len REQU API_ZW_SEND_DATA
+        self._head = frame[:4]
+        # len data xmit
+        self._body = frame[5:-2]
+        # checksum with node and callback id both 0
+        self._checksum = frame[-1]
+
+    def Make(self, node, cb_id=None):
+        if cb_id is None:
+            cb_id = CallbackId()
+        return b"%b%c%b%c%c" % (self._head, node, self._body, cb_id,
+                                self._checksum ^ node ^ cb_id)
 
 
 def MakeRawReplicationCommandWithId(node, data, xmit, cb_id=None):
-    out = [node, len(data)] + data + [xmit]
-    return MakeRawMessageWithId(z.API_ZW_REPLICATION_SEND_DATA, out, cb_id)
+    return _MakeSendData(z.API_ZW_REPLICATION_SEND_DATA, node, data, xmit,
+                         cb_id)
 
 
 def MakeRawCommandMultiWithId(nodes, data, xmit, cb_id=None):
-    out = [len(nodes)] + nodes + [len(data)] + data + [xmit]
+    out = [len(nodes)] + list(nodes) + [len(data)] + list(data) + [xmit]
     return MakeRawMessageWithId(z.API_ZW_SEND_DATA_MULTI, out, cb_id)
 
 
 def MakeRawCommand(node, data, xmit):
-    out = [node, len(data)] + data + [xmit]
+    out = [node, len(data)] + list(data) + [xmit]
     return MakeRawMessage(z.API_ZW_SEND_DATA, out)
 
 
 def MakeRawReplicationSendDataWithId(node, data, xmit, cb_id=None):
-    out = [node, len(data)] + data + [xmit]
-    return MakeRawMessageWithId(z.API_ZW_REPLICATION_SEND_DATA, out, cb_id)
+    return _MakeSendData(z.API_ZW_REPLICATION_SEND_DATA, node, data, xmit,
+                         cb_id)
+
+
+def IsValidFrame(m) -> bool:
+    """Checks the length byte and the checksum of a received SOF frame"""
+    if len(m) != m[1] + 2:
+        return False
+    # same as Checksum() but saves a call on every received frame
+    checksum = 0xff
+    for b in m:
+        checksum ^= b
+    return checksum == z.SOF
 
 
 RAW_MESSAGE_ACK = bytes([z.ACK])
@@ -355,6 +552,12 @@ for x in _COMMANDS_WITH_MULTI_REQUESTS:
 # zwave.API_ZW_REQUEST_NETWORK_UPDATE: [ACTION_REPORT_NE, -1],
 
 
+def IsCoalescable(key):
+    """Get commands for which duplicates can be merged (see Message.Merge)"""
+    flags = z.SUBCMD_FLAGS[key]
+    return (flags & z.SUBCMD_FLAG_GET) and not (flags & z.SUBCMD_FLAG_SECURITY)
+
+
 class Message:
     """Message describes and outgoing message and the actions/callbacks used to determine
     when it has been fully processed.
@@ -362,18 +565,25 @@ class Message:
     """
 
     def __init__(self, payload, priority: tuple, callback, node,
-                 timeout=1.0, action_requ=None, action_resp=None):
+                 timeout=None, action_requ=None, action_resp=None):
         self.payload = payload
         self.priority = priority
         self.node = node
         self._callback = callback
+        # None means adaptive (see RttEstimator)
         self.timeout = timeout
         self.start = None
+        # when the message was handed to the stick
+        self.sent = None
         self.end = None
         self.can = 0
+        # whether the stick has ACKed the (last transmission of) the frame
+        self.acked = False
         self.state = MESSAGE_STATE_CREATED
         self.action_requ = action_requ
         self.action_resp = action_resp
+        # queued copies of this message which were merged into it (see Merge)
+        self.duplicates = []
         if payload is None:
             return
         func = payload[3]
@@ -395,19 +605,51 @@ class Message:
         return (self.state in MESSAGE_STATES_FINAL and
                 self.state != MESSAGE_STATE_COMPLETED)
 
+    def CoalescingKey(self):
+        """
+        Returns a key which is equal for messages which only differ in
+        their callback id or None if the message must not be merged
+        with others (see Merge).
+        Only (non-security) Get commands qualify.
+        """
+        if (self.payload is None or self.payload[3] != z.API_ZW_SEND_DATA or
+                len(self.payload) < 10 or
+                not IsCoalescable(self.payload[6] * 256 + self.payload[7])):
+            return None
+        # drop callback id and checksum
+        return bytes(self.payload[4:-2])
+
+    def Merge(self, other):
+        """
+        Makes other, a duplicate of this message which will not be sent,
+        complete together with this message. The callbacks of both are
+        invoked.
+        """
+        self.duplicates.append(other)
+
+    def _Callback(self, m):
+        for d in self.duplicates:
+            if d._callback:
+                d._callback(m)
+        if self._callback:
+            self._callback(m)
+
     def _CompleteNoMessage(self, ts, state):
         assert state in MESSAGE_STATES_FINAL
         self.state = state
         self.end = ts
+        for d in self.duplicates:
+            d.start = self.start
+            d.state = state
+            d.end = ts
         if state == MESSAGE_STATE_TIMEOUT:
-            logging.error("%s: %s", state, PrettifyRawMessage(self.payload))
+            logging.error("%s: %s", state, LazyRawMessage(self.payload))
         else:
-            logging.info("%s: %s", state, PrettifyRawMessage(self.payload))
+            logging.info("%s: %s", state, LazyRawMessage(self.payload))
         return state
 
     def Complete(self, ts, m, state):
-        if self._callback:
-            self._callback(m)
+        self._Callback(m)
         return self._CompleteNoMessage(ts, state)
 
     def MaybeCompleteAck(self, ts, m):
@@ -421,16 +663,16 @@ class Message:
         func = self.payload[3]
         if m[3] != func:
             logging.error("[%d %s unexpected request/response: %s",
-                          self.node, PrettifyRawMessage(self.payload),
-                          PrettifyRawMessage(m))
+                          self.node, LazyRawMessage(self.payload),
+                          LazyRawMessage(m))
             return "unexpected"
 
         cbid = self.payload[-2]
         if self.action_requ[0] == ACTION_MATCH_CBID_MULTI:
             if m[4] != cbid:
                 logging.error("[%d] %s unexpected call back id: %s",
-                              self.node, PrettifyRawMessage(self.payload),
-                              PrettifyRawMessage(m))
+                              self.node, LazyRawMessage(self.payload),
+                              LazyRawMessage(m))
                 return "unexpected"
             assert self._callback is not None
             if not self._callback(m):
@@ -439,8 +681,8 @@ class Message:
         elif self.action_requ[0] == ACTION_MATCH_CBID:
             if m[4] != cbid:
                 logging.error("[%d] %s unexpected call back id: %s",
-                              self.node, PrettifyRawMessage(self.payload),
-                              PrettifyRawMessage(m))
+                              self.node, LazyRawMessage(self.payload),
+                              LazyRawMessage(m))
                 return "Unexpected"
             return self.Complete(ts, m, MESSAGE_STATE_COMPLETED)
 
@@ -448,7 +690,7 @@ class Message:
             logging.error(
                 "unexpected action: %s for %s",
                 self.action_requ[0],
-                PrettifyRawMessage(
+                LazyRawMessage(
                     self.payload))
             assert False
 
@@ -456,8 +698,8 @@ class Message:
         func = self.payload[3]
         if m[3] != func:
             logging.error("[%d %s unexpected request/response: %s",
-                          self.node, PrettifyRawMessage(self.payload),
-                          PrettifyRawMessage(m))
+                          self.node, LazyRawMessage(self.payload),
+                          LazyRawMessage(m))
             return "unexpected"
 
         if self.action_resp[0] == ACTION_REPORT:
@@ -472,17 +714,16 @@ class Message:
                 # Note, we currently do not record having received m
                 # as we have not seen failure modes requiring it.
                 logging.debug("delivered to stack")
-                if self._callback:
-                    self._callback(m)
+                self._Callback(m)
                 return "Continue"
             else:
                 logging.error("[%d] %s unexpected resp status is %d wanted %d",
-                              self.node, PrettifyRawMessage(self.payload),
+                              self.node, LazyRawMessage(self.payload),
                               m[4], self.action_resp[1])
 
                 return self.Complete(ts, m, MESSAGE_STATE_NOT_READY)
         else:
-            logging.error(self.action_resp[0], PrettifyRawMessage(m))
+            logging.error(self.action_resp[0], LazyRawMessage(m))
             assert False
 
     def __str__(self):
@@ -503,119 +744,379 @@ DO_RETRY = "DO_RETRY"
 DO_PROPAGATE = "DO_PROPAGATE"
 
 
-class InflightMessage:
+def NextActionForReceivedMessage(message: Optional[Message], ts: float, received):
     """
-    Manages the single message that may be in-flight
+    Decides what to do with a frame received from the stick given the
+    message currently in flight (which may be None).
+    This may advance the state of the message.
+
+    Returns the next action (DO_XXX) and a comment for the logs.
+    Note, no locking is done here - this is the job of the caller.
     """
+    if received[0] == z.NAK:
+        return DO_NOTHING, ""
+    elif received[0] == z.CAN:
+        if message is None:
+            logging.error("nothing to re-send after CAN")
+            return DO_NOTHING, "stray"
+        logging.error("re-sending message after CAN ==== %s",
+                      LazyRawMessage(message.payload))
+        message.acked = False
+        message.can += 1
+        return DO_RETRY, ""
+    elif received[0] == z.ACK:
+        if message is None:
+            logging.error("nothing to re-send after ACK")
+            return DO_NOTHING, "stray"
+        message.acked = True
+        text = message.MaybeCompleteAck(ts, received)
+        return DO_NOTHING, text
+    elif received[0] != z.SOF:
+        logging.error("received unknown start byte: %s", received[0])
+        return DO_NOTHING, "bad-unknown-start-byte"
+
+    if not IsValidFrame(received):
+        # maybe send a CAN?
+        logging.error("bad checksum or length")
+        return DO_NOTHING, "bad-checksum"
+
+    if received[2] == z.RESPONSE:
+        if message is None:
+            logging.error("nothing to re-send after RESPONSE")
+            return DO_ACK, "stray"
+        text = message.MaybeCompleteResponse(ts, received)
+        return DO_ACK, text
+    elif received[2] == z.REQUEST:
+        if (received[3] == z.API_ZW_APPLICATION_UPDATE or
+                received[3] == z.API_APPLICATION_COMMAND_HANDLER):
+            return DO_PROPAGATE, ""
+        else:
+            if message is None:
+                logging.error("nothing to re-send after REQUEST")
+                return DO_ACK, "stray"
+            text = message.MaybeCompleteRequest(ts, received)
+            return DO_ACK, text
+    else:
+        logging.error("message is neither request nor response")
+        return DO_NOTHING, "bad"
+
+
+class RttEstimator:
+    """
+    Estimates the round trip time of the messages to a node in the
+    style of TCP (RFC 6298) and derives from it
+    * the timeout for the next message
+    * the delay inserted before the next message
+
+    Only messages using the adaptive timeout (timeout=None) are sampled and
+    following Karn's algorithm messages which had to be re-sent are not.
+    Only SEND_DATA messages travel over the air, controller local queries
+    about a node (e.g. GetNodeProtocolInfo) get an estimator of their own
+    (see RttForMessage).
+    Each timeout doubles the timeout for the next message until a message
+    succeeds.
+    """
+
+    ALPHA = 1.0 / 8
+    BETA = 1.0 / 4
+    K = 4
+    INITIAL_TIMEOUT = 1.0
+    # lower bound for fast nodes which still leaves room for a re-route
+    MIN_TIMEOUT = 0.4
+    MAX_TIMEOUT = 5.0
+    # delay added per consecutive failure
+    MIN_SPACING = 0.02
+    MAX_DELAY = 0.2
 
     def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.rto = self.INITIAL_TIMEOUT
+        self.samples = 0
+        self.failures = 0
+
+    def Timeout(self) -> float:
+        return self.rto
+
+    def Delay(self) -> float:
+        if self.failures == 0:
+            return 0.0
+        spacing = max(self.MIN_SPACING, self.rttvar or 0.0)
+        return min(self.MAX_DELAY, self.failures * spacing)
+
+    def _Sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = ((1 - self.BETA) * self.rttvar +
+                           self.BETA * abs(self.srtt - rtt))
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples += 1
+        self.rto = min(self.MAX_TIMEOUT, max(
+            self.MIN_TIMEOUT, self.srtt + self.K * self.rttvar))
+
+    def Update(self, message: Message):
+        """Must be called once the message has reached a final state"""
+        if message.WasAborted():
+            self.failures += 1
+            if message.state == MESSAGE_STATE_TIMEOUT and message.timeout is None:
+                self.rto = min(self.MAX_TIMEOUT, 2 * self.rto)
+            return
+        self.failures = 0
+        if (message.timeout is None and message.can == 0 and
+                message.sent is not None and message.end is not None):
+            self._Sample(message.end - message.sent)
+
+    def Dict(self):
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "timeout": self.rto,
+            "delay": self.Delay(),
+            "samples": self.samples,
+            "failures": self.failures,
+        }
+
+
+def RttForMessage(rtts: Dict[int, RttEstimator], message: Message) -> RttEstimator:
+    """
+    Returns the estimator for the node the message is sent to.
+    Messages which never leave the stick get a throwaway estimator,
+    so they use the initial timeout and do not skew the node's estimate.
+    """
+    if message.payload is None or message.payload[3] != z.API_ZW_SEND_DATA:
+        return RttEstimator()
+    return rtts[message.node]
+
+
+def MessageTimeout(message: Message, rtt: RttEstimator) -> float:
+    if message.timeout is not None:
+        return message.timeout
+    return rtt.Timeout()
+
+
+# Serial API functions which the stick answers locally with a single
+# RESPONSE (no RF traffic, no callback REQUEST). Several of these may be
+# in flight at the same time (see InflightMessage).
+_PIPELINEABLE_COMMANDS = {
+    z.API_ZW_GET_SUC_NODE_ID,
+    z.API_ZW_GET_VERSION,
+    z.API_ZW_MEMORY_GET_ID,
+    z.API_ZW_GET_CONTROLLER_CAPABILITIES,
+    z.API_SERIAL_API_GET_CAPABILITIES,
+    z.API_ZW_GET_RANDOM,
+    z.API_SERIAL_API_GET_INIT_DATA,
+    z.API_ZW_GET_NODE_PROTOCOL_INFO,
+    z.API_ZW_IS_FAILED_NODE_ID,
+    z.API_ZW_GET_ROUTING_INFO,
+    z.API_ZW_READ_MEMORY,
+}
+
+
+def IsPipelineable(message: Message) -> bool:
+    return (message.payload is not None and
+            message.payload[3] in _PIPELINEABLE_COMMANDS and
+            message.action_requ == [ACTION_NONE] and
+            message.action_resp == [ACTION_REPORT])
+
+
+# backoff per CAN received before a message is re-sent
+RETRY_BACKOFF = 0.01
+
+
+class InflightMessage:
+    """
+    Manages the messages that may be in-flight
+
+    Usually this is a single message. With a pipeline_depth > 1 up to
+    pipeline_depth pipelineable messages (see IsPipelineable) may be
+    in flight at the same time. Their RESPONSEs are matched by function
+    id in the order the messages were sent.
+    As the serial API requires, a frame is only written once the stick
+    has ACKed the previous one, so ACK/CAN/NAK always refer to the single
+    un-ACKed frame.
+    A non-pipelineable message always waits for the pipeline to drain
+    and blocks the pipeline while it is in flight.
+
+    All the timing (per node delays, timeouts, retries after a CAN) is
+    handled by the timer service, the actual sending by the send
+    callback: send(payload, comment).
+    If provided, on_completion(message) is invoked (with the lock held)
+    once a message has reached a final state.
+    """
+
+    def __init__(self, timers: TimerService, send, pipeline_depth=1,
+                 on_completion=None):
+        self._timers = timers
+        self._send = send
+        self._on_completion = on_completion
+        self._pipeline_depth = pipeline_depth
+        # the non-pipelined message in flight
         self._message: Optional[Message] = None
-        self._timeout_thread: Optional[threading.Timer] = None
-        self._delay = collections.defaultdict(int)
-        # this lock controls all accesses to the instance
-        self._lock = threading.Lock()
-        # this lock control whether there is an active instance
-        self._message_lock = threading.Lock()
+        # the pipelined messages in flight in the order they were sent
+        self._pipelined: List[Message] = []
+        # the pipelined message written to the stick but not yet ACKed
+        self._unacked: Optional[Message] = None
+        self._timeouts = {}
+        # number of messages started but waiting for their delay to pass
+        self._unsent = 0
+        self._last_due = 0.0
+        self._rtt = collections.defaultdict(RttEstimator)
+        # this lock controls all accesses to the instance and is also used
+        # to signal the completion of messages
+        self._lock = threading.Condition()
 
     def GetMessage(self) -> Message:
+        """
+        Returns the message most recently sent or None if nothing is in flight.
+        """
         with self._lock:
-            return self._message
+            if self._message is not None:
+                return self._message
+            if self._pipelined:
+                return self._pipelined[-1]
+            return None
+
+    def RttDict(self):
+        with self._lock:
+            return {n: r.Dict() for n, r in self._rtt.items()}
 
-    def _Timeout(self):
+    def PipelinedCount(self):
         with self._lock:
-            if self._message is None:
+            return len(self._pipelined)
+
+    def _Retire(self, message: Message):
+        # Note, caller must hold the lock
+        timeout = self._timeouts.pop(message, None)
+        if timeout is not None:
+            self._timers.Cancel(timeout)
+        if message in self._pipelined:
+            self._pipelined.remove(message)
+            RttForMessage(self._rtt, message).Update(message)
+        if message is self._unacked:
+            self._unacked = None
+        if self._on_completion:
+            self._on_completion(message)
+        self._lock.notify_all()
+
+    def _IsInflight(self, message: Message):
+        # Note, caller must hold the lock
+        return ((message is self._message or message in self._pipelined) and
+                message.state not in MESSAGE_STATES_FINAL)
+
+    def _Timeout(self, message: Message):
+        with self._lock:
+            if not self._IsInflight(message):
                 return
             logging.error(
                 "message timeout: %s",
-                PrettifyRawMessage(
-                    self._message.payload))
-            self._message.Complete(time.time(), None, MESSAGE_STATE_TIMEOUT)
-            self._message_lock.release()
+                LazyRawMessage(
+                    message.payload))
+            message.Complete(time.time(), None, MESSAGE_STATE_TIMEOUT)
+            self._Retire(message)
+
+    def _Transmit(self, message: Message, delayed):
+        with self._lock:
+            if delayed:
+                self._unsent -= 1
+            if message.state not in MESSAGE_STATES_FINAL:
+                self._timeouts[message] = self._timers.Schedule(
+                    MessageTimeout(message, RttForMessage(self._rtt, message)),
+                    self._Timeout, message)
+            message.sent = time.time()
+        self._send(message.payload, "")
+
+    def _Retry(self, message: Message):
+        with self._lock:
+            if not self._IsInflight(message):
+                return
+        self._send(message.payload, "re-try")
+
+    def _CanStart(self, pipelined):
+        if self._message is not None:
+            return False
+        if pipelined:
+            return (self._unacked is None and
+                    len(self._pipelined) < self._pipeline_depth)
+        return not self._pipelined
 
     def StartMessage(self, message: Message, ts: float):
-        self._message_lock.acquire()
+        """
+        Sends the message once the per node delay has passed.
+        Returns False if there was nothing to send.
+        """
+        pipelined = self._pipeline_depth > 1 and IsPipelineable(message)
         with self._lock:
-            assert self._message is None
+            self._lock.wait_for(lambda: self._CanStart(pipelined))
             message.Start(ts)
             if message.payload is None:
                 logging.warning("received empty message")
                 message.Complete(ts, None, MESSAGE_STATE_COMPLETED)
-                self._message_lock.release()
                 return False
-            self._message = message
-            self._timeout_thread = threading.Timer(
-                message.timeout, self._Timeout)
-            self._timeout_thread.start()
-            time.sleep(self._delay[message.node])
-            return True
+            if pipelined:
+                self._pipelined.append(message)
+                self._unacked = message
+            else:
+                self._message = message
+            # never overtake a message still waiting for its delay
+            delay = RttForMessage(self._rtt, message).Delay()
+            due = max(time.time() + delay, self._last_due)
+            self._last_due = due
+            delayed = self._unsent > 0 or delay > 0
+            if delayed:
+                self._unsent += 1
+                self._timers.ScheduleAt(due, self._Transmit, message, True)
+        if not delayed:
+            self._Transmit(message, False)
+        return True
 
     def WaitForMessageCompletion(self):
-        self._message_lock.acquire()
-        self._timeout_thread.cancel()
+        """
+        Waits for the non-pipelined message in flight to complete.
+        Returns immediately if the last message started was pipelined.
+        """
         with self._lock:
-            assert self._message is not None
-            node = self._message.node
-            if self._message.WasAborted():
-                if self._delay[node] < 0.08:
-                    self._delay[node] += 0.02
-            else:
-                if self._delay[node] >= 0.01:
-                    self._delay[node] -= 0.01
-        self._message = None
-        self._message_lock.release()
+            message = self._message
+            if message is None:
+                return
+            self._lock.wait_for(
+                lambda: message.state in MESSAGE_STATES_FINAL)
+            RttForMessage(self._rtt, message).Update(message)
+            self._message = None
+            self._lock.notify_all()
+
+    def _MessageForReceived(self, received) -> Optional[Message]:
+        # Note, caller must hold the lock
+        if self._message is not None:
+            return self._message
+        if not self._pipelined:
+            return None
+        if received[0] != z.SOF:
+            # ACK/CAN/NAK refer to the only frame not yet ACKed
+            return self._unacked
+        if len(received) > 3 and received[2] == z.RESPONSE:
+            for m in self._pipelined:
+                if m.payload[3] == received[3]:
+                    return m
+        return None
 
     def NextActionForReceivedMessage(self, ts: float, received):
+        """
+        Note, a DO_RETRY is handled here: the message is re-sent after
+        a backoff.
+        """
         with self._lock:
-            message: Message = self._message
-            if received[0] == z.NAK:
-                return DO_NOTHING, ""
-            elif received[0] == z.CAN:
-                if message is None:
-                    logging.error("nothing to re-send after CAN")
-                    return DO_NOTHING, "stray"
-                logging.error("re-sending message after CAN ==== %s",
-                              PrettifyRawMessage(message.payload))
-                message.can += 1
-                # does this help?
-                time.sleep(0.01)
-                return DO_RETRY, ""
-            elif received[0] == z.ACK:
-                if message is None:
-                    logging.error("nothing to re-send after ACK")
-                    return DO_NOTHING, "stray"
-                text = message.MaybeCompleteAck(ts, received)
-                if message.state in MESSAGE_STATES_FINAL:
-                    self._message_lock.release()
-                return DO_NOTHING, text
-            elif received[0] != z.SOF:
-                logging.error("received unknown start byte: %s", received[0])
-                return DO_NOTHING, "bad-unknown-start-byte"
-
-            if Checksum(received) != z.SOF:
-                # maybe send a CAN?
-                logging.error("bad checksum")
-                return DO_NOTHING, "bad-checksum"
-
-            if received[2] == z.RESPONSE:
-                if message is None:
-                    logging.error("nothing to re-send after RESPONSE")
-                    return DO_ACK, "stray"
-                text = message.MaybeCompleteResponse(ts, received)
-                if message.state in MESSAGE_STATES_FINAL:
-                    self._message_lock.release()
-                return DO_ACK, text
-            elif received[2] == z.REQUEST:
-                if (received[3] == z.API_ZW_APPLICATION_UPDATE or
-                        received[3] == z.API_APPLICATION_COMMAND_HANDLER):
-                    return DO_PROPAGATE, ""
-                else:
-                    if message is None:
-                        logging.error("nothing to re-send after REQUEST")
-                        return DO_ACK, "stray"
-                    text = message.MaybeCompleteRequest(ts, received)
-                    if message.state in MESSAGE_STATES_FINAL:
-                        self._message_lock.release()
-                    return DO_ACK, text
-            else:
-                logging.error("message is neither request nor response")
-                return DO_NOTHING, "bad"
+            message: Message = self._MessageForReceived(received)
+            was_final = message is not None and message.state in MESSAGE_STATES_FINAL
+            next_action, text = NextActionForReceivedMessage(message, ts, received)
+            if next_action == DO_RETRY:
+                self._timers.Schedule(RETRY_BACKOFF * message.can,
+                                      self._Retry, message)
+            elif (not was_final and message is not None and
+                  message.state in MESSAGE_STATES_FINAL):
+                self._Retire(message)
+            if message is not None and message is self._unacked and message.acked:
+                self._unacked = None
+                self._lock.notify_all()
+            return next_action, text
@@ -871,517 +871,508 @@ SUBCMD_TO_STRING = {
     0x9f0e: 'Security2_CommandsSupportedReport',
 }
 
-STRING_TO_SUBCMD = {
-    'NoOperation_Set': 0x0000,
-    'Basic_Set': 0x2001,
-    'Basic_Get': 0x2002,
-    'Basic_Report': 0x2003,
-    'ControllerReplication_TransferGroup': 0x2131,
-    'ControllerReplication_TransferScene': 0x2133,
-    'ApplicationStatus_Busy': 0x2201,
-    'ApplicationStatus_RejectedRequest': 0x2202,
-    'SwitchBinary_Set': 0x2501,
-    'SwitchBinary_Get': 0x2502,
-    'SwitchBinary_Report': 0x2503,
-    'SwitchMultilevel_Set': 0x2601,
-    'SwitchMultilevel_Get': 0x2602,
-    'SwitchMultilevel_Report': 0x2603,
-    'SwitchMultilevel_StartLevelChange': 0x2604,
-    'SwitchMultilevel_StopLevelChange': 0x2605,
-    'SwitchMultilevel_SupportedGet': 0x2606,
-    'SwitchMultilevel_SupportedReport': 0x2607,
-    'SwitchAll_Set': 0x2701,
-    'SwitchAll_Get': 0x2702,
-    'SwitchAll_Report': 0x2703,
-    'SwitchAll_On': 0x2704,
-    'SwitchAll_Off': 0x2705,
-    'SwitchToggleBinary_Set': 0x2801,
-    'SwitchToggleBinary_Get': 0x2802,
-    'SwitchToggleBinary_Report': 0x2803,
-    'SceneActivation_Set': 0x2b01,
-    'SceneActuatorConf_Set': 0x2c01,
-    'SceneActuatorConf_Get': 0x2c02,
-    'SceneActuatorConf_Report': 0x2c03,
-    'SceneControllerConf_Set': 0x2d01,
-    'SceneControllerConf_Get': 0x2d02,
-    'SceneControllerConf_Report': 0x2d03,
-    'SensorBinary_Get': 0x3002,
-    'SensorBinary_Report': 0x3003,
-    'SensorMultilevel_SupportedGet': 0x3101,
-    'SensorMultilevel_SupportedReport': 0x3102,
-    'SensorMultilevel_Get': 0x3104,
-    'SensorMultilevel_Report': 0x3105,
-    'Meter_Get': 0x3201,
-    'Meter_Report': 0x3202,
-    'Meter_SupportedGet': 0x3203,
-    'Meter_SupportedReport': 0x3204,
-    'Meter_Reset': 0x3205,
-    'ColorSwitch_SupportedGet': 0x3301,
-    'ColorSwitch_SupportedReport': 0x3302,
-    'ColorSwitch_Get': 0x3303,
-    'ColorSwitch_Report': 0x3304,
-    'ThermostatMode_Set': 0x4001,
-    'ThermostatMode_Get': 0x4002,
-    'ThermostatMode_Report': 0x4003,
-    'ThermostatMode_SupportedGet': 0x4004,
-    'ThermostatMode_SupportedReport': 0x4005,
-    'ThermostatSetpoint_Set': 0x4301,
-    'ThermostatSetpoint_Get': 0x4302,
-    'ThermostatSetpoint_Report': 0x4303,
-    'ThermostatSetpoint_SupportedGet': 0x4304,
-    'ThermostatSetpoint_SupportedReport': 0x4305,
-    'DoorLockLogging_SupportedGet': 0x4c01,
-    'DoorLockLogging_SupportedReport': 0x4c02,
-    'DoorLockLogging_Get': 0x4c03,
-    'DoorLockLogging_Report': 0x4c04,
-    'AssociationGroupInformation_NameGet': 0x5901,
-    'AssociationGroupInformation_NameReport': 0x5902,
-    'AssociationGroupInformation_InfoGet': 0x5903,
-    'AssociationGroupInformation_InfoReport': 0x5904,
-    'AssociationGroupInformation_ListGet': 0x5905,
-    'AssociationGroupInformation_ListReport': 0x5906,
-    'CentralScene_SupportedGet': 0x5b01,
-    'CentralScene_SupportedReport': 0x5b02,
-    'CentralScene_Notification': 0x5b03,
-    'ZwavePlusInfo_Get': 0x5e01,
-    'ZwavePlusInfo_Report': 0x5e02,
-    'MultiChannel_EndPointGet': 0x6007,
-    'MultiChannel_EndPointReport': 0x6008,
-    'MultiChannel_CapabilityGet': 0x6009,
-    'MultiChannel_CapabilityReport': 0x600a,
-    'MultiChannel_CmdEncap': 0x600d,
-    'DoorLock_Set': 0x6201,
-    'DoorLock_Get': 0x6202,
-    'DoorLock_Report': 0x6203,
-    'DoorLock_ConfigurationSet': 0x6204,
-    'DoorLock_ConfigurationGet': 0x6205,
-    'DoorLock_ConfigurationReport': 0x6206,
-    'UserCode_Set': 0x6301,
-    'UserCode_Get': 0x6302,
-    'UserCode_Report': 0x6303,
-    'UserCode_NumberGet': 0x6304,
-    'UserCode_NumberReport': 0x6305,
-    'Configuration_Set': 0x7004,
-    'Configuration_Get': 0x7005,
-    'Configuration_Report': 0x7006,
-    'Alarm_Get': 0x7104,
-    'Alarm_Report': 0x7105,
-    'Alarm_Set': 0x7106,
-    'Alarm_SupportedGet': 0x7107,
-    'Alarm_SupportedReport': 0x7108,
-    'ManufacturerSpecific_Get': 0x7204,
-    'ManufacturerSpecific_Report': 0x7205,
-    'ManufacturerSpecific_DeviceSpecificGet': 0x7206,
-    'ManufacturerSpecific_DeviceSpecificReport': 0x7207,
-    'Powerlevel_Set': 0x7301,
-    'Powerlevel_Get': 0x7302,
-    'Powerlevel_Report': 0x7303,
-    'Powerlevel_TestNodeSet': 0x7304,
-    'Powerlevel_TestNodeGet': 0x7305,
-    'Powerlevel_TestNodeGetReport': 0x7306,
-    'Protection_Set': 0x7501,
-    'Protection_Get': 0x7502,
-    'Protection_Report': 0x7503,
-    'Lock_Set': 0x7601,
-    'Lock_Get': 0x7602,
-    'Lock_Report': 0x7603,
-    'NodeNaming_Set': 0x7701,
-    'NodeNaming_Get': 0x7702,
-    'NodeNaming_Report': 0x7703,
-    'NodeNaming_LocationSet': 0x7704,
-    'NodeNaming_LocationGet': 0x7705,
-    'NodeNaming_LocationReport': 0x7706,
-    'Firmware_MetadataGet': 0x7a01,
-    'Firmware_MetadataReport': 0x7a02,
-    'Battery_Get': 0x8002,
-    'Battery_Report': 0x8003,
-    'Clock_Set': 0x8104,
-    'Clock_Get': 0x8105,
-    'Clock_Report': 0x8106,
-    'Hail_Hail': 0x8201,
-    'WakeUp_IntervalSet': 0x8404,
-    'WakeUp_IntervalGet': 0x8405,
-    'WakeUp_IntervalReport': 0x8406,
-    'WakeUp_Notification': 0x8407,
-    'WakeUp_NoMoreInformation': 0x8408,
-    'WakeUp_IntervalCapabilitiesGet': 0x8409,
-    'WakeUp_IntervalCapabilitiesReport': 0x840a,
-    'Association_Set': 0x8501,
-    'Association_Get': 0x8502,
-    'Association_Report': 0x8503,
-    'Association_Remove': 0x8504,
-    'Association_GroupingsGet': 0x8505,
-    'Association_GroupingsReport': 0x8506,
-    'Version_Get': 0x8611,
-    'Version_Report': 0x8612,
-    'Version_CommandClassGet': 0x8613,
-    'Version_CommandClassReport': 0x8614,
-    'Indicator_Set': 0x8701,
-    'Indicator_Get': 0x8702,
-    'Indicator_Report': 0x8703,
-    'TimeParameters_Set': 0x8b01,
-    'TimeParameters_Get': 0x8b02,
-    'TimeParameters_Report': 0x8b03,
-    'Security_SupportedGet': 0x9802,
-    'Security_SupportedReport': 0x9803,
-    'Security_SchemeGet': 0x9804,
-    'Security_SchemeReport': 0x9805,
-    'Security_NetworkKeySet': 0x9806,
-    'Security_NetworkKeyVerify': 0x9807,
-    'Security_SchemeInherit': 0x9808,
-    'Security_NonceGet': 0x9840,
-    'Security_NonceReport': 0x9880,
-    'Security_MessageEncap': 0x9881,
-    'Security_MessageEncapNonceGet': 0x98c1,
-    'SensorAlarm_Get': 0x9c01,
-    'SensorAlarm_Report': 0x9c02,
-    'SensorAlarm_SupportedGet': 0x9c03,
-    'SensorAlarm_SupportedReport': 0x9c04,
-    'Security2_NonceGet': 0x9f01,
-    'Security2_NonceReport': 0x9f02,
-    'Security2_MessageEncapsulation': 0x9f03,
-    'Security2_KexGet': 0x9f04,
-    'Security2_KexReport': 0x9f05,
-    'Security2_KexSet': 0x9f06,
-    'Security2_KexFail': 0x9f07,
-    'Security2_PublicKeyReport': 0x9f08,
-    'Security2_NetworkKeyGet': 0x9f09,
-    'Security2_NetworkKeyReport': 0x9f0a,
-    'Security2_NetworkKeyVerify': 0x9f0b,
-    'Security2_TransferEnd': 0x9f0c,
-    'Security2_CommandsSupportedGet': 0x9f0d,
-    'Security2_CommandsSupportedReport': 0x9f0e,
+SUBCMD_FLAG_GET = 1
+SUBCMD_FLAG_REPORT = 2
+SUBCMD_FLAG_SECURITY = 4
+
+SUBCMD_TO_FLAGS = {
+    0x2002: 1,  # Basic_Get
+    0x2003: 2,  # Basic_Report
+    0x2502: 1,  # SwitchBinary_Get
+    0x2503: 2,  # SwitchBinary_Report
+    0x2602: 1,  # SwitchMultilevel_Get
+    0x2603: 2,  # SwitchMultilevel_Report
+    0x2606: 1,  # SwitchMultilevel_SupportedGet
+    0x2607: 2,  # SwitchMultilevel_SupportedReport
+    0x2702: 1,  # SwitchAll_Get
+    0x2703: 2,  # SwitchAll_Report
+    0x2802: 1,  # SwitchToggleBinary_Get
+    0x2803: 2,  # SwitchToggleBinary_Report
+    0x2c02: 1,  # SceneActuatorConf_Get
+    0x2c03: 2,  # SceneActuatorConf_Report
+    0x2d02: 1,  # SceneControllerConf_Get
+    0x2d03: 2,  # SceneControllerConf_Report
+    0x3002: 1,  # SensorBinary_Get
+    0x3003: 2,  # SensorBinary_Report
+    0x3101: 1,  # SensorMultilevel_SupportedGet
+    0x3102: 2,  # SensorMultilevel_SupportedReport
+    0x3104: 1,  # SensorMultilevel_Get
+    0x3105: 2,  # SensorMultilevel_Report
+    0x3201: 1,  # Meter_Get
+    0x3202: 2,  # Meter_Report
+    0x3203: 1,  # Meter_SupportedGet
+    0x3204: 2,  # Meter_SupportedReport
+    0x3301: 1,  # ColorSwitch_SupportedGet
+    0x3302: 2,  # ColorSwitch_SupportedReport
+    0x3303: 1,  # ColorSwitch_Get
+    0x3304: 2,  # ColorSwitch_Report
+    0x4002: 1,  # ThermostatMode_Get
+    0x4003: 2,  # ThermostatMode_Report
+    0x4004: 1,  # ThermostatMode_SupportedGet
+    0x4005: 2,  # ThermostatMode_SupportedReport
+    0x4302: 1,  # ThermostatSetpoint_Get
+    0x4303: 2,  # ThermostatSetpoint_Report
+    0x4304: 1,  # ThermostatSetpoint_SupportedGet
+    0x4305: 2,  # ThermostatSetpoint_SupportedReport
+    0x4c01: 1,  # DoorLockLogging_SupportedGet
+    0x4c02: 2,  # DoorLockLogging_SupportedReport
+    0x4c03: 1,  # DoorLockLogging_Get
+    0x4c04: 2,  # DoorLockLogging_Report
+    0x5901: 1,  # AssociationGroupInformation_NameGet
+    0x5902: 2,  # AssociationGroupInformation_NameReport
+    0x5903: 1,  # AssociationGroupInformation_InfoGet
+    0x5904: 2,  # AssociationGroupInformation_InfoReport
+    0x5905: 1,  # AssociationGroupInformation_ListGet
+    0x5906: 2,  # AssociationGroupInformation_ListReport
+    0x5b01: 1,  # CentralScene_SupportedGet
+    0x5b02: 2,  # CentralScene_SupportedReport
+    0x5e01: 1,  # ZwavePlusInfo_Get
+    0x5e02: 2,  # ZwavePlusInfo_Report
+    0x6007: 1,  # MultiChannel_EndPointGet
+    0x6008: 2,  # MultiChannel_EndPointReport
+    0x6009: 1,  # MultiChannel_CapabilityGet
+    0x600a: 2,  # MultiChannel_CapabilityReport
+    0x6202: 1,  # DoorLock_Get
+    0x6203: 2,  # DoorLock_Report
+    0x6205: 1,  # DoorLock_ConfigurationGet
+    0x6206: 2,  # DoorLock_ConfigurationReport
+    0x6302: 1,  # UserCode_Get
+    0x6303: 2,  # UserCode_Report
+    0x6304: 1,  # UserCode_NumberGet
+    0x6305: 2,  # UserCode_NumberReport
+    0x7005: 1,  # Configuration_Get
+    0x7006: 2,  # Configuration_Report
+    0x7104: 1,  # Alarm_Get
+    0x7105: 2,  # Alarm_Report
+    0x7107: 1,  # Alarm_SupportedGet
+    0x7108: 2,  # Alarm_SupportedReport
+    0x7204: 1,  # ManufacturerSpecific_Get
+    0x7205: 2,  # ManufacturerSpecific_Report
+    0x7206: 1,  # ManufacturerSpecific_DeviceSpecificGet
+    0x7207: 2,  # ManufacturerSpecific_DeviceSpecificReport
+    0x7302: 1,  # Powerlevel_Get
+    0x7303: 2,  # Powerlevel_Report
+    0x7305: 1,  # Powerlevel_TestNodeGet
+    0x7306: 2,  # Powerlevel_TestNodeGetReport
+    0x7502: 1,  # Protection_Get
+    0x7503: 2,  # Protection_Report
+    0x7602: 1,  # Lock_Get
+    0x7603: 2,  # Lock_Report
+    0x7702: 1,  # NodeNaming_Get
+    0x7703: 2,  # NodeNaming_Report
+    0x7705: 1,  # NodeNaming_LocationGet
+    0x7706: 2,  # NodeNaming_LocationReport
+    0x7a01: 1,  # Firmware_MetadataGet
+    0x7a02: 2,  # Firmware_MetadataReport
+    0x8002: 1,  # Battery_Get
+    0x8003: 2,  # Battery_Report
+    0x8105: 1,  # Clock_Get
+    0x8106: 2,  # Clock_Report
+    0x8405: 1,  # WakeUp_IntervalGet
+    0x8406: 2,  # WakeUp_IntervalReport
+    0x8409: 1,  # WakeUp_IntervalCapabilitiesGet
+    0x840a: 2,  # WakeUp_IntervalCapabilitiesReport
+    0x8502: 1,  # Association_Get
+    0x8503: 2,  # Association_Report
+    0x8505: 1,  # Association_GroupingsGet
+    0x8506: 2,  # Association_GroupingsReport
+    0x8611: 1,  # Version_Get
+    0x8612: 2,  # Version_Report
+    0x8613: 1,  # Version_CommandClassGet
+    0x8614: 2,  # Version_CommandClassReport
+    0x8702: 1,  # Indicator_Get
+    0x8703: 2,  # Indicator_Report
+    0x8b02: 1,  # TimeParameters_Get
+    0x8b03: 2,  # TimeParameters_Report
+    0x9802: 5,  # Security_SupportedGet
+    0x9803: 6,  # Security_SupportedReport
+    0x9804: 5,  # Security_SchemeGet
+    0x9805: 6,  # Security_SchemeReport
+    0x9806: 4,  # Security_NetworkKeySet
+    0x9807: 4,  # Security_NetworkKeyVerify
+    0x9808: 4,  # Security_SchemeInherit
+    0x9840: 5,  # Security_NonceGet
+    0x9880: 6,  # Security_NonceReport
+    0x9881: 4,  # Security_MessageEncap
+    0x98c1: 5,  # Security_MessageEncapNonceGet
+    0x9c01: 1,  # SensorAlarm_Get
+    0x9c02: 2,  # SensorAlarm_Report
+    0x9c03: 1,  # SensorAlarm_SupportedGet
+    0x9c04: 2,  # SensorAlarm_SupportedReport
+    0x9f01: 5,  # Security2_NonceGet
+    0x9f02: 6,  # Security2_NonceReport
+    0x9f03: 4,  # Security2_MessageEncapsulation
+    0x9f04: 5,  # Security2_KexGet
+    0x9f05: 6,  # Security2_KexReport
+    0x9f06: 4,  # Security2_KexSet
+    0x9f07: 4,  # Security2_KexFail
+    0x9f08: 6,  # Security2_PublicKeyReport
+    0x9f09: 5,  # Security2_NetworkKeyGet
+    0x9f0a: 6,  # Security2_NetworkKeyReport
+    0x9f0b: 4,  # Security2_NetworkKeyVerify
+    0x9f0c: 4,  # Security2_TransferEnd
+    0x9f0d: 5,  # Security2_CommandsSupportedGet
+    0x9f0e: 6,  # Security2_CommandsSupportedReport
 }
 
+def _MakeStringToSubcmd():
+    return {v: k for k, v in SUBCMD_TO_STRING.items()}
+
+
+def _MakeFlatTable(d, default):
+    out = [default] * 65536
+    for k, v in d.items():
+        out[k] = v
+    return tuple(out)
+
+
+_LAZY_MAPS = {
+    "STRING_TO_SUBCMD": _MakeStringToSubcmd,
+    "SUBCMD_NAMES": lambda: _MakeFlatTable(SUBCMD_TO_STRING, None),
+    "SUBCMD_PARSE_TABLES": lambda: _MakeFlatTable(SUBCMD_TO_PARSE_TABLE, None),
+    "SUBCMD_FLAGS": lambda: _MakeFlatTable(SUBCMD_TO_FLAGS, 0),
+}
+
+
+def __getattr__(name):
+    make = _LAZY_MAPS.get(name)
+    if make is None:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    value = make()
+    globals()[name] = value
+    return value
+
+
 GENERIC_SPECIFIC_DB = {
-    0x0100: ['Remote Controller', [], [32], 0x00],
-    0x0101: ['Portable Remote Controller', [], [32], 0x00],
-    0x0102: ['Portable Scene Controller', [45, 114, 133], [43, 32], 0x00],
-    0x0103: ['Portable Installer Tool', [33, 114, 134, 143], [33, 96, 112, 114, 132, 133, 134, 142, 32], 0x00],
-    0x0201: ['Static PC Controller', [], [32], 0x00],
-    0x0202: ['Static Scene Controller', [45, 114, 133], [43, 32], 0x00],
-    0x0203: ['Static Installer Tool', [33, 114, 134, 143], [33, 96, 112, 114, 132, 133, 134, 142, 32], 0x00],
-    0x0304: ['Satellite Receiver', [114, 134, 148, 32], [], 0x00],
-    0x0311: ['Satellite Receiver V2', [114, 134, 148, 32], [], 0x94],
-    0x0312: ['Doorbell', [48, 114, 133, 134, 32], [], 0x30],
-    0x0401: ['Simple Display', [114, 134, 146, 147, 32], [], 0x00],
-    0x0801: ['Heating Thermostat', [32], [], 0x00],
-    0x0802: ['General Thermostat', [64, 67, 114, 32], [], 0x40],
-    0x0803: ['Setback Schedule Thermostat', [70, 114, 134, 143, 32], [70, 129, 143], 0x46],
-    0x0804: ['Setpoint Thermostat', [67, 114, 134, 143, 32], [67, 143], 0x43],
-    0x0805: ['Setback Thermostat', [64, 67, 71, 114, 134, 32], [], 0x40],
-    0x0806: ['General Thermostat V2', [64, 67, 114, 134, 32], [], 0x40],
-    0x0901: ['Simple Window Covering', [80, 32], [], 0x50],
-    0x0f01: ['Basic Repeater Slave', [32], [], 0x00],
-    0x1001: ['On/Off Power Switch', [39, 32, 37], [], 0x25],
-    0x1003: ['Binary Scene Switch', [39, 43, 44, 114, 32, 37], [], 0x25],
-    0x1101: ['Multilevel Power Switch', [39, 32, 38], [], 0x26],
-    0x1103: ['Multiposition Motor', [114, 134, 32, 38], [], 0x26],
-    0x1104: ['Multilevel Scene Switch', [39, 43, 44, 114, 32, 38], [], 0x26],
-    0x1105: ['Motor Control Class A', [37, 114, 134, 32, 38], [], 0x26],
-    0x1106: ['Motor Control Class B', [37, 114, 134, 32, 38], [], 0x26],
-    0x1107: ['Motor Control Class C', [37, 114, 134, 32, 38], [], 0x26],
-    0x1200: ['Remote Switch', [], [32, 32], 0x00],
-    0x1201: ['Binary Remote Switch', [], [37, 32], 0x25],
-    0x1202: ['Multilevel Remote Switch', [], [38, 32], 0x26],
-    0x1203: ['Binary Toggle Remote Switch', [], [40, 32], 0x28],
-    0x1204: ['Multilevel Toggle Remote Switch', [], [41, 32], 0x29],
-    0x1301: ['Binary Toggle Switch', [37, 40, 32], [], 0x28],
-    0x1302: ['Multilevel Toggle Switch', [38, 41, 32], [], 0x29],
-    0x2001: ['Routing Binary Sensor', [48], [32], 0x30],
-    0x2101: ['Routing Multilevel Sensor', [49], [32], 0x31],
-    0x3101: ['Simple Meter', [50, 114, 134], [32], 0x32],
-    0x4001: ['Door Lock', [98, 32], [], 0x62],
-    0x4002: ['Advanced Door Lock', [98, 114, 134, 32], [], 0x62],
-    0x4003: ['Secure Keypad Door Lock', [98, 99, 114, 134, 152, 32], [], 0x62],
-    0x5001: ['Energy Production', [144, 32, 114, 134, 136], [], 0x00],
-    0xa100: ['Alarm Sensor', [], [32], 0x71],
-    0xa101: ['Basic Routing Alarm Sensor', [113, 114, 133, 134], [113, 32], 0x71],
-    0xa102: ['Routing Alarm Sensor', [113, 114, 128, 133, 134], [113, 32], 0x71],
-    0xa103: ['Basic Zensor Alarm Sensor', [113, 114, 134], [113, 32], 0x71],
-    0xa104: ['Zensor Alarm Sensor', [113, 114, 128, 134], [113, 32], 0x71],
-    0xa105: ['Advanced Zensor Alarm Sensor', [113, 114, 128, 133, 134], [113, 32], 0x71],
-    0xa106: ['Basic Routing Smoke Sensor', [113, 114, 133, 134], [113, 32], 0x71],
-    0xa107: ['Routing Smoke Sensor', [113, 114, 128, 133, 134], [113, 32], 0x71],
-    0xa108: ['Basic Zensor Smoke Sensor', [113, 114, 134], [113, 32], 0x71],
-    0xa109: ['Zensor Smoke Sensor', [113, 114, 128, 134], [113, 32], 0x71],
-    0xa10a: ['Advanced Zensor Smoke Sensor', [113, 114, 128, 133, 134], [113, 32], 0x71],
+    0x0100: ('Remote Controller', (), (32,), 0x00),
+    0x0101: ('Portable Remote Controller', (), (32,), 0x00),
+    0x0102: ('Portable Scene Controller', (45, 114, 133), (43, 32), 0x00),
+    0x0103: ('Portable Installer Tool', (33, 114, 134, 143), (33, 96, 112, 114, 132, 133, 134, 142, 32), 0x00),
+    0x0201: ('Static PC Controller', (), (32,), 0x00),
+    0x0202: ('Static Scene Controller', (45, 114, 133), (43, 32), 0x00),
+    0x0203: ('Static Installer Tool', (33, 114, 134, 143), (33, 96, 112, 114, 132, 133, 134, 142, 32), 0x00),
+    0x0304: ('Satellite Receiver', (114, 134, 148, 32), (), 0x00),
+    0x0311: ('Satellite Receiver V2', (114, 134, 148, 32), (), 0x94),
+    0x0312: ('Doorbell', (48, 114, 133, 134, 32), (), 0x30),
+    0x0401: ('Simple Display', (114, 134, 146, 147, 32), (), 0x00),
+    0x0801: ('Heating Thermostat', (32,), (), 0x00),
+    0x0802: ('General Thermostat', (64, 67, 114, 32), (), 0x40),
+    0x0803: ('Setback Schedule Thermostat', (70, 114, 134, 143, 32), (70, 129, 143), 0x46),
+    0x0804: ('Setpoint Thermostat', (67, 114, 134, 143, 32), (67, 143), 0x43),
+    0x0805: ('Setback Thermostat', (64, 67, 71, 114, 134, 32), (), 0x40),
+    0x0806: ('General Thermostat V2', (64, 67, 114, 134, 32), (), 0x40),
+    0x0901: ('Simple Window Covering', (80, 32), (), 0x50),
+    0x0f01: ('Basic Repeater Slave', (32,), (), 0x00),
+    0x1001: ('On/Off Power Switch', (39, 32, 37), (), 0x25),
+    0x1003: ('Binary Scene Switch', (39, 43, 44, 114, 32, 37), (), 0x25),
+    0x1101: ('Multilevel Power Switch', (39, 32, 38), (), 0x26),
+    0x1103: ('Multiposition Motor', (114, 134, 32, 38), (), 0x26),
+    0x1104: ('Multilevel Scene Switch', (39, 43, 44, 114, 32, 38), (), 0x26),
+    0x1105: ('Motor Control Class A', (37, 114, 134, 32, 38), (), 0x26),
+    0x1106: ('Motor Control Class B', (37, 114, 134, 32, 38), (), 0x26),
+    0x1107: ('Motor Control Class C', (37, 114, 134, 32, 38), (), 0x26),
+    0x1200: ('Remote Switch', (), (32, 32), 0x00),
+    0x1201: ('Binary Remote Switch', (), (37, 32), 0x25),
+    0x1202: ('Multilevel Remote Switch', (), (38, 32), 0x26),
+    0x1203: ('Binary Toggle Remote Switch', (), (40, 32), 0x28),
+    0x1204: ('Multilevel Toggle Remote Switch', (), (41, 32), 0x29),
+    0x1301: ('Binary Toggle Switch', (37, 40, 32), (), 0x28),
+    0x1302: ('Multilevel Toggle Switch', (38, 41, 32), (), 0x29),
+    0x2001: ('Routing Binary Sensor', (48,), (32,), 0x30),
+    0x2101: ('Routing Multilevel Sensor', (49,), (32,), 0x31),
+    0x3101: ('Simple Meter', (50, 114, 134), (32,), 0x32),
+    0x4001: ('Door Lock', (98, 32), (), 0x62),
+    0x4002: ('Advanced Door Lock', (98, 114, 134, 32), (), 0x62),
+    0x4003: ('Secure Keypad Door Lock', (98, 99, 114, 134, 152, 32), (), 0x62),
+    0x5001: ('Energy Production', (144, 32, 114, 134, 136), (), 0x00),
+    0xa100: ('Alarm Sensor', (), (32,), 0x71),
+    0xa101: ('Basic Routing Alarm Sensor', (113, 114, 133, 134), (113, 32), 0x71),
+    0xa102: ('Routing Alarm Sensor', (113, 114, 128, 133, 134), (113, 32), 0x71),
+    0xa103: ('Basic Zensor Alarm Sensor', (113, 114, 134), (113, 32), 0x71),
+    0xa104: ('Zensor Alarm Sensor', (113, 114, 128, 134), (113, 32), 0x71),
+    0xa105: ('Advanced Zensor Alarm Sensor', (113, 114, 128, 133, 134), (113, 32), 0x71),
+    0xa106: ('Basic Routing Smoke Sensor', (113, 114, 133, 134), (113, 32), 0x71),
+    0xa107: ('Routing Smoke Sensor', (113, 114, 128, 133, 134), (113, 32), 0x71),
+    0xa108: ('Basic Zensor Smoke Sensor', (113, 114, 134), (113, 32), 0x71),
+    0xa109: ('Zensor Smoke Sensor', (113, 114, 128, 134), (113, 32), 0x71),
+    0xa10a: ('Advanced Zensor Smoke Sensor', (113, 114, 128, 133, 134), (113, 32), 0x71),
 }
 
 SUBCMD_TO_PARSE_TABLE = {
 
     # NoOperation (0x00 = 0)
-    0x0000: [],  # Set (0)
+    0x0000: (),  # Set (0)
 
     # Basic (0x20 = 32)
-    0x2001: ['B{level}'],  # Set (1)
-    0x2002: [],  # Get (2)
-    0x2003: ['B{level}'],  # Report (3)
+    0x2001: ('B{level}',),  # Set (1)
+    0x2002: (),  # Get (2)
+    0x2003: ('B{level}',),  # Report (3)
 
     # ControllerReplication (0x21 = 33)
-    0x2131: ['B{seq}', 'B{group}', 'B{node}'],  # TransferGroup (49)
+    0x2131: ('B{seq}', 'B{group}', 'B{node}'),  # TransferGroup (49)
     # TransferScene (51)
-    0x2133: ['B{seq}', 'B{scene}', 'B{node}', 'B{level}'],
+    0x2133: ('B{seq}', 'B{scene}', 'B{node}', 'B{level}'),
 
     # ApplicationStatus (0x22 = 34)
-    0x2201: ['B{status}', 'B{delay}'],  # Busy (1)
-    0x2202: ['B{status}'],  # RejectedRequest (2)
+    0x2201: ('B{status}', 'B{delay}'),  # Busy (1)
+    0x2202: ('B{status}',),  # RejectedRequest (2)
 
     # SwitchBinary (0x25 = 37)
-    0x2501: ['B{level}'],  # Set (1)
-    0x2502: [],  # Get (2)
-    0x2503: ['B{level}'],  # Report (3)
+    0x2501: ('B{level}',),  # Set (1)
+    0x2502: (),  # Get (2)
+    0x2503: ('B{level}',),  # Report (3)
 
     # SwitchMultilevel (0x26 = 38)
-    0x2601: ['B{level}', 'B{duration}'],  # Set (1)
-    0x2602: [],  # Get (2)
-    0x2603: ['B{level}'],  # Report (3)
-    0x2604: ['B{mode}', 'L{command}'],  # StartLevelChange (4)
-    0x2605: [],  # StopLevelChange (5)
-    0x2606: [],  # SupportedGet (6)
-    0x2607: ['B{type1}', 'B{type2}'],  # SupportedReport (7)
+    0x2601: ('B{level}', 'B{duration}'),  # Set (1)
+    0x2602: (),  # Get (2)
+    0x2603: ('B{level}',),  # Report (3)
+    0x2604: ('B{mode}', 'L{command}'),  # StartLevelChange (4)
+    0x2605: (),  # StopLevelChange (5)
+    0x2606: (),  # SupportedGet (6)
+    0x2607: ('B{type1}', 'B{type2}'),  # SupportedReport (7)
 
     # SwitchAll (0x27 = 39)
-    0x2701: ['B{mode}'],  # Set (1)
-    0x2702: [],  # Get (2)
-    0x2703: ['B{mode}'],  # Report (3)
-    0x2704: [],  # On (4)
-    0x2705: [],  # Off (5)
+    0x2701: ('B{mode}',),  # Set (1)
+    0x2702: (),  # Get (2)
+    0x2703: ('B{mode}',),  # Report (3)
+    0x2704: (),  # On (4)
+    0x2705: (),  # Off (5)
 
     # SwitchToggleBinary (0x28 = 40)
-    0x2801: [],  # Set (1)
-    0x2802: [],  # Get (2)
-    0x2803: ['B{level}'],  # Report (3)
+    0x2801: (),  # Set (1)
+    0x2802: (),  # Get (2)
+    0x2803: ('B{level}',),  # Report (3)
 
     # SceneActivation (0x2b = 43)
-    0x2b01: ['B{scene}', 'B{delay}'],  # Set (1)
+    0x2b01: ('B{scene}', 'B{delay}'),  # Set (1)
 
     # SceneActuatorConf (0x2c = 44)
-    0x2c01: ['B{scene}', 'B{delay}', 'B{extra}', 'B{level}'],  # Set (1)
-    0x2c02: ['B{scene}'],  # Get (2)
-    0x2c03: ['B{scene}', 'B{level}', 'B{delay}'],  # Report (3)
+    0x2c01: ('B{scene}', 'B{delay}', 'B{extra}', 'B{level}'),  # Set (1)
+    0x2c02: ('B{scene}',),  # Get (2)
+    0x2c03: ('B{scene}', 'B{level}', 'B{delay}'),  # Report (3)
 
     # SceneControllerConf (0x2d = 45)
-    0x2d01: ['B{delay}', 'B{group}', 'B{scene}'],  # Set (1)
-    0x2d02: ['B{group}'],  # Get (2)
-    0x2d03: ['B{delay}', 'B{group}', 'B{scene}'],  # Report (3)
+    0x2d01: ('B{delay}', 'B{group}', 'B{scene}'),  # Set (1)
+    0x2d02: ('B{group}',),  # Get (2)
+    0x2d03: ('B{delay}', 'B{group}', 'B{scene}'),  # Report (3)
 
     # SensorBinary (0x30 = 48)
-    0x3002: [],  # Get (2)
-    0x3003: ['B{level}'],  # Report (3)
+    0x3002: (),  # Get (2)
+    0x3003: ('B{level}',),  # Report (3)
 
     # SensorMultilevel (0x31 = 49)
-    0x3101: ['b{sensor}'],  # SupportedGet (1)
-    0x3102: ['R{bits}'],  # SupportedReport (2)
-    0x3104: ['b{sensor}'],  # Get (4)
-    0x3105: ['B{type}', 'X{value}'],  # Report (5)
+    0x3101: ('b{sensor}',),  # SupportedGet (1)
+    0x3102: ('R{bits}',),  # SupportedReport (2)
+    0x3104: ('b{sensor}',),  # Get (4)
+    0x3105: ('B{type}', 'X{value}'),  # Report (5)
 
     # Meter (0x32 = 50)
-    0x3201: ['b{scale}'],  # Get (1)
-    0x3202: ['M{value}'],  # Report (2)
-    0x3203: [],  # SupportedGet (3)
-    0x3204: ['B{type}', 'B{scale}'],  # SupportedReport (4)
-    0x3205: [],  # Reset (5)
+    0x3201: ('b{scale}',),  # Get (1)
+    0x3202: ('M{value}',),  # Report (2)
+    0x3203: (),  # SupportedGet (3)
+    0x3204: ('B{type}', 'B{scale}'),  # SupportedReport (4)
+    0x3205: (),  # Reset (5)
 
     # ColorSwitch (0x33 = 51)
-    0x3301: [],  # SupportedGet (1)
-    0x3302: ['R{bits}'],  # SupportedReport (2)
-    0x3303: ['B{group}'],  # Get (3)
-    0x3304: ['B{group}', 'B{level}'],  # Report (4)
+    0x3301: (),  # SupportedGet (1)
+    0x3302: ('R{bits}',),  # SupportedReport (2)
+    0x3303: ('B{group}',),  # Get (3)
+    0x3304: ('B{group}', 'B{level}'),  # Report (4)
 
     # ThermostatMode (0x40 = 64)
-    0x4001: ['B{thermo}'],  # Set (1)
-    0x4002: [],  # Get (2)
-    0x4003: ['B{thermo}'],  # Report (3)
-    0x4004: [],  # SupportedGet (4)
-    0x4005: ['R{bits}'],  # SupportedReport (5)
+    0x4001: ('B{thermo}',),  # Set (1)
+    0x4002: (),  # Get (2)
+    0x4003: ('B{thermo}',),  # Report (3)
+    0x4004: (),  # SupportedGet (4)
+    0x4005: ('R{bits}',),  # SupportedReport (5)
 
     # ThermostatSetpoint (0x43 = 67)
-    0x4301: ['B{thermo}', 'X{value}'],  # Set (1)
-    0x4302: ['B{thermo}'],  # Get (2)
-    0x4303: ['B{thermo}', 'X{value}'],  # Report (3)
-    0x4304: [],  # SupportedGet (4)
-    0x4305: ['R{bits}'],  # SupportedReport (5)
+    0x4301: ('B{thermo}', 'X{value}'),  # Set (1)
+    0x4302: ('B{thermo}',),  # Get (2)
+    0x4303: ('B{thermo}', 'X{value}'),  # Report (3)
+    0x4304: (),  # SupportedGet (4)
+    0x4305: ('R{bits}',),  # SupportedReport (5)
 
     # DoorLockLogging (0x4c = 76)
-    0x4c01: [],  # SupportedGet (1)
-    0x4c02: ['B{count}'],  # SupportedReport (2)
-    0x4c03: ['B{count}'],  # Get (3)
+    0x4c01: (),  # SupportedGet (1)
+    0x4c02: ('B{count}',),  # SupportedReport (2)
+    0x4c03: ('B{count}',),  # Get (3)
     # Report (4)
-    0x4c04: ['B{count}', 'C{date}', 'B{type}', 'B{user}', 'A{code}'],
+    0x4c04: ('B{count}', 'C{date}', 'B{type}', 'B{user}', 'A{code}'),
 
     # AssociationGroupInformation (0x59 = 89)
-    0x5901: ['B{group}'],  # NameGet (1)
-    0x5902: ['B{group}', 'A{name}'],  # NameReport (2)
-    0x5903: ['B{mode}', 'B{group}'],  # InfoGet (3)
-    0x5904: ['B{mode}', 'G{groups}'],  # InfoReport (4)
-    0x5905: ['B{mode}', 'B{group}'],  # ListGet (5)
-    0x5906: ['B{group}', 'A{commands}'],  # ListReport (6)
+    0x5901: ('B{group}',),  # NameGet (1)
+    0x5902: ('B{group}', 'A{name}'),  # NameReport (2)
+    0x5903: ('B{mode}', 'B{group}'),  # InfoGet (3)
+    0x5904: ('B{mode}', 'G{groups}'),  # InfoReport (4)
+    0x5905: ('B{mode}', 'B{group}'),  # ListGet (5)
+    0x5906: ('B{group}', 'A{commands}'),  # ListReport (6)
 
     # CentralScene (0x5b = 91)
-    0x5b01: [],  # SupportedGet (1)
-    0x5b02: ['B{count}', 'L{extra}'],  # SupportedReport (2)
-    0x5b03: ['B{count}', 'B{mode}', 'B{scene}'],  # Notification (3)
+    0x5b01: (),  # SupportedGet (1)
+    0x5b02: ('B{count}', 'L{extra}'),  # SupportedReport (2)
+    0x5b03: ('B{count}', 'B{mode}', 'B{scene}'),  # Notification (3)
 
     # ZwavePlusInfo (0x5e = 94)
-    0x5e01: [],  # Get (1)
+    0x5e01: (),  # Get (1)
     # Report (2)
-    0x5e02: ['B{version}', 'B{role}', 'B{type}', 'W{icon}', 'W{icon2}'],
+    0x5e02: ('B{version}', 'B{role}', 'B{type}', 'W{icon}', 'W{icon2}'),
 
     # MultiChannel (0x60 = 96)
-    0x6007: [],  # EndPointGet (7)
-    0x6008: ['B{mode}', 'B{count}', 'b{count2}'],  # EndPointReport (8)
-    0x6009: ['B{endpoint}'],  # CapabilityGet (9)
+    0x6007: (),  # EndPointGet (7)
+    0x6008: ('B{mode}', 'B{count}', 'b{count2}'),  # EndPointReport (8)
+    0x6009: ('B{endpoint}',),  # CapabilityGet (9)
     # CapabilityReport (10)
-    0x600a: ['B{endpoint}', 'B{generic}', 'B{specific}', 'L{classes}'],
-    0x600d: ['B{src}', 'B{dst}', 'L{command}'],  # CmdEncap (13)
+    0x600a: ('B{endpoint}', 'B{generic}', 'B{specific}', 'L{classes}'),
+    0x600d: ('B{src}', 'B{dst}', 'L{command}'),  # CmdEncap (13)
 
     # DoorLock (0x62 = 98)
-    0x6201: ['B{status}'],  # Set (1)
-    0x6202: [],  # Get (2)
-    0x6203: ['B{status}'],  # Report (3)
+    0x6201: ('B{status}',),  # Set (1)
+    0x6202: (),  # Get (2)
+    0x6203: ('B{status}',),  # Report (3)
     # ConfigurationSet (4)
-    0x6204: ['B{timeout}', 'B{control}', 'B{min}', 'B{sec}'],
-    0x6205: [],  # ConfigurationGet (5)
+    0x6204: ('B{timeout}', 'B{control}', 'B{min}', 'B{sec}'),
+    0x6205: (),  # ConfigurationGet (5)
     # ConfigurationReport (6)
-    0x6206: ['B{timeout}', 'B{control}', 'B{min}', 'B{sec}'],
+    0x6206: ('B{timeout}', 'B{control}', 'B{min}', 'B{sec}'),
 
     # UserCode (0x63 = 99)
-    0x6301: [],  # Set (1)
-    0x6302: ['B{user}'],  # Get (2)
-    0x6303: ['B{user}', 'B{status}', 'L{code}'],  # Report (3)
-    0x6304: [],  # NumberGet (4)
-    0x6305: ['B{count}'],  # NumberReport (5)
+    0x6301: (),  # Set (1)
+    0x6302: ('B{user}',),  # Get (2)
+    0x6303: ('B{user}', 'B{status}', 'L{code}'),  # Report (3)
+    0x6304: (),  # NumberGet (4)
+    0x6305: ('B{count}',),  # NumberReport (5)
 
     # Configuration (0x70 = 112)
-    0x7004: ['B{parameter}', 'V{value}'],  # Set (4)
-    0x7005: ['B{parameter}'],  # Get (5)
-    0x7006: ['B{parameter}', 'V{value}'],  # Report (6)
+    0x7004: ('B{parameter}', 'V{value}'),  # Set (4)
+    0x7005: ('B{parameter}',),  # Get (5)
+    0x7006: ('B{parameter}', 'V{value}'),  # Report (6)
 
     # Alarm (0x71 = 113)
-    0x7104: [],  # Get (4)
-    0x7105: ['B{type}', 'B{level}'],  # Report (5)
-    0x7106: ['B{type}', 'B{status}'],  # Set (6)
-    0x7107: [],  # SupportedGet (7)
-    0x7108: [],  # SupportedReport (8)
+    0x7104: (),  # Get (4)
+    0x7105: ('B{type}', 'B{level}'),  # Report (5)
+    0x7106: ('B{type}', 'B{status}'),  # Set (6)
+    0x7107: (),  # SupportedGet (7)
+    0x7108: (),  # SupportedReport (8)
 
     # ManufacturerSpecific (0x72 = 114)
-    0x7204: [],  # Get (4)
-    0x7205: ['W{manufacturer}', 'W{type}', 'W{product}'],  # Report (5)
-    0x7206: ['B{type}'],  # DeviceSpecificGet (6)
-    0x7207: ['B{type}', 'F{bytes}'],  # DeviceSpecificReport (7)
+    0x7204: (),  # Get (4)
+    0x7205: ('W{manufacturer}', 'W{type}', 'W{product}'),  # Report (5)
+    0x7206: ('B{type}',),  # DeviceSpecificGet (6)
+    0x7207: ('B{type}', 'F{bytes}'),  # DeviceSpecificReport (7)
 
     # Powerlevel (0x73 = 115)
-    0x7301: ['B{level}', 'B{timeout}'],  # Set (1)
-    0x7302: [],  # Get (2)
-    0x7303: ['B{level}', 'B{timeout}'],  # Report (3)
-    0x7304: ['B{node}', 'B{level}', 'W{count}'],  # TestNodeSet (4)
-    0x7305: [],  # TestNodeGet (5)
+    0x7301: ('B{level}', 'B{timeout}'),  # Set (1)
+    0x7302: (),  # Get (2)
+    0x7303: ('B{level}', 'B{timeout}'),  # Report (3)
+    0x7304: ('B{node}', 'B{level}', 'W{count}'),  # TestNodeSet (4)
+    0x7305: (),  # TestNodeGet (5)
     # TestNodeGetReport (6)
-    0x7306: ['B{node}', 'B{status}', 'B{level}', 'W{count}'],
+    0x7306: ('B{node}', 'B{status}', 'B{level}', 'W{count}'),
 
     # Protection (0x75 = 117)
-    0x7501: ['B{protection}'],  # Set (1)
-    0x7502: [],  # Get (2)
-    0x7503: ['B{protection}'],  # Report (3)
+    0x7501: ('B{protection}',),  # Set (1)
+    0x7502: (),  # Get (2)
+    0x7503: ('B{protection}',),  # Report (3)
 
     # Lock (0x76 = 118)
-    0x7601: ['B{state}'],  # Set (1)
-    0x7602: [],  # Get (2)
-    0x7603: ['B{state}'],  # Report (3)
+    0x7601: ('B{state}',),  # Set (1)
+    0x7602: (),  # Get (2)
+    0x7603: ('B{state}',),  # Report (3)
 
     # NodeNaming (0x77 = 119)
-    0x7701: ['N{name}'],  # Set (1)
-    0x7702: [],  # Get (2)
-    0x7703: ['N{name}'],  # Report (3)
-    0x7704: ['N{name}'],  # LocationSet (4)
-    0x7705: [],  # LocationGet (5)
-    0x7706: ['N{name}'],  # LocationReport (6)
+    0x7701: ('N{name}',),  # Set (1)
+    0x7702: (),  # Get (2)
+    0x7703: ('N{name}',),  # Report (3)
+    0x7704: ('N{name}',),  # LocationSet (4)
+    0x7705: (),  # LocationGet (5)
+    0x7706: ('N{name}',),  # LocationReport (6)
 
     # Firmware (0x7a = 122)
-    0x7a01: [],  # MetadataGet (1)
-    0x7a02: ['W{manufacturer}', 'W{id}', 'W{checksum}'],  # MetadataReport (2)
+    0x7a01: (),  # MetadataGet (1)
+    0x7a02: ('W{manufacturer}', 'W{id}', 'W{checksum}'),  # MetadataReport (2)
 
     # Battery (0x80 = 128)
-    0x8002: [],  # Get (2)
-    0x8003: ['B{level}'],  # Report (3)
+    0x8002: (),  # Get (2)
+    0x8003: ('B{level}',),  # Report (3)
 
     # Clock (0x81 = 129)
-    0x8104: ['B{dayhour}', 'B{minute}'],  # Set (4)
-    0x8105: [],  # Get (5)
-    0x8106: ['W{dhm}'],  # Report (6)
+    0x8104: ('B{dayhour}', 'B{minute}'),  # Set (4)
+    0x8105: (),  # Get (5)
+    0x8106: ('W{dhm}',),  # Report (6)
 
     # Hail (0x82 = 130)
-    0x8201: [],  # Hail (1)
+    0x8201: (),  # Hail (1)
 
     # WakeUp (0x84 = 132)
-    0x8404: [],  # IntervalSet (4)
-    0x8405: [],  # IntervalGet (5)
-    0x8406: [],  # IntervalReport (6)
-    0x8407: [],  # Notification (7)
-    0x8408: [],  # NoMoreInformation (8)
-    0x8409: [],  # IntervalCapabilitiesGet (9)
+    0x8404: (),  # IntervalSet (4)
+    0x8405: (),  # IntervalGet (5)
+    0x8406: (),  # IntervalReport (6)
+    0x8407: (),  # Notification (7)
+    0x8408: (),  # NoMoreInformation (8)
+    0x8409: (),  # IntervalCapabilitiesGet (9)
     # IntervalCapabilitiesReport (10)
-    0x840a: ['3{XXX}', '3{XXX}', '3{XXX}', '3{XXX}'],
+    0x840a: ('3{min}', '3{max}', '3{default}', '3{step}'),
 
     # Association (0x85 = 133)
-    0x8501: ['B{group}', 'L{nodes}'],  # Set (1)
-    0x8502: ['B{group}'],  # Get (2)
-    0x8503: ['B{group}', 'B{count}', 'B{seq}', 'L{nodes}'],  # Report (3)
-    0x8504: ['B{group}', 'L{nodes}'],  # Remove (4)
-    0x8505: [],  # GroupingsGet (5)
-    0x8506: ['B{count}'],  # GroupingsReport (6)
+    0x8501: ('B{group}', 'L{nodes}'),  # Set (1)
+    0x8502: ('B{group}',),  # Get (2)
+    0x8503: ('B{group}', 'B{count}', 'B{seq}', 'L{nodes}'),  # Report (3)
+    0x8504: ('B{group}', 'L{nodes}'),  # Remove (4)
+    0x8505: (),  # GroupingsGet (5)
+    0x8506: ('B{count}',),  # GroupingsReport (6)
 
     # Version (0x86 = 134)
-    0x8611: [],  # Get (17)
+    0x8611: (),  # Get (17)
     # Report (18)
-    0x8612: ['B{library}', 'W{protocol}', 'W{firmware}', 'b{hardware}', 't{targets}'],
-    0x8613: ['B{class}'],  # CommandClassGet (19)
-    0x8614: ['B{class}', 'B{version}'],  # CommandClassReport (20)
+    0x8612: ('B{library}', 'W{protocol}', 'W{firmware}', 'b{hardware}', 't{targets}'),
+    0x8613: ('B{class}',),  # CommandClassGet (19)
+    0x8614: ('B{class}', 'B{version}'),  # CommandClassReport (20)
 
     # Indicator (0x87 = 135)
-    0x8701: ['B{status}'],  # Set (1)
-    0x8702: [],  # Get (2)
-    0x8703: ['B{status}'],  # Report (3)
+    0x8701: ('B{status}',),  # Set (1)
+    0x8702: (),  # Get (2)
+    0x8703: ('B{status}',),  # Report (3)
 
     # TimeParameters (0x8b = 139)
-    0x8b01: ['C{date}'],  # Set (1)
-    0x8b02: [],  # Get (2)
-    0x8b03: ['C{date}'],  # Report (3)
+    0x8b01: ('C{date}',),  # Set (1)
+    0x8b02: (),  # Get (2)
+    0x8b03: ('C{date}',),  # Report (3)
 
     # Security (0x98 = 152)
-    0x9802: [],  # SupportedGet (2)
-    0x9803: ['B{mode}', 'L{command}'],  # SupportedReport (3)
-    0x9804: ['B{mode}'],  # SchemeGet (4)
-    0x9805: ['B{mode}'],  # SchemeReport (5)
-    0x9806: ['K{key}'],  # NetworkKeySet (6)
-    0x9807: [],  # NetworkKeyVerify (7)
-    0x9808: [],  # SchemeInherit (8)
-    0x9840: [],  # NonceGet (64)
-    0x9880: ['O{nonce}'],  # NonceReport (128)
-    0x9881: ['L{data}'],  # MessageEncap (129)
-    0x98c1: ['L{data}'],  # MessageEncapNonceGet (193)
+    0x9802: (),  # SupportedGet (2)
+    0x9803: ('B{mode}', 'L{command}'),  # SupportedReport (3)
+    0x9804: ('B{mode}',),  # SchemeGet (4)
+    0x9805: ('B{mode}',),  # SchemeReport (5)
+    0x9806: ('K{key}',),  # NetworkKeySet (6)
+    0x9807: (),  # NetworkKeyVerify (7)
+    0x9808: (),  # SchemeInherit (8)
+    0x9840: (),  # NonceGet (64)
+    0x9880: ('O{nonce}',),  # NonceReport (128)
+    0x9881: ('L{data}',),  # MessageEncap (129)
+    0x98c1: ('L{data}',),  # MessageEncapNonceGet (193)
 
     # SensorAlarm (0x9c = 156)
-    0x9c01: ['B{alarm}'],  # Get (1)
-    0x9c02: ['B{node}', 'B{alarm}'],  # Report (2)
-    0x9c03: [],  # SupportedGet (3)
-    0x9c04: ['T{bits}'],  # SupportedReport (4)
+    0x9c01: ('B{alarm}',),  # Get (1)
+    0x9c02: ('B{node}', 'B{alarm}'),  # Report (2)
+    0x9c03: (),  # SupportedGet (3)
+    0x9c04: ('T{bits}',),  # SupportedReport (4)
 
     # Security2 (0x9f = 159)
-    0x9f01: ['B{seq}'],  # NonceGet (1)
-    0x9f02: ['B{seq}', 'B{mode}', 'L{nonce}'],  # NonceReport (2)
-    0x9f03: ['B{seq}', 'E{extensions}'],  # MessageEncapsulation (3)
-    0x9f04: [],  # KexGet (4)
+    0x9f01: ('B{seq}',),  # NonceGet (1)
+    0x9f02: ('B{seq}', 'B{mode}', 'L{nonce}'),  # NonceReport (2)
+    0x9f03: ('B{seq}', 'E{extensions}'),  # MessageEncapsulation (3)
+    0x9f04: (),  # KexGet (4)
     # KexReport (5)
-    0x9f05: ['B{mode}', 'B{schemes}', 'B{profiles}', 'B{keys}'],
-    0x9f06: ['B{mode}', 'B{schemes}', 'B{profiles}', 'B{keys}'],  # KexSet (6)
-    0x9f07: ['B{type}'],  # KexFail (7)
-    0x9f08: ['B{mode}', 'L{key}'],  # PublicKeyReport (8)
-    0x9f09: ['B{key}'],  # NetworkKeyGet (9)
-    0x9f0a: ['B{key}', 'L{key}'],  # NetworkKeyReport (10)
-    0x9f0b: [],  # NetworkKeyVerify (11)
-    0x9f0c: ['B{mode}'],  # TransferEnd (12)
-    0x9f0d: [],  # CommandsSupportedGet (13)
-    0x9f0e: ['L{classes}'],  # CommandsSupportedReport (14)
+    0x9f05: ('B{mode}', 'B{schemes}', 'B{profiles}', 'B{keys}'),
+    0x9f06: ('B{mode}', 'B{schemes}', 'B{profiles}', 'B{keys}'),  # KexSet (6)
+    0x9f07: ('B{type}',),  # KexFail (7)
+    0x9f08: ('B{mode}', 'L{key}'),  # PublicKeyReport (8)
+    0x9f09: ('B{key}',),  # NetworkKeyGet (9)
+    0x9f0a: ('B{keys}', 'L{key}'),  # NetworkKeyReport (10)
+    0x9f0b: (),  # NetworkKeyVerify (11)
+    0x9f0c: ('B{mode}',),  # TransferEnd (12)
+    0x9f0d: (),  # CommandsSupportedGet (13)
+    0x9f0e: ('L{classes}',),  # CommandsSupportedReport (14)
 }